@@ -0,0 +1,382 @@
+"""Admission control: per-lane concurrency and queue limits, an upload memory budget,
+and rule-only scoring when LLM capacity is saturated.
+
+Requests are sorted into lanes by method and path (text scoring, audio scoring,
+batches); WebSocket connections (route method "WEBSOCKET") are admitted the
+same way when they connect and hold their slot until they close. Each lane has its own concurrency limit and queue; all lanes also
+share ADMISSION_MAX_IN_FLIGHT, of which lower-priority lanes may only use a
+share, so an audio spike cannot take the slots that cheap text requests need.
+A request that finds its lane full waits in the queue, and queued requests are
+admitted highest priority first. Requests are turned away early instead of
+being served slowly:
+
+    429  the lane's queue is full
+    503  no slot freed up within the lane's queue timeout, or the upload budget is spent
+    413  the upload alone is larger than the whole budget
+
+all with Retry-After, estimated from the lane's recent service times.
+
+Uploads reserve their Content-Length (or WHISPER_MAX_UPLOAD_BYTES when it is
+not sent) against ADMISSION_UPLOAD_BUDGET_BYTES before the body is read, and
+release it when the response has been sent. Binary WebSocket messages reserve
+their size from arrival until the application reads the next message; a
+stream that finds the budget spent is closed with 1013 (try again later).
+
+With ADMISSION_RULE_ONLY_FALLBACK, requests in lanes that allow it skip the LLM
+while ADMISSION_LLM_MAX_IN_FLIGHT Groq content-analysis calls are already
+running or every API key is cooling down, and are scored with local content
+analysis (`content_analysis.source == "local_shed"`). Only calls actually sent
+to Groq count (a packed call counts once), not work queued behind a caller's
+own limit such as BATCH_LLM_CONCURRENCY, so a large batch cannot push
+interactive requests onto local rules. Background work (batches, jobs) is never
+shed. Draft revisions are admitted in the text lane, but answer with local
+content analysis and ask the LLM in a background task that is not shed.
+"""
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from config import Config
+from groq_clients import client_pool
+from metrics import Counter, FALLBACKS, registry
+from logs import logger
+
+PRIORITY_RANKS = {"high": 0, "normal": 1, "low": 2}
+
+ADMISSION_REJECTIONS = registry.add(Counter(
+    "nirmaan_admission_rejections_total", "Requests turned away by admission control.", ["lane", "reason"]
+))
+
+# Whether the current request may be scored without the LLM when LLM capacity is saturated.
+_shed_llm: ContextVar[bool] = ContextVar("nirmaan_shed_llm", default=False)
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status = status
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class Lane:
+    def __init__(self, name: str, priority: str, concurrency: int, queue: int, queue_timeout: float,
+                 shed_llm: bool = False):
+        self.name = name
+        self.priority = priority
+        self.rank = PRIORITY_RANKS[priority]
+        self.concurrency = max(concurrency, 1)
+        self.queue = max(queue, 0)
+        self.queue_timeout = queue_timeout
+        self.shed_llm = shed_llm
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        # Smoothed seconds per request, for Retry-After.
+        self.service_seconds = 1.0
+
+    def retry_after(self) -> float:
+        return self.service_seconds * (self.waiting + 1) / self.concurrency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "service_seconds": round(self.service_seconds, 3),
+        }
+
+
+class Ticket:
+    def __init__(self, lane: Optional[Lane], upload_bytes: int):
+        self.lane = lane
+        self.upload_bytes = upload_bytes
+        self.started = time.monotonic()
+
+
+class AdmissionController:
+    """Lane slots, the shared in-flight limit and the upload budget, all on the event loop."""
+
+    def __init__(self, lanes: List[Lane], routes: List[Tuple[str, str, str]], max_in_flight: int,
+                 priority_shares: Dict[str, float], upload_budget_bytes: int):
+        self.lanes = {lane.name: lane for lane in lanes}
+        # (method, path, lane); a path ending in "/" matches everything below it.
+        self.routes = routes
+        self.max_in_flight = max(max_in_flight, 1)
+        self.priority_shares = priority_shares
+        self.upload_budget_bytes = upload_budget_bytes
+        self.in_flight = 0
+        self.upload_bytes = 0
+        self._waiters: List[Tuple[int, int, Lane, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def lane_for(self, method: str, path: str) -> Optional[Lane]:
+        for route_method, route_path, lane in self.routes:
+            if method != route_method:
+                continue
+            if path == route_path or (route_path.endswith("/") and path.startswith(route_path)):
+                return self.lanes[lane]
+        return None
+
+    def _has_room(self, lane: Lane) -> bool:
+        limit = self.max_in_flight * self.priority_shares.get(lane.priority, 1.0)
+        return lane.in_flight < lane.concurrency and self.in_flight < max(limit, 1)
+
+    def _take(self, lane: Lane):
+        lane.in_flight += 1
+        lane.admitted += 1
+        self.in_flight += 1
+
+    def reserve_upload(self, upload_bytes: int, lane: Optional[Lane] = None):
+        """Reserve `upload_bytes` of the upload budget; raises `Rejected`."""
+        if upload_bytes > self.upload_budget_bytes:
+            raise Rejected(413, "upload_too_large", "Upload is larger than the server accepts", 60)
+        if self.upload_bytes + upload_bytes > self.upload_budget_bytes:
+            raise Rejected(503, "upload_budget", "Too many uploads in progress", lane.retry_after() if lane else 1)
+        self.upload_bytes += upload_bytes
+
+    def release_upload(self, upload_bytes: int):
+        self.upload_bytes -= upload_bytes
+
+    async def admit(self, lane: Optional[Lane], upload_bytes: int = 0) -> Ticket:
+        """Reserve `upload_bytes` and take a slot in `lane`, waiting if allowed; raises `Rejected`."""
+        self.reserve_upload(upload_bytes, lane)
+        try:
+            if lane is not None:
+                # Arrivals queue behind the lane's waiters rather than overtaking them.
+                if self._has_room(lane) and not lane.waiting:
+                    self._take(lane)
+                elif lane.waiting >= lane.queue:
+                    raise Rejected(429, "queue_full", f"Too many {lane.name} requests in progress",
+                                   lane.retry_after())
+                else:
+                    await self._wait(lane)
+        except BaseException:
+            self.release_upload(upload_bytes)
+            raise
+        return Ticket(lane, upload_bytes)
+
+    async def _wait(self, lane: Lane):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane.rank, next(self._sequence), lane, future))
+        lane.waiting += 1
+        try:
+            await asyncio.wait_for(future, lane.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Rejected(503, "queue_timeout", f"Server busy, no {lane.name} slot freed up in time",
+                           lane.retry_after()) from None
+        except BaseException:
+            # Cancelled (client gone) after a slot was handed over: give it back.
+            if future.done() and not future.cancelled():
+                self._release_slot(lane)
+            raise
+        finally:
+            lane.waiting -= 1
+
+    def release(self, ticket: Ticket):
+        self.release_upload(ticket.upload_bytes)
+        lane = ticket.lane
+        if lane is not None:
+            elapsed = time.monotonic() - ticket.started
+            lane.service_seconds = 0.8 * lane.service_seconds + 0.2 * elapsed
+            self._release_slot(lane)
+
+    def _release_slot(self, lane: Lane):
+        lane.in_flight -= 1
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        """Hand free slots to waiters, highest priority (then oldest) first."""
+        blocked = []
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            lane, future = waiter[2], waiter[3]
+            if future.done():
+                continue
+            if self._has_room(lane):
+                self._take(lane)
+                future.set_result(True)
+            else:
+                blocked.append(waiter)
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "upload_bytes": self.upload_bytes,
+            "upload_budget_bytes": self.upload_budget_bytes,
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+            "llm": llm_capacity.stats(),
+        }
+
+
+class LLMCapacity:
+    """Counts Groq content-analysis calls in flight and decides when a request should skip the LLM."""
+
+    def __init__(self, max_in_flight: int, enabled: bool):
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.in_flight = 0
+        self.shed = 0
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.max_in_flight or client_pool.scheduler.next_available_in() > 0
+
+    def should_shed(self) -> bool:
+        """True when the current request should be scored with local rules instead of the LLM."""
+        if self.enabled and _shed_llm.get() and self.saturated():
+            self.shed += 1
+            FALLBACKS.inc(stage="llm_shed")
+            return True
+        return False
+
+    @contextmanager
+    def call(self):
+        """Count one Groq call in flight; wraps the call itself, not the wait for a caller's own limit."""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                "rule_only_fallback": self.enabled, "shed": self.shed}
+
+
+def _upload_bytes(scope) -> int:
+    headers = dict(scope.get("headers") or [])
+    if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+        return 0
+    try:
+        return int(headers[b"content-length"])
+    except (KeyError, ValueError):
+        return Config.WHISPER_MAX_UPLOAD_BYTES
+
+
+class AdmissionMiddleware:
+    """ASGI middleware, so requests are turned away before their body is read."""
+
+    def __init__(self, app, controller: "AdmissionController"):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            return await self._websocket(scope, receive, send)
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        lane = self.controller.lane_for(scope["method"], scope["path"])
+        upload = _upload_bytes(scope) if scope["method"] in ("POST", "PUT") else 0
+        if lane is None and not upload:
+            return await self.app(scope, receive, send)
+
+        try:
+            ticket = await self.controller.admit(lane, upload)
+        except Rejected as e:
+            ADMISSION_REJECTIONS.inc(lane=lane.name if lane else "none", reason=e.reason)
+            logger.warning(f"Admission: {e.status} for {scope['method']} {scope['path']} ({e.reason})")
+            response = JSONResponse({"detail": e.detail}, status_code=e.status,
+                                    headers={"Retry-After": str(e.retry_after)})
+            return await response(scope, receive, send)
+
+        token = _shed_llm.set(bool(lane and lane.shed_llm))
+        try:
+            # Returns once the response, streamed or not, has been sent.
+            await self.app(scope, receive, send)
+        finally:
+            _shed_llm.reset(token)
+            self.controller.release(ticket)
+
+    async def _websocket(self, scope, receive, send):
+        lane = self.controller.lane_for("WEBSOCKET", scope["path"])
+        if lane is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            ticket = await self.controller.admit(lane)
+        except Rejected as e:
+            ADMISSION_REJECTIONS.inc(lane=lane.name, reason=e.reason)
+            logger.warning(f"Admission: {e.status} for WebSocket {scope['path']} ({e.reason})")
+            if "websocket.http.response" in scope.get("extensions", {}):
+                response = JSONResponse({"detail": e.detail}, status_code=e.status,
+                                        headers={"Retry-After": str(e.retry_after)})
+                return await response(scope, receive, send)
+            await receive()  # websocket.connect
+            return await send({"type": "websocket.close", "code": 1013, "reason": e.detail})
+
+        held = 0
+
+        async def receive_counted():
+            nonlocal held
+            # The application asks for the next message once it is done with the previous one.
+            self.controller.release_upload(held)
+            held = 0
+            message = await receive()
+            data = message.get("bytes") if message["type"] == "websocket.receive" else None
+            if data:
+                try:
+                    self.controller.reserve_upload(len(data), lane)
+                except Rejected as e:
+                    ADMISSION_REJECTIONS.inc(lane=lane.name, reason=e.reason)
+                    logger.warning(f"Admission: closing WebSocket {scope['path']} ({e.reason})")
+                    code = 1009 if e.status == 413 else 1013
+                    await send({"type": "websocket.close", "code": code, "reason": e.detail})
+                    return {"type": "websocket.disconnect", "code": code}
+                held = len(data)
+            return message
+
+        try:
+            await self.app(scope, receive_counted, send)
+        finally:
+            self.controller.release_upload(held)
+            self.controller.release(ticket)
+
+
+def _lanes() -> List[Lane]:
+    return [Lane(name, **settings) for name, settings in Config.ADMISSION_LANES.items()]
+
+
+admission = AdmissionController(
+    _lanes(),
+    [
+        ("POST", "/score", "text"),
+        ("POST", "/drafts", "text"),
+        ("PUT", "/drafts/", "text"),
+        ("POST", "/audio/score", "audio"),
+        ("WEBSOCKET", "/audio/stream", "audio"),
+        ("POST", "/score/batch", "batch"),
+    ],
+    Config.ADMISSION_MAX_IN_FLIGHT,
+    Config.ADMISSION_PRIORITY_SHARES,
+    Config.ADMISSION_UPLOAD_BUDGET_BYTES,
+)
+llm_capacity = LLMCapacity(Config.ADMISSION_LLM_MAX_IN_FLIGHT, Config.ADMISSION_RULE_ONLY_FALLBACK)
+
+
+@registry.collector
+def collect_admission_stats():
+    lanes = admission.lanes.values()
+    return [
+        ("nirmaan_admission_in_flight", "Requests admitted and not yet finished, by lane.", "gauge",
+         [({"lane": lane.name}, lane.in_flight) for lane in lanes]),
+        ("nirmaan_admission_waiting", "Requests queued for a slot, by lane.", "gauge",
+         [({"lane": lane.name}, lane.waiting) for lane in lanes]),
+        ("nirmaan_admission_upload_bytes", "Upload bytes reserved by requests in flight.", "gauge",
+         [({}, admission.upload_bytes)]),
+        ("nirmaan_llm_in_flight", "Groq content-analysis calls in flight (a packed call counts once).", "gauge",
+         [({}, llm_capacity.in_flight)]),
+    ]
@@ -0,0 +1,73 @@
+import time
+import threading
+from typing import Any, Dict
+from config import Config
+from grammar import grammar_checker
+from logs import logger
+
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+except ImportError:
+    SentimentIntensityAnalyzer = None
+    logger.warning("vaderSentiment not found. Sentiment scoring will be limited.")
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+_warmup_thread = None
+_warmup_started_at = None
+_warmup_finished_at = None
+
+
+def get_sentiment_analyzer():
+    """The shared VADER analyzer, built on first use if warm-up has not done it yet."""
+    global _analyzer
+    if _analyzer is None and SentimentIntensityAnalyzer is not None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def warm_up():
+    """Build every heavy analyzer in the calling thread."""
+    global _warmup_finished_at
+    get_sentiment_analyzer()
+    grammar_checker.warm_up()
+    _warmup_finished_at = time.monotonic()
+
+
+def start_warmup():
+    """Warm analyzers on a daemon thread so the server can bind immediately."""
+    global _warmup_thread, _warmup_started_at
+    if _warmup_thread is not None or is_ready():
+        return
+
+    _warmup_started_at = time.monotonic()
+    grammar_checker.mark_warming()
+
+    def run():
+        try:
+            warm_up()
+            logger.info(f"Analyzers warm after {_warmup_finished_at - _warmup_started_at:.1f}s")
+        except Exception as e:
+            logger.error(f"Analyzer warm-up failed: {e}")
+
+    _warmup_thread = threading.Thread(target=run, name="analyzer-warmup", daemon=True)
+    _warmup_thread.start()
+
+
+def is_ready() -> bool:
+    return grammar_checker.warm and (_analyzer is not None or SentimentIntensityAnalyzer is None)
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "ready": is_ready(),
+        "degraded_mode": Config.SERVE_BEFORE_READY,
+        "grammar": "warm" if grammar_checker.warm else ("warming" if grammar_checker.warming else "cold"),
+        "sentiment": "warm" if _analyzer is not None else ("unavailable" if SentimentIntensityAnalyzer is None else "cold"),
+        "warmup_seconds": round(_warmup_finished_at - _warmup_started_at, 2)
+        if _warmup_started_at is not None and _warmup_finished_at is not None else None,
+    }
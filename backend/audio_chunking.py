@@ -0,0 +1,179 @@
+"""Splitting long recordings for parallel transcription.
+
+Audio is decoded to 16 kHz mono PCM: WAV natively, anything else through
+ffmpeg when it is installed. Cut points are placed at the quietest 20 ms frame
+near each target boundary, every chunk is padded with a little overlap on both
+sides, and the transcripts are stitched back by timestamp: a Whisper segment
+belongs to the chunk whose core (unpadded) range holds its midpoint. Words
+repeated across a junction anyway are dropped by matching the end of one chunk
+against the start of the next.
+"""
+import io
+import wave
+import shutil
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from lexicon import TOKEN_RE
+from logs import logger
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+# Longest run of words that may be transcribed twice at a junction.
+MAX_JUNCTION_WORDS = 12
+
+_FFMPEG = shutil.which("ffmpeg")
+if _FFMPEG is None:
+    logger.warning("ffmpeg not found. Only WAV recordings can be split for parallel transcription.")
+
+
+class Chunk:
+    """Sample ranges of one chunk: `start`/`end` include the overlap, `core_*` do not."""
+
+    def __init__(self, index: int, start: int, end: int, core_start: int, core_end: int):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.core_start = core_start
+        self.core_end = core_end
+
+    @property
+    def offset_seconds(self) -> float:
+        return self.start / SAMPLE_RATE
+
+
+def decode_pcm(view: memoryview) -> Optional[np.ndarray]:
+    """16 kHz mono float32 samples, or None if the format cannot be decoded here."""
+    if bytes(view[:4]) in (b"RIFF", b"RF64") and bytes(view[8:12]) == b"WAVE":
+        try:
+            return _decode_wav(view)
+        except (wave.Error, EOFError, ValueError) as e:
+            logger.warning(f"Could not decode WAV for chunking: {e}")
+    if _FFMPEG is None:
+        return None
+
+    try:
+        completed = subprocess.run(
+            [_FFMPEG, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            input=view, capture_output=True, timeout=120, check=True,
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"ffmpeg could not decode audio for chunking: {e}")
+        return None
+    return np.frombuffer(completed.stdout, dtype="<i2").astype(np.float32) / 32768
+
+
+def _decode_wav(view: memoryview) -> Optional[np.ndarray]:
+    with wave.open(io.BytesIO(view), "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width not in (1, 2, 4):
+        raise ValueError(f"unsupported sample width {width}")
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    else:
+        dtype = "<i2" if width == 2 else "<i4"
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32) / float(2 ** (8 * width - 1))
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE and len(samples):
+        # Linear resampling is plenty for speech recognition input.
+        target = np.arange(0, len(samples) * SAMPLE_RATE // rate) * (rate / SAMPLE_RATE)
+        samples = np.interp(target, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+def plan_chunks(samples: np.ndarray, chunk_seconds: float, overlap_seconds: float,
+                search_seconds: float) -> List[Chunk]:
+    """Chunks of about `chunk_seconds`, cut at the quietest frame near each boundary."""
+    total = len(samples)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk:
+        return [Chunk(0, 0, total, 0, total)]
+
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    usable = total - total % frame
+    energy = np.sqrt(np.mean(samples[:usable].reshape(-1, frame) ** 2, axis=1))
+    search = max(int(search_seconds / FRAME_SECONDS), 1)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk * 1.5:
+        target = (cuts[-1] + chunk) // frame
+        lo, hi = max(target - search, cuts[-1] // frame + 1), min(target + search, len(energy))
+        quietest = lo + int(np.argmin(energy[lo:hi])) if hi > lo else target
+        cuts.append(quietest * frame)
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    return [
+        Chunk(i, max(start - overlap, 0), min(end + overlap, total), start, end)
+        for i, (start, end) in enumerate(zip(cuts, cuts[1:]))
+    ]
+
+
+def encode_wav(samples: np.ndarray) -> bytes:
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def stitch(chunks: List[Chunk], transcripts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-chunk transcripts (chunk-relative segment times) into one timeline."""
+    segments: List[Dict[str, Any]] = []
+    words: List[str] = []
+    for chunk, transcript in zip(chunks, transcripts):
+        core_start, core_end = chunk.core_start / SAMPLE_RATE, chunk.core_end / SAMPLE_RATE
+        owned = []
+        chunk_segments = transcript.get("segments") or []
+        for segment in chunk_segments:
+            start = segment["start"] + chunk.offset_seconds
+            end = segment["end"] + chunk.offset_seconds
+            if core_start <= (start + end) / 2 < core_end:
+                owned.append({"start": round(start, 2), "end": round(end, 2), "text": segment["text"].strip()})
+        if not chunk_segments and transcript.get("text"):
+            owned.append({"start": round(core_start, 2), "end": round(core_end, 2), "text": transcript["text"].strip()})
+
+        if owned and chunk.index > 0:
+            owned[0]["text"] = _drop_repeated_prefix(words, owned[0]["text"])
+        for segment in owned:
+            if segment["text"]:
+                words.extend(TOKEN_RE.findall(segment["text"].lower()))
+                segments.append(segment)
+
+    return {"text": " ".join(segment["text"] for segment in segments), "segments": segments}
+
+
+def _drop_repeated_prefix(previous: List[str], text: str) -> str:
+    """Remove the longest run of leading words in `text` that repeats the end of `previous`."""
+    matches = list(TOKEN_RE.finditer(text))
+    tokens = [m.group().lower() for m in matches]
+    longest = min(len(previous), len(tokens), MAX_JUNCTION_WORDS)
+    for size in range(longest, 1, -1):
+        if previous[-size:] == tokens[:size]:
+            return text[matches[size - 1].end():].lstrip(" ,.;:!?")
+    return text
+
+
+def segment_rates(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add words and words-per-minute to timestamped segments."""
+    rated = []
+    for segment in segments:
+        word_count = len(TOKEN_RE.findall(segment["text"]))
+        seconds = segment["end"] - segment["start"]
+        rated.append({**segment, "words": word_count, "wpm": round(word_count / seconds * 60, 1) if seconds > 0 else None})
+    return rated
+
+
+def split_for_transcription(samples: np.ndarray, chunk_seconds: float, overlap_seconds: float,
+                            search_seconds: float) -> List[Tuple[Chunk, bytes]]:
+    return [
+        (chunk, encode_wav(samples[chunk.start:chunk.end]))
+        for chunk in plan_chunks(samples, chunk_seconds, overlap_seconds, search_seconds)
+    ]
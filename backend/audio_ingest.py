@@ -0,0 +1,174 @@
+import io
+import os
+import mmap
+import hashlib
+import tempfile
+from typing import Optional
+from fastapi import UploadFile
+from config import Config
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class _ViewReader(io.RawIOBase):
+    """Seekable read-only file object over a memoryview, without copying it."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(min(len(b), len(self._view) - self._pos), 0)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        self._pos = max(self._pos, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class AudioBuffer:
+    """An upload read exactly once and shared by every stage of audio scoring.
+
+    Small uploads stay in memory; once `Config.AUDIO_SPOOL_MAX_BYTES` is exceeded
+    the bytes spill to an anonymous temp file that is memory-mapped. Either way
+    `view` is a zero-copy memoryview and `reader()` hands out independent file
+    objects over it (one per Whisper attempt), so no stage re-reads or re-writes
+    the audio. The SHA-256 is computed while streaming.
+
+    Work that can outlive its request (a transcription shared with other
+    requests) takes its own reference with `retain()`; the audio is released
+    when every holder has called `close()`.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename or "audio"
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self._memory: Optional[bytearray] = bytearray()
+        self._file = None
+        self._mmap = None
+        self._view: Optional[memoryview] = None
+        self._refs = 1
+
+    @classmethod
+    async def from_upload(cls, upload: UploadFile) -> "AudioBuffer":
+        buffer = cls(upload.filename)
+        hasher = hashlib.sha256()
+
+        await upload.seek(0)
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            buffer._append(chunk)
+
+        buffer.sha256 = hasher.hexdigest()
+        buffer._seal()
+        return buffer
+
+    @classmethod
+    def from_bytes(cls, filename: str, data: bytes) -> "AudioBuffer":
+        buffer = cls(filename)
+        buffer._append(data)
+        buffer.sha256 = hashlib.sha256(data).hexdigest()
+        buffer._seal()
+        return buffer
+
+    @classmethod
+    def from_path(cls, path: str, filename: str = None, sha256: str = None) -> "AudioBuffer":
+        """Map a stored file, e.g. a queued job's audio, without reading it into memory."""
+        buffer = cls(filename or os.path.basename(path))
+        buffer._file = open(path, "rb")
+        buffer.size = os.fstat(buffer._file.fileno()).st_size
+        if not buffer.size:
+            buffer._file.close()
+            buffer._file = None
+            buffer.sha256 = sha256 or hashlib.sha256(b"").hexdigest()
+            buffer._seal()
+            return buffer
+        buffer._mmap = mmap.mmap(buffer._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer._view = memoryview(buffer._mmap)
+        buffer.sha256 = sha256 or hashlib.sha256(buffer._view).hexdigest()
+        return buffer
+
+    def save(self, path: str):
+        """Write the audio to `path` atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._view)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _append(self, chunk: bytes):
+        self.size += len(chunk)
+        if self._file is None and self.size > Config.AUDIO_SPOOL_MAX_BYTES:
+            self._file = tempfile.TemporaryFile()
+            self._file.write(self._memory)
+            self._memory = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._memory.extend(chunk)
+
+    def _seal(self):
+        if self._file is not None:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        else:
+            self._view = memoryview(self._memory)
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.filename)[1].lower()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._mmap is not None
+
+    @property
+    def view(self) -> memoryview:
+        return self._view
+
+    def reader(self) -> _ViewReader:
+        return _ViewReader(self._view)
+
+    def retain(self) -> "AudioBuffer":
+        self._refs += 1
+        return self
+
+    def close(self):
+        self._refs -= 1
+        if self._refs > 0:
+            return
+        # Unmap now rather than whenever the last reference is collected. If an
+        # array or slice made from the view is still alive, the map goes with it.
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass
+        self._view = None
+        self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = None
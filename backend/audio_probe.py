@@ -0,0 +1,312 @@
+"""Header-only audio duration probing.
+
+Every prober works on a memoryview of the upload and reads only container
+headers and metadata (chunk/box/element headers, Ogg page headers, the first
+MPEG frame). Nothing is decoded and nothing is copied beyond a few bytes.
+"""
+import struct
+from typing import Optional
+
+
+def probe_duration(view: memoryview) -> Optional[float]:
+    """Return the duration in seconds, or None if the format is unknown or truncated."""
+    head = bytes(view[:12])
+    if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+        return _wav_duration(view)
+    if head[:4] == b"\x1aE\xdf\xa3":
+        return _matroska_duration(view)
+    if head[:4] == b"OggS":
+        return _ogg_duration(view)
+    if head[:4] == b"fLaC":
+        return _flac_duration(view)
+    if head[4:8] == b"ftyp":
+        return _mp4_duration(view)
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return _mp3_duration(view)
+    return None
+
+
+# WAV
+
+def _wav_duration(view: memoryview) -> Optional[float]:
+    pos = 12
+    byte_rate = None
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        size, = struct.unpack_from("<I", view, pos + 4)
+        if chunk_id == b"fmt " and size >= 12:
+            if pos + 20 > len(view):
+                return None
+            byte_rate, = struct.unpack_from("<I", view, pos + 16)
+        elif chunk_id == b"data":
+            data_size = size
+            # Streamed or RF64 files leave the size unset; use what we actually have.
+            if data_size in (0, 0xFFFFFFFF) or pos + 8 + data_size > len(view):
+                data_size = len(view) - pos - 8
+            return data_size / byte_rate if byte_rate else None
+        pos += 8 + size + (size & 1)
+    return None
+
+
+# Matroska / WebM
+
+_EBML_SEGMENT = 0x18538067
+_EBML_INFO = 0x1549A966
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_CLUSTER = 0x1F43B675
+_EBML_CLUSTER_TIMECODE = 0xE7
+_EBML_BLOCK_GROUP = 0xA0
+_EBML_BLOCK = 0xA1
+_EBML_SIMPLE_BLOCK = 0xA3
+
+# Master elements we step into instead of skipping; they may have unknown size.
+_EBML_DESCEND = {_EBML_SEGMENT, _EBML_INFO, _EBML_CLUSTER, _EBML_BLOCK_GROUP}
+
+
+def _read_vint(view: memoryview, pos: int, keep_marker: bool):
+    first = view[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(view):
+        raise ValueError("invalid EBML variable-length integer")
+
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for b in view[pos + 1:pos + length]:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+    return value, length, all_ones
+
+
+def _read_uint(view: memoryview, pos: int, size: int) -> int:
+    return int.from_bytes(view[pos:pos + size], "big")
+
+
+def _matroska_duration(view: memoryview) -> Optional[float]:
+    timecode_scale = 1_000_000
+    info_duration = None
+    cluster_timecode = 0
+    last_timecode = None
+    pos = 0
+
+    try:
+        while pos < len(view):
+            element_id, id_len, _ = _read_vint(view, pos, keep_marker=True)
+            size, size_len, unknown_size = _read_vint(view, pos + id_len, keep_marker=False)
+            data = pos + id_len + size_len
+
+            if element_id == _EBML_CLUSTER and info_duration:
+                break
+            if element_id in _EBML_DESCEND:
+                pos = data
+                continue
+            if unknown_size:
+                break
+
+            if element_id == _EBML_TIMECODE_SCALE:
+                timecode_scale = _read_uint(view, data, size)
+            elif element_id == _EBML_DURATION:
+                fmt = ">f" if size == 4 else ">d"
+                duration, = struct.unpack_from(fmt, view, data)
+                if duration > 0:
+                    info_duration = duration
+            elif element_id == _EBML_CLUSTER_TIMECODE:
+                cluster_timecode = _read_uint(view, data, size)
+            elif element_id in (_EBML_SIMPLE_BLOCK, _EBML_BLOCK):
+                # Browser recorders (MediaRecorder) omit Duration, so fall back to
+                # the latest block timestamp: track number vint, then int16 offset.
+                _, track_len, _ = _read_vint(view, data, keep_marker=False)
+                relative, = struct.unpack_from(">h", view, data + track_len)
+                timecode = cluster_timecode + relative
+                if last_timecode is None or timecode > last_timecode:
+                    last_timecode = timecode
+            pos = data + size
+    except (ValueError, IndexError, struct.error):
+        # Truncated upload; use whatever timestamps were seen.
+        pass
+
+    if info_duration:
+        return info_duration * timecode_scale / 1e9
+    if last_timecode is None:
+        return None
+    return last_timecode * timecode_scale / 1e9
+
+
+# Ogg (Opus / Vorbis / FLAC)
+
+def _ogg_duration(view: memoryview) -> Optional[float]:
+    if len(view) < 28:
+        return None
+    segments = view[26]
+    packet = bytes(view[27 + segments:27 + segments + 30])
+
+    pre_skip = 0
+    if packet.startswith(b"OpusHead"):
+        # Opus granule positions always count 48 kHz samples.
+        sample_rate = 48000
+        pre_skip, = struct.unpack_from("<H", packet, 10)
+    elif packet.startswith(b"\x01vorbis"):
+        sample_rate, = struct.unpack_from("<I", packet, 12)
+    elif packet.startswith(b"\x7fFLAC"):
+        sample_rate = int.from_bytes(packet[27:30], "big") >> 4
+    else:
+        return None
+
+    granule = _last_ogg_granule(view)
+    if granule is None or not sample_rate:
+        return None
+    return max(granule - pre_skip, 0) / sample_rate
+
+
+def _last_ogg_granule(view: memoryview) -> Optional[int]:
+    window = 64 * 1024
+    end = len(view)
+    while end > 0:
+        start = max(end - window, 0)
+        tail = bytes(view[start:end])
+        idx = tail.rfind(b"OggS")
+        while idx != -1:
+            if idx + 14 <= len(tail):
+                granule, = struct.unpack_from("<q", tail, idx + 6)
+                # -1 marks a page on which no packet finishes.
+                if granule >= 0:
+                    return granule
+            idx = tail.rfind(b"OggS", 0, idx)
+        if start == 0:
+            break
+        # Overlap so a capture pattern split across windows is still found.
+        end = start + 3
+    return None
+
+
+# FLAC
+
+def _flac_duration(view: memoryview) -> Optional[float]:
+    # STREAMINFO is always the first metadata block.
+    if len(view) < 26:
+        return None
+    info = bytes(view[8:26])
+    sample_rate = int.from_bytes(info[10:13], "big") >> 4
+    total_samples = int.from_bytes(info[13:18], "big") & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+# MP4 / M4A
+
+def _mp4_boxes(view: memoryview, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size, = struct.unpack_from(">I", view, pos)
+        box_type = bytes(view[pos + 4:pos + 8])
+        header = 8
+        if size == 1:
+            size, = struct.unpack_from(">Q", view, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _mp4_duration(view: memoryview) -> Optional[float]:
+    try:
+        for box_type, data, end in _mp4_boxes(view, 0, len(view)):
+            if box_type != b"moov":
+                continue
+
+            timescale = duration = None
+            for child, child_data, child_end in _mp4_boxes(view, data, end):
+                if child == b"mvhd":
+                    if view[child_data] == 1:
+                        timescale, duration = struct.unpack_from(">IQ", view, child_data + 20)
+                    else:
+                        timescale, duration = struct.unpack_from(">II", view, child_data + 12)
+                elif child == b"mvex" and not duration:
+                    # Fragmented files carry the total in mvex/mehd instead.
+                    for grandchild, gc_data, _ in _mp4_boxes(view, child_data, child_end):
+                        if grandchild == b"mehd":
+                            fmt = ">Q" if view[gc_data] == 1 else ">I"
+                            duration, = struct.unpack_from(fmt, view, gc_data + 4)
+
+            if timescale and duration:
+                return duration / timescale
+            return None
+    except struct.error:
+        pass
+    return None
+
+
+# MP3
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def _mp3_duration(view: memoryview) -> Optional[float]:
+    start = 0
+    if bytes(view[:3]) == b"ID3" and len(view) >= 10:
+        size = 0
+        for b in view[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        start = 10 + size + (10 if view[5] & 0x10 else 0)
+
+    end = len(view)
+    if end >= 128 and bytes(view[end - 128:end - 125]) == b"TAG":
+        end -= 128
+
+    # Find the first frame sync within a small window after the tags.
+    pos = start
+    limit = min(start + 64 * 1024, end - 4)
+    while pos < limit and not (view[pos] == 0xFF and view[pos + 1] & 0xE0 == 0xE0):
+        pos += 1
+    if pos >= limit:
+        return None
+
+    header, = struct.unpack_from(">I", view, pos)
+    version = {0: 2.5, 2: 2, 3: 1}.get((header >> 19) & 3)
+    layer = {1: 3, 2: 2, 3: 1}.get((header >> 17) & 3)
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 3
+    mono = ((header >> 6) & 3) == 3
+    if version is None or layer is None or rate_index == 3 or bitrate_index in (0, 15):
+        return None
+
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or version == 1:
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+
+    # VBR files carry a Xing/Info or VBRI header with the frame count.
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    xing = pos + 4 + side_info
+    tag = bytes(view[xing:xing + 4])
+    frames = None
+    if tag in (b"Xing", b"Info"):
+        flags, = struct.unpack_from(">I", view, xing + 4)
+        if flags & 1:
+            frames, = struct.unpack_from(">I", view, xing + 8)
+    elif bytes(view[pos + 36:pos + 40]) == b"VBRI":
+        frames, = struct.unpack_from(">I", view, pos + 36 + 14)
+
+    if frames:
+        return frames * samples_per_frame / sample_rate
+    return (end - pos) * 8 / bitrate
@@ -1,130 +1,273 @@
-import tempfile
-import os
-from typing import Optional
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from groq import Groq
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
 from config import Config
 from logs import logger
-from scoring import ScoringEngine
+from scoring import engine
+from groq_clients import client_pool
+from result_cache import ResultCache, SingleFlight, make_key
+from audio_ingest import AudioBuffer
+from audio_probe import probe_duration
+from audio_stream import StreamingTranscript
+from metrics import collect_timings, stage, timings_ms
+from audio_chunking import SAMPLE_RATE, decode_pcm, segment_rates, split_for_transcription, stitch
 
 router = APIRouter(prefix="/audio", tags=["Audio Processing"])
 
-engine = ScoringEngine()
-
-class AudioProcessor:
-    def __init__(self):
-        self.api_keys = Config.GROQ_API_KEYS
-        self.current_key_index = 0
-    
-    def _get_client(self):
-        if not self.api_keys:
-            raise ValueError("No Groq API keys found in environment variables.")
-        
-        key = self.api_keys[self.current_key_index]
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        return Groq(api_key=key)
-
-audio_processor = AudioProcessor()
+transcription_cache = None
+if Config.TRANSCRIPTION_CACHE_MAX_ENTRIES > 0:
+    transcription_cache = ResultCache(
+        "transcription", Config.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+        Config.TRANSCRIPTION_CACHE_TTL_SECONDS, Config.RESULT_CACHE_PATH
+    )
+transcription_flights = SingleFlight()
 
 @router.post("/score")
 async def score_audio_endpoint(
     audio_file: UploadFile = File(...),
-    duration: Optional[int] = None
+    duration: Optional[int] = None,
+    timings: bool = False
 ):
 
     if not audio_file:
         raise HTTPException(status_code=400, detail="Audio file is required")
     
+    buffer = None
     try:
         logger.info(f"Processing audio file: {audio_file.filename}")
-        
-        transcription = await transcribe_with_whisper(audio_file)
-        
-        if not transcription.strip():
-            raise HTTPException(status_code=400, detail="Could not transcribe audio")
-        
-        logger.info(f"Transcribed: {transcription[:100]}...")
-        
-        if duration is None:
-            duration = await extract_audio_duration(audio_file)
-        
-        logger.info(f"Audio duration: {duration}s")
-        
-        result = engine.score_transcript(transcription, duration)
-        
-        result["transcription"] = transcription
-        
+
+        with collect_timings() as stage_timings:
+            with stage("upload_read"):
+                buffer = await AudioBuffer.from_upload(audio_file)
+            logger.info(f"Read {buffer.size} bytes ({'memory-mapped' if buffer.on_disk else 'in memory'})")
+
+            result = await score_audio(buffer, duration)
+        if timings:
+            result["timings"] = timings_ms(stage_timings)
         return result
         
     except Exception as e:
         logger.error(f"Audio processing failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if buffer:
+            buffer.close()
 
-async def transcribe_with_whisper(audio_file: UploadFile) -> str:
-    max_retries = len(audio_processor.api_keys)
-    last_error = None
+async def score_audio(buffer: AudioBuffer, duration: Optional[int] = None) -> dict:
+    """Transcribe and score one recording; shared by /audio/score and queued jobs."""
+    with stage("duration_probe"):
+        seconds = probe_seconds(buffer)
+    transcript = await transcribe_audio(buffer, seconds)
+    transcription = transcript["text"]
+    
+    if not transcription.strip():
+        raise HTTPException(status_code=400, detail="Could not transcribe audio")
+    
+    logger.info(f"Transcribed: {transcription[:100]}...")
+    
+    if duration is None and seconds is not None:
+        duration = int(round(seconds))
     
-    for attempt in range(max_retries):
+    logger.info(f"Audio duration: {duration}s")
+    
+    result = await engine.score_transcript_async(transcription, duration)
+    
+    result["transcription"] = transcription
+    result["segments"] = segment_rates(transcript["segments"])
+    return result
+
+
+@router.websocket("/stream")
+async def stream_audio_endpoint(websocket: WebSocket):
+    """Score audio while it is being recorded.
+
+    Each binary message is one self-contained audio segment (e.g. from a
+    MediaRecorder restarted every few seconds) and is answered with a
+    "partial" message carrying the transcript and running metrics so far. An
+    optional {"type": "start", "format": "webm"} names the segment format;
+    {"type": "end", "duration": seconds} finishes the stream and is answered
+    with "final", holding the same result as POST /audio/score.
+    """
+    await websocket.accept()
+    stream = StreamingTranscript()
+    extension = "webm"
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info("Audio stream closed before it ended")
+                return
+
+            data = message.get("bytes")
+            if data is not None:
+                if len(data) > Config.STREAM_MAX_SEGMENT_BYTES:
+                    await _stream_error(websocket, "Audio segment too large", code=1009)
+                    return
+                if len(stream.segments) >= Config.STREAM_MAX_SEGMENTS:
+                    await _stream_error(websocket, "Too many audio segments", code=1008)
+                    return
+                text = await transcribe_segment(stream, data, extension)
+                await websocket.send_json({"type": "partial", "text": text, "transcript": stream.text, **stream.partial()})
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "")
+            except json.JSONDecodeError:
+                control = None
+            if not isinstance(control, dict) or control.get("type") not in ("start", "end"):
+                await _stream_error(websocket, "Expected audio bytes or a start/end message", code=1003)
+                return
+            if control["type"] == "start":
+                extension = str(control.get("format") or extension).lstrip(".")
+                continue
+            break
+
+        transcript = stream.text
+        if not transcript.strip():
+            await _stream_error(websocket, "Could not transcribe audio")
+            return
+
+        duration = control.get("duration") or (round(stream.seconds) if stream.seconds else None)
+        result = await engine.score_transcript_async(transcript, int(duration) if duration else None)
+        result["transcription"] = transcript
+        await websocket.send_json({"type": "final", "result": result})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        logger.info("Audio stream closed by client")
+    except Exception as e:
+        logger.error(f"Audio stream failed: {e}")
+        await _stream_error(websocket, str(e), code=1011)
+
+
+async def transcribe_segment(stream: StreamingTranscript, data: bytes, extension: str) -> str:
+    buffer = AudioBuffer.from_bytes(f"segment.{extension}", data)
+    try:
+        seconds = probe_duration(buffer.view)
+        text = await transcribe_with_whisper(buffer, prompt=stream.prompt)
+    finally:
+        buffer.close()
+    stream.add_segment(text, seconds)
+    return text
+
+
+async def _stream_error(websocket: WebSocket, detail: str, code: int = 1000):
+    try:
+        await websocket.send_json({"type": "error", "detail": detail})
+        await websocket.close(code=code)
+    except Exception:
+        # The client may already be gone.
+        pass
+
+
+async def transcribe_audio(buffer: AudioBuffer, seconds: Optional[float]) -> Dict[str, Any]:
+    """Transcribe a recording, splitting long ones into chunks transcribed in parallel.
+
+    `seconds` is the probed length (None when unknown). Returns the text and
+    timestamped segments. Chunks go through `client_pool` concurrently, so they
+    spread over the available API keys.
+    """
+    if (seconds or 0) <= Config.WHISPER_CHUNK_MIN_SECONDS and buffer.size <= Config.WHISPER_MAX_UPLOAD_BYTES:
+        return await transcribe_timed(buffer)
+
+    with stage("audio_decode"):
+        samples = await asyncio.to_thread(decode_pcm, buffer.view)
+        if samples is None:
+            logger.warning(f"Cannot split {buffer.extension or 'unknown'} audio, transcribing it in one request")
+        else:
+            pieces = await asyncio.to_thread(
+                split_for_transcription, samples, Config.WHISPER_CHUNK_SECONDS,
+                Config.WHISPER_CHUNK_OVERLAP_SECONDS, Config.WHISPER_CHUNK_SEARCH_SECONDS,
+            )
+    if samples is None:
+        return await transcribe_timed(buffer)
+    if len(pieces) == 1:
+        return await transcribe_timed(buffer)
+
+    limit = asyncio.Semaphore(Config.WHISPER_CHUNK_CONCURRENCY)
+
+    async def transcribe_chunk(chunk, data):
+        chunk_buffer = AudioBuffer.from_bytes(f"chunk-{chunk.index}.wav", data)
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio_file.filename)[1]) as tmp_file:
-                await audio_file.seek(0)
-                content = await audio_file.read()
-                tmp_file.write(content)
-                tmp_path = tmp_file.name
-            
-            await audio_file.seek(0)
-            
-            groq_client = audio_processor._get_client()
-            logger.info(f"Transcribing with Whisper (attempt {attempt + 1}/{max_retries})")
-            
-            with open(tmp_path, "rb") as audio:
-                transcription = groq_client.audio.transcriptions.create(
-                    file=(audio_file.filename, audio.read()),
-                    model="whisper-large-v3",
-                    language="en"
+            async with limit:
+                return await transcribe_timed(chunk_buffer)
+        finally:
+            chunk_buffer.close()
+
+    transcripts = await asyncio.gather(*(transcribe_chunk(chunk, data) for chunk, data in pieces))
+    logger.info(f"Transcribed {len(pieces)} chunks of {len(samples) / SAMPLE_RATE:.0f}s audio in parallel")
+    return stitch([chunk for chunk, _ in pieces], transcripts)
+
+
+async def transcribe_with_whisper(buffer: AudioBuffer, prompt: Optional[str] = None) -> str:
+    """Transcribe `buffer`; `prompt` passes preceding text for continuity across segments."""
+    return (await transcribe_timed(buffer, prompt))["text"]
+
+
+async def transcribe_timed(buffer: AudioBuffer, prompt: Optional[str] = None) -> Dict[str, Any]:
+    """One Whisper request: text plus segments timed from the start of `buffer`."""
+    extra = {"prompt": prompt} if prompt else {}
+    key = make_key(buffer.sha256, Config.WHISPER_MODEL, Config.WHISPER_LANGUAGE, "verbose_json", *extra.values())
+
+    async def transcribe(groq_client, audio: AudioBuffer):
+        return await groq_client.audio.transcriptions.with_raw_response.create(
+            file=(audio.filename, audio.reader()),
+            model=Config.WHISPER_MODEL,
+            language=Config.WHISPER_LANGUAGE,
+            response_format="verbose_json",
+            **extra
+        )
+
+    async def transcribe_uncached(audio: AudioBuffer):
+        try:
+            if transcription_cache:
+                cached = await transcription_cache.aget(key)
+                if cached is not None:
+                    logger.info("Transcription cache hit")
+                    return cached
+
+            with stage("whisper"):
+                transcription = await client_pool.run(
+                    "Whisper transcription", lambda groq_client: transcribe(groq_client, audio)
                 )
-            
-            os.unlink(tmp_path)
-            
-            return transcription.text.strip()
-            
-        except Exception as e:
-            last_error = e
-            logger.warning(f"Whisper transcription failed (attempt {attempt + 1}/{max_retries}): {e}")
-            
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-            
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying with next API key...")
-    
-    logger.error(f"All Whisper API keys failed. Last error: {last_error}")
-    raise Exception(f"Whisper transcription failed after {max_retries} attempts: {last_error}")
+        finally:
+            audio.close()
+        result = {"text": transcription.text.strip(), "segments": _whisper_segments(transcription)}
+        if transcription_cache:
+            await transcription_cache.aset(key, result)
+        return result
 
+    def start_flight():
+        # The flight keeps running if this request goes away (other requests may be
+        # waiting on it), so it holds its own reference to the audio.
+        return transcribe_uncached(buffer.retain())
 
-async def extract_audio_duration(audio_file: UploadFile) -> Optional[int]:
     try:
-        import wave
-        import contextlib
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio_file.filename)[1]) as tmp_file:
-            await audio_file.seek(0)
-            content = await audio_file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-        
-        await audio_file.seek(0)
-        
-        with contextlib.closing(wave.open(tmp_path, 'r')) as f:
-            frames = f.getnframes()
-            rate = f.getframerate()
-            duration = int(frames / float(rate))
-        
-        os.unlink(tmp_path)
-        
-        return duration
-        
+        return await transcription_flights.do(key, start_flight)
+    except Exception as e:
+        logger.error(f"Whisper transcription failed: {e}")
+        raise
+
+
+def _whisper_segments(transcription) -> List[Dict[str, Any]]:
+    # verbose_json segments arrive as extra fields, so they may be dicts or objects.
+    segments = []
+    for segment in getattr(transcription, "segments", None) or []:
+        get = segment.get if isinstance(segment, dict) else lambda name: getattr(segment, name, None)
+        if get("start") is None or get("end") is None:
+            continue
+        segments.append({"start": float(get("start")), "end": float(get("end")), "text": (get("text") or "").strip()})
+    return segments
+
+
+def probe_seconds(buffer: AudioBuffer) -> Optional[float]:
+    try:
+        seconds = probe_duration(buffer.view)
+        if seconds is None:
+            logger.warning(f"Could not extract audio duration: unrecognized container ({buffer.extension or 'no extension'})")
+        return seconds
+
     except Exception as e:
         logger.warning(f"Could not extract audio duration: {e}")
         return None
-
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional
+from lexicon import lexicon
+from rubric import rubric
+
+# Whisper takes a short text prompt; the tail of the transcript so far keeps
+# spelling and casing consistent across segment boundaries.
+PROMPT_CHARS = 200
+
+
+class StreamingTranscript:
+    """Running transcript and cheap metrics for audio that arrives in segments.
+
+    Only the lexical pass runs per segment, so partial results cover word
+    count, speech rate, filler rate and vocabulary. Grammar, sentiment and the
+    LLM run once on the full transcript when the stream ends.
+    """
+
+    def __init__(self):
+        self.segments: List[str] = []
+        self.seconds = 0.0
+        self.unknown_durations = 0
+
+    @property
+    def text(self) -> str:
+        return " ".join(segment for segment in self.segments if segment)
+
+    @property
+    def prompt(self) -> Optional[str]:
+        text = self.text
+        return text[-PROMPT_CHARS:] if text else None
+
+    def add_segment(self, text: str, seconds: Optional[float]):
+        self.segments.append(text.strip())
+        if seconds is None:
+            self.unknown_durations += 1
+        else:
+            self.seconds += seconds
+
+    def partial(self) -> Dict[str, Any]:
+        lexical = lexicon.analyze(self.text)
+        word_count = lexical.word_count
+        filler_rate = (lexical.filler_count / word_count) * 100 if word_count else 0
+        # A segment without a readable duration would make WPM meaningless.
+        wpm = (word_count / self.seconds) * 60 if self.seconds and not self.unknown_durations else None
+
+        scores = {}
+        if word_count:
+            scores = {
+                "speech_rate": rubric["speech_rate"].score(wpm),
+                "vocabulary": rubric["vocabulary"].score(lexical.type_token_ratio),
+                "clarity": rubric["clarity"].score(filler_rate),
+            }
+        return {
+            "segments": len(self.segments),
+            "metrics": {
+                "word_count": word_count,
+                "duration": round(self.seconds, 2),
+                "wpm": round(wpm, 1) if wpm is not None else None,
+                "filler_count": lexical.filler_count,
+                "filler_rate": round(filler_rate, 2),
+                "ttr": round(lexical.type_token_ratio, 3),
+            },
+            "scores": scores,
+        }
@@ -0,0 +1,434 @@
+"""Benchmark and load test against a local Groq stand-in.
+
+    python benchmark.py
+    python benchmark.py --targets engine,score --requests 500 --concurrency 32 -o bench.json
+    python benchmark.py --rate-limit 0.1 --malformed 0.05 --baseline bench.json
+    python benchmark.py --url http://127.0.0.1:8000 --groq-url http://127.0.0.1:8090 --targets score,audio
+
+Starts fake_groq.py in a subprocess and points the backend at it through
+GROQ_BASE_URL, so no API quota is spent. Targets:
+
+    engine  ScoringEngine.score_transcript_async, called directly
+    score   POST /score
+    audio   POST /audio/score with synthetic WAV recordings
+
+The app runs in this process (httpx ASGI transport, lifespan included) unless
+--url names a running server, which must already be using the fake. The
+corpus is generated from --seed and the result caches are off unless --cache
+is given, so runs with the same arguments are comparable. The report has
+throughput, p50/p95/p99 latency, per-stage percentiles from `timings`, error
+and fallback counts, and memory. With --baseline, exits 1 when p95 latency or
+throughput regress by more than --max-regression.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TARGETS = ("engine", "score", "audio")
+KEY_VARS = ["GROQ_API_KEY"] + [f"GROQ_API_KEY_ALT_{i}" for i in range(1, 5)]
+PERCENTILES = (50, 95, 99)
+
+# (status, per-stage milliseconds, whether the result used a fallback)
+Outcome = Tuple[int, Dict[str, float], bool]
+
+
+# Corpus
+
+def transcript_corpus(seed: int, size: int) -> List[Tuple[str, int]]:
+    """(transcript, duration) pairs at speaking rates spread over the rubric's bands."""
+    # Imported here: backend modules read Config, which must see configure_environment first.
+    from fake_groq import synthetic_transcript
+
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = synthetic_transcript(rng, filler_rate=rng.choice([0.0, 0.03, 0.08, 0.15]))
+        wpm = rng.uniform(70, 180)
+        corpus.append((text, max(int(len(text.split()) / wpm * 60), 1)))
+    return corpus
+
+
+def synthetic_recording(seed: int, seconds: float) -> bytes:
+    """A WAV of noise bursts at syllable rate separated by pauses, so chunking finds cut points."""
+    from audio_chunking import SAMPLE_RATE, encode_wav
+
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = 0
+    while position < len(samples):
+        talk = int(rng.uniform(0.8, 3.0) * SAMPLE_RATE)
+        t = np.arange(min(talk, len(samples) - position)) / SAMPLE_RATE
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * t))
+        samples[position:position + len(t)] = 0.3 * envelope * rng.standard_normal(len(t))
+        position += talk + int(rng.uniform(0.2, 0.8) * SAMPLE_RATE)
+    return encode_wav(samples)
+
+
+def audio_corpus(seed: int, durations: List[float]) -> List[Tuple[str, bytes]]:
+    return [(f"bench_{i}_{seconds:g}s.wav", synthetic_recording(seed + i, seconds))
+            for i, seconds in enumerate(durations)]
+
+
+# Measurement
+
+def rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    points = np.percentile(np.asarray(values, dtype=np.float64), PERCENTILES)
+    summary = {f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, points)}
+    summary["mean"] = round(float(np.mean(values)), 1)
+    summary["max"] = round(float(np.max(values)), 1)
+    return summary
+
+
+def stage_ms(timings: Dict[str, float], unit: str) -> Dict[str, float]:
+    """Normalize `collect_timings` seconds or response `*_ms` fields to stage -> ms."""
+    if unit == "s":
+        return {name: seconds * 1000 for name, seconds in timings.items()}
+    return {name[:-3] if name.endswith("_ms") else name: value for name, value in timings.items()}
+
+
+async def drive(requests: int, concurrency: int, warmup: int,
+                call: Callable[[int], Awaitable[Outcome]], trace_memory: bool) -> Dict[str, Any]:
+    """Run `call(i)` for i in range(requests) from `concurrency` closed-loop workers."""
+    for i in range(warmup):
+        await call(i)
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    statuses: Counter = Counter()
+    fallbacks = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, fallbacks
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                status, timings, fallback = await call(warmup + index)
+            except Exception as e:
+                status, timings, fallback = 0, {}, False
+                logging.getLogger("nirmaan_ai").error(f"Benchmark request {index} failed: {e}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] += 1
+            fallbacks += fallback
+            for name, value in timings.items():
+                stages.setdefault(name, []).append(value)
+
+    rss_start = rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    elapsed = time.perf_counter() - started
+    traced_peak = None
+    if trace_memory:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    ok = statuses.get(200, 0)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "fallbacks": fallbacks,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles(latencies),
+        "stages_ms": {name: percentiles(values) for name, values in sorted(stages.items())},
+        "memory_mb": {"rss_start": rss_start, "rss_end": rss_mb(), "peak_rss": peak_rss_mb(),
+                      "traced_peak": traced_peak},
+    }
+
+
+def _used_fallback(result: Dict[str, Any]) -> bool:
+    return (result.get("content_analysis") or {}).get("source") == "local_fallback"
+
+
+# Targets
+
+def engine_call(corpus: List[Tuple[str, int]]) -> Callable[[int], Awaitable[Outcome]]:
+    from scoring import engine
+    from metrics import collect_timings
+
+    async def call(i: int) -> Outcome:
+        transcript, duration = corpus[i % len(corpus)]
+        with collect_timings() as timings:
+            result = await engine.score_transcript_async(transcript, duration)
+        return 200, stage_ms(timings, "s"), _used_fallback(result)
+    return call
+
+
+def score_call(client: httpx.AsyncClient, corpus: List[Tuple[str, int]]) -> Callable[[int], Awaitable[Outcome]]:
+    async def call(i: int) -> Outcome:
+        transcript, duration = corpus[i % len(corpus)]
+        response = await client.post("/score", params={"timings": "true"},
+                                     json={"transcript": transcript, "duration": duration})
+        if response.status_code != 200:
+            return response.status_code, {}, False
+        result = response.json()
+        return 200, stage_ms(result.get("timings", {}), "ms"), _used_fallback(result)
+    return call
+
+
+def audio_call(client: httpx.AsyncClient, corpus: List[Tuple[str, bytes]]) -> Callable[[int], Awaitable[Outcome]]:
+    async def call(i: int) -> Outcome:
+        filename, data = corpus[i % len(corpus)]
+        response = await client.post("/audio/score", params={"timings": "true"},
+                                     files={"audio_file": (filename, data, "audio/wav")})
+        if response.status_code != 200:
+            return response.status_code, {}, False
+        result = response.json()
+        return 200, stage_ms(result.get("timings", {}), "ms"), _used_fallback(result)
+    return call
+
+
+# Fake Groq
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_groq(args) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    command = [
+        sys.executable, os.path.join(HERE, "fake_groq.py"), "--port", str(port),
+        "--chat-latency", str(args.chat_latency), "--whisper-latency", str(args.whisper_latency),
+        "--whisper-rtf", str(args.whisper_rtf), "--jitter", str(args.jitter),
+        "--rate-limit", str(args.rate_limit), "--malformed", str(args.malformed),
+        "--retry-after", str(args.retry_after), "--seed", str(args.seed),
+    ]
+    process = subprocess.Popen(command, cwd=HERE)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"fake_groq.py exited with code {process.returncode}")
+        try:
+            httpx.get(f"{url}/fake/stats", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("fake_groq.py did not start within 20s")
+
+
+def fake_groq_stats(url: Optional[str]) -> Optional[Dict[str, int]]:
+    if not url:
+        return None
+    try:
+        return httpx.get(f"{url}/fake/stats", timeout=5).json()
+    except httpx.HTTPError:
+        return None
+
+
+def configure_environment(args, groq_url: str, data_dir: str):
+    """Point the backend at the fake before its modules read Config."""
+    os.environ["GROQ_BASE_URL"] = groq_url
+    # Empty values also keep python-dotenv from loading real keys from .env.
+    for i, name in enumerate(KEY_VARS):
+        os.environ[name] = f"fake-key-{i}" if i < args.keys else ""
+    if not args.cache:
+        os.environ["RESULT_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["TRANSCRIPTION_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["RESULT_CACHE_PATH"] = ""
+    os.environ["FEATURE_STORE_PATH"] = ""
+    os.environ["JOB_QUEUE_DIR"] = data_dir
+
+
+# Baselines
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of p95 latency or throughput beyond `tolerance` (a fraction)."""
+    regressions = []
+    for target, current in report["targets"].items():
+        previous = baseline.get("targets", {}).get(target)
+        if not previous:
+            continue
+        old_p95, new_p95 = previous["latency_ms"].get("p95"), current["latency_ms"].get("p95")
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{target}: p95 latency {old_p95:.1f}ms -> {new_p95:.1f}ms")
+        old_rps, new_rps = previous.get("throughput_rps"), current.get("throughput_rps")
+        if old_rps and new_rps and new_rps < old_rps * (1 - tolerance):
+            regressions.append(f"{target}: throughput {old_rps:.2f}/s -> {new_rps:.2f}/s")
+    return regressions
+
+
+def print_summary(report: Dict[str, Any]):
+    for target, result in report["targets"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{target:>6}: {result['throughput_rps']}/s, p50 {latency['p50']}ms, p95 {latency['p95']}ms, "
+            f"p99 {latency['p99']}ms, {result['errors']} errors, {result['fallbacks']} fallbacks, "
+            f"peak RSS {result['memory_mb']['peak_rss']}MB",
+            file=sys.stderr,
+        )
+        for stage, values in result["stages_ms"].items():
+            print(f"        {stage:<16} p50 {values['p50']:>8} p95 {values['p95']:>8} p99 {values['p99']:>8}",
+                  file=sys.stderr)
+
+
+async def run(args, corpus, recordings) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            for target in args.targets:
+                call = score_call(client, corpus) if target == "score" else audio_call(client, recordings)
+                results[target] = await drive(args.requests, args.concurrency, args.warmup, call, args.trace_memory)
+        return results
+
+    import analyzers
+    from main import app
+
+    # Warm up front so LanguageTool start-up is not measured.
+    await asyncio.to_thread(analyzers.warm_up)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+            for target in args.targets:
+                if target == "engine":
+                    call = engine_call(corpus)
+                elif target == "score":
+                    call = score_call(client, corpus)
+                else:
+                    call = audio_call(client, recordings)
+                results[target] = await drive(args.requests, args.concurrency, args.warmup, call, args.trace_memory)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scoring against a local Groq stand-in.")
+    parser.add_argument("--targets", default="engine,score,audio",
+                        help=f"Comma-separated targets from {', '.join(TARGETS)}")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per target")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per target")
+    parser.add_argument("--corpus", type=int, default=50, help="Distinct synthetic transcripts")
+    parser.add_argument("--audio-seconds", default="15,40,90,180",
+                        help="Comma-separated durations of the synthetic recordings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Leave the result caches on")
+    parser.add_argument("--keys", type=int, default=3, choices=range(1, len(KEY_VARS) + 1),
+                        help="Fake API keys to configure")
+    parser.add_argument("--url", help="Benchmark a running server instead of the app in this process")
+    parser.add_argument("--groq-url", help="Use an already running fake_groq.py")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per HTTP request")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report peak Python allocations per target (slows every request)")
+
+    fake = parser.add_argument_group("fake Groq behaviour (ignored with --groq-url)")
+    fake.add_argument("--chat-latency", type=float, default=0.4)
+    fake.add_argument("--whisper-latency", type=float, default=0.3)
+    fake.add_argument("--whisper-rtf", type=float, default=0.02)
+    fake.add_argument("--jitter", type=float, default=0.25)
+    fake.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of Groq requests answered with 429")
+    fake.add_argument("--malformed", type=float, default=0.0, help="Fraction of Groq responses with broken JSON")
+    fake.add_argument("--retry-after", type=float, default=1.0)
+
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed p95/throughput regression against --baseline, as a fraction")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+
+    args = parser.parse_args(argv)
+    args.targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    unknown = [target for target in args.targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    if args.url and "engine" in args.targets:
+        parser.error("the engine target needs the app in this process; drop --url or the target")
+    args.audio_seconds = [float(value) for value in args.audio_seconds.split(",") if value.strip()]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    fake_process = None
+    groq_url = args.groq_url
+    if not groq_url and not args.url:
+        fake_process, groq_url = start_fake_groq(args)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="nirmaan-bench-") as data_dir:
+            if not args.url:
+                configure_environment(args, groq_url, data_dir)
+                from logs import logger
+                if not args.verbose:
+                    logger.setLevel(logging.WARNING)
+
+            corpus = transcript_corpus(args.seed, args.corpus)
+            recordings = audio_corpus(args.seed, args.audio_seconds) if "audio" in args.targets else []
+            started = time.monotonic()
+            results = asyncio.run(run(args, corpus, recordings))
+    finally:
+        stats = fake_groq_stats(groq_url)
+        if fake_process is not None:
+            fake_process.terminate()
+            fake_process.wait(timeout=10)
+
+    report = {
+        "started_at": time.time(),
+        "seconds": round(time.monotonic() - started, 1),
+        "settings": {name: value for name, value in vars(args).items()
+                     if name not in ("output", "baseline", "verbose")},
+        "targets": results,
+        "fake_groq": stats,
+    }
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
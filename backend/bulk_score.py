@@ -0,0 +1,191 @@
+"""Offline bulk scoring of transcript archives.
+
+    python bulk_score.py transcripts.jsonl -o scores.jsonl
+    python bulk_score.py term_end.csv -o scores.jsonl --workers 8 --llm-concurrency 16
+
+Input rows need a `transcript` field and may carry `duration` (seconds) and `id`.
+Rows stream through a bounded window: rule-based metrics run in a process pool,
+LLM calls fan out asynchronously, and results are written to JSONL in input
+order. A checkpoint next to the output records how many rows are done and the
+matching output offset, so an interrupted run resumes where it stopped. An
+existing output without a checkpoint is only replaced with --overwrite.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+from config import Config
+from logs import logger
+from scoring import engine
+
+
+def read_rows(path: str, fmt: str, skip: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row_index, row) lazily, skipping the first `skip` rows cheaply."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for index, row in enumerate(csv.DictReader(f)):
+                if index >= skip:
+                    yield index, row
+            return
+
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if index >= skip:
+                try:
+                    yield index, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield index, {"_error": f"Invalid JSON: {e}"}
+            index += 1
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _parse_duration(value: Any) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def score_row(index: int, row: Dict[str, Any], llm_limit: asyncio.Semaphore, pool: ProcessPoolExecutor):
+    record = {"row": index, "id": row.get("id")}
+    if "_error" in row:
+        record["error"] = row["_error"]
+        return record
+
+    transcript = (row.get("transcript") or "").strip()
+    if not transcript:
+        record["error"] = "Transcript is required"
+        return record
+
+    try:
+        record["result"] = await engine.score_transcript_async(
+            transcript, _parse_duration(row.get("duration")), llm_limit=llm_limit, rule_executor=pool,
+            record_id=None if row.get("id") is None else str(row["id"]),
+        )
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+async def run(args) -> int:
+    checkpoint_path = args.checkpoint or f"{args.output}.ckpt"
+    checkpoint = {} if args.overwrite else load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get("input") != os.path.abspath(args.input):
+        raise SystemExit(f"Checkpoint {checkpoint_path} belongs to a different input: {checkpoint.get('input')}")
+    output_exists = os.path.exists(args.output)
+    if not checkpoint and output_exists and os.path.getsize(args.output) and not args.overwrite:
+        raise SystemExit(f"{args.output} already has results but no checkpoint at {checkpoint_path}; "
+                         "pass --checkpoint to resume or --overwrite to replace it")
+    if checkpoint.get("output_bytes") and not output_exists:
+        raise SystemExit(f"Checkpoint {checkpoint_path} is for results in {args.output}, which is missing")
+
+    rows_done = checkpoint.get("rows_done", 0)
+    output_bytes = checkpoint.get("output_bytes", 0)
+    if rows_done:
+        logger.warning(f"Resuming after {rows_done} rows from {checkpoint_path}")
+
+    mode = "r+b" if output_exists else "wb"
+    out = open(args.output, mode)
+    # Drop anything written after the last checkpoint; those rows are scored again.
+    out.truncate(output_bytes)
+    out.seek(output_bytes)
+
+    state = {"input": os.path.abspath(args.input), "rows_done": rows_done, "output_bytes": output_bytes}
+    llm_limit = asyncio.Semaphore(args.llm_concurrency)
+    started = time.monotonic()
+    errors = 0
+
+    def write(record):
+        nonlocal errors
+        if "error" in record:
+            errors += 1
+        out.write((json.dumps(record) + "\n").encode("utf-8"))
+        state["rows_done"] += 1
+
+        if state["rows_done"] % args.checkpoint_every == 0:
+            commit()
+            rate = (state["rows_done"] - rows_done) / max(time.monotonic() - started, 1e-9)
+            print(f"{state['rows_done']} rows done ({rate:.1f}/s, {errors} errors)", file=sys.stderr)
+
+    def commit():
+        out.flush()
+        os.fsync(out.fileno())
+        state["output_bytes"] = out.tell()
+        save_checkpoint(checkpoint_path, state)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            in_flight = deque()
+            for index, row in read_rows(args.input, args.format, skip=rows_done):
+                in_flight.append(asyncio.create_task(score_row(index, row, llm_limit, pool)))
+                # Results are written in input order, so the window also bounds memory.
+                if len(in_flight) >= args.window:
+                    write(await in_flight.popleft())
+
+            while in_flight:
+                write(await in_flight.popleft())
+    finally:
+        commit()
+        out.close()
+
+    print(f"Finished: {state['rows_done']} rows, {errors} errors in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV archive of transcripts.")
+    parser.add_argument("input", help="JSONL or CSV file with a `transcript` column")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write results to")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for rule-based scoring")
+    parser.add_argument("--llm-concurrency", type=int, default=Config.BATCH_LLM_CONCURRENCY,
+                        help="Maximum LLM calls in flight")
+    parser.add_argument("--window", type=int, default=256, help="Maximum rows in flight")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="Rows between checkpoints")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Start over, replacing an existing output and ignoring its checkpoint")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+
+    args = parser.parse_args(argv)
+    if not args.format:
+        args.format = "csv" if args.input.lower().endswith(".csv") else "jsonl"
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,7 +17,140 @@ class Config:
     GROQ_API_KEYS = [key for key in GROQ_API_KEYS if key]
 
     MODEL_NAME = "llama-3.3-70b-versatile"
-    
+
+    RULE_BASED_WORKERS = int(os.getenv("RULE_BASED_WORKERS", "4"))
+
+    # Analyzers warm up in the background after startup. Until then requests are served with
+    # fallback grammar scores, or rejected with 503 when SERVE_BEFORE_READY is false.
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+    SERVE_BEFORE_READY = os.getenv("SERVE_BEFORE_READY", "true").lower() == "true"
+
+    # One warm LanguageTool JVM per pool slot, or pooled HTTP to LANGUAGETOOL_SERVER_URL when set.
+    LANGUAGETOOL_POOL_SIZE = int(os.getenv("LANGUAGETOOL_POOL_SIZE", "1"))
+    LANGUAGETOOL_SERVER_URL = os.getenv("LANGUAGETOOL_SERVER_URL")
+    GRAMMAR_ACQUIRE_TIMEOUT = float(os.getenv("GRAMMAR_ACQUIRE_TIMEOUT", "2"))
+    GRAMMAR_CHECK_TIMEOUT = float(os.getenv("GRAMMAR_CHECK_TIMEOUT", "5"))
+    GRAMMAR_FALLBACK_SCORE = int(os.getenv("GRAMMAR_FALLBACK_SCORE", "10"))
+
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+    GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+    GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "60"))
+
+    GROQ_MAX_ATTEMPTS = int(os.getenv("GROQ_MAX_ATTEMPTS", "4"))
+    KEY_BACKOFF_BASE_SECONDS = float(os.getenv("KEY_BACKOFF_BASE_SECONDS", "0.5"))
+    KEY_BACKOFF_MAX_SECONDS = float(os.getenv("KEY_BACKOFF_MAX_SECONDS", "8"))
+    KEY_MAX_WAIT_SECONDS = float(os.getenv("KEY_MAX_WAIT_SECONDS", "10"))
+    KEY_AUTH_COOLDOWN_SECONDS = float(os.getenv("KEY_AUTH_COOLDOWN_SECONDS", "300"))
+
+    # `python main.py` with WORKERS > 1 forks that many server processes (see prefork.py). They
+    # share API key usage, metrics and (by default) the result caches through SHARED_STATE_PATH,
+    # a SQLite file in WAL mode; workers publish their metrics every METRICS_SYNC_SECONDS.
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH") or (
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shared.sqlite3") if WORKERS > 1 else None
+    )
+    METRICS_SYNC_SECONDS = float(os.getenv("METRICS_SYNC_SECONDS", "5"))
+    # Workers merge API key usage every KEY_SYNC_SECONDS, and at once when a key goes on cooldown.
+    KEY_SYNC_SECONDS = float(os.getenv("KEY_SYNC_SECONDS", "1"))
+
+    # Set RESULT_CACHE_MAX_ENTRIES=0 to disable; RESULT_CACHE_PATH adds a SQLite file that survives restarts.
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+    RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", SHARED_STATE_PATH)
+
+    # Directory for raw scoring features (see feature_store.py); unset disables recording.
+    FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH")
+    FEATURE_STORE_FLUSH_ROWS = int(os.getenv("FEATURE_STORE_FLUSH_ROWS", "256"))
+
+    WHISPER_MODEL = "whisper-large-v3"
+    WHISPER_LANGUAGE = "en"
+    # Recordings longer than WHISPER_CHUNK_MIN_SECONDS (or larger than the API upload
+    # limit) are split at pauses into ~WHISPER_CHUNK_SECONDS chunks transcribed in parallel.
+    WHISPER_CHUNK_MIN_SECONDS = float(os.getenv("WHISPER_CHUNK_MIN_SECONDS", "45"))
+    WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "30"))
+    WHISPER_CHUNK_OVERLAP_SECONDS = float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "1.5"))
+    WHISPER_CHUNK_SEARCH_SECONDS = float(os.getenv("WHISPER_CHUNK_SEARCH_SECONDS", "5"))
+    WHISPER_CHUNK_CONCURRENCY = int(os.getenv("WHISPER_CHUNK_CONCURRENCY", "8"))
+    WHISPER_MAX_UPLOAD_BYTES = int(os.getenv("WHISPER_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", "512"))
+    TRANSCRIPTION_CACHE_TTL_SECONDS = float(os.getenv("TRANSCRIPTION_CACHE_TTL_SECONDS", "86400"))
+
+    # Uploads larger than this spill from memory to a memory-mapped temp file.
+    AUDIO_SPOOL_MAX_BYTES = int(os.getenv("AUDIO_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Submit/poll jobs (/jobs): SQLite queue and stored audio live in JOB_QUEUE_DIR.
+    JOB_QUEUE_DIR = os.getenv("JOB_QUEUE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+    JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+    JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+    JOB_CALLBACK_ATTEMPTS = int(os.getenv("JOB_CALLBACK_ATTEMPTS", "3"))
+    # When set, callbacks carry X-Nirmaan-Signature: sha256=<HMAC of the body>.
+    JOB_CALLBACK_SECRET = os.getenv("JOB_CALLBACK_SECRET")
+    # Callbacks to loopback, link-local, private or reserved addresses are refused. When set
+    # (comma-separated host names), only these hosts are accepted, internal ones included.
+    JOB_CALLBACK_ALLOWED_HOSTS = [
+        h.strip().lower() for h in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()
+    ]
+
+    # Admission control (see admission.py). Per lane: requests in flight, requests queued for a
+    # slot, and seconds a queued request waits before a 503. Lanes share ADMISSION_MAX_IN_FLIGHT;
+    # "normal" and "low" priority lanes only get ADMISSION_PRIORITY_SHARES of it.
+    ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "48"))
+    ADMISSION_PRIORITY_SHARES = {"high": 1.0, "normal": 0.5, "low": 0.25}
+    ADMISSION_LANES = {
+        "text": {
+            "priority": "high",
+            "concurrency": int(os.getenv("ADMISSION_TEXT_CONCURRENCY", "32")),
+            "queue": int(os.getenv("ADMISSION_TEXT_QUEUE", "64")),
+            "queue_timeout": float(os.getenv("ADMISSION_TEXT_QUEUE_TIMEOUT", "2")),
+            "shed_llm": True,
+        },
+        "audio": {
+            "priority": "normal",
+            "concurrency": int(os.getenv("ADMISSION_AUDIO_CONCURRENCY", "8")),
+            "queue": int(os.getenv("ADMISSION_AUDIO_QUEUE", "16")),
+            "queue_timeout": float(os.getenv("ADMISSION_AUDIO_QUEUE_TIMEOUT", "10")),
+            "shed_llm": True,
+        },
+        "batch": {
+            "priority": "low",
+            "concurrency": int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "2")),
+            "queue": int(os.getenv("ADMISSION_BATCH_QUEUE", "4")),
+            "queue_timeout": float(os.getenv("ADMISSION_BATCH_QUEUE_TIMEOUT", "30")),
+        },
+    }
+    # Upload bytes (by Content-Length) that requests in flight may hold at once.
+    ADMISSION_UPLOAD_BUDGET_BYTES = int(os.getenv("ADMISSION_UPLOAD_BUDGET_BYTES", str(256 * 1024 * 1024)))
+    # Score text and audio requests with local content analysis only while this many Groq
+    # content-analysis calls are in flight or every API key is cooling down.
+    ADMISSION_RULE_ONLY_FALLBACK = os.getenv("ADMISSION_RULE_ONLY_FALLBACK", "false").lower() == "true"
+    ADMISSION_LLM_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_LLM_MAX_IN_FLIGHT", "32"))
+
+    # Profiling (see profiling.py): requests with X-Admin-Token set to PROFILING_ADMIN_TOKEN and
+    # X-Profile (or ?profile=) "sample" or "cprofile" are profiled; profiles go to PROFILE_DIR.
+    PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles"))
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+    # Requests slower than SLOW_REQUEST_SECONDS get the stack samples taken while they ran saved
+    # as profiles; 0 disables the sampler. It keeps the last SLOW_REQUEST_WINDOW_SECONDS.
+    SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+    SLOW_REQUEST_SAMPLE_INTERVAL_MS = float(os.getenv("SLOW_REQUEST_SAMPLE_INTERVAL_MS", "10"))
+    SLOW_REQUEST_WINDOW_SECONDS = float(os.getenv("SLOW_REQUEST_WINDOW_SECONDS", "120"))
+
+    # Draft sessions (/drafts) for incremental re-scoring while a transcript is edited.
+    DRAFT_MAX_SESSIONS = int(os.getenv("DRAFT_MAX_SESSIONS", "1000"))
+    DRAFT_TTL_SECONDS = float(os.getenv("DRAFT_TTL_SECONDS", "1800"))
+
+    # WebSocket streaming (/audio/stream): limits per segment message and per session.
+    STREAM_MAX_SEGMENT_BYTES = int(os.getenv("STREAM_MAX_SEGMENT_BYTES", str(10 * 1024 * 1024)))
+    STREAM_MAX_SEGMENTS = int(os.getenv("STREAM_MAX_SEGMENTS", "360"))
 
     BACKEND_URL = os.getenv("BACKEND_URL")
     FRONTEND_URL = os.getenv("FRONTEND_URL")
@@ -51,6 +184,9 @@ class Config:
     }
 
 
+    # Content & Structure points per matched keyword category, capped by RUBRIC keyword_presence.
+    KEYWORD_POINTS = {"must_have": 4, "good_to_have": 2}
+
     SPEECH_RATE_THRESHOLDS = {
         "too_fast": 161,
         "fast_min": 141,
@@ -102,6 +238,34 @@ class Config:
         "strength": ["strength", "achievement"]
     }
 
+    # Phrases the local content analyzer looks for; tiers match the salutation points in SYSTEM_PROMPT.
+    SALUTATION_PHRASES = {
+        "Excellent": ["excited to introduce", "feeling great", "thrilled to", "pleasure to introduce",
+                      "happy to introduce", "glad to introduce", "delighted to"],
+        "Good": ["good morning", "good afternoon", "good evening", "hello everyone", "hi everyone",
+                 "greetings", "respected", "dear friends"],
+        "Normal": ["hi", "hello", "hey"]
+    }
+
+    CLOSING_PHRASES = ["thank you", "thanks", "that is all", "that's all", "that is it",
+                       "nice to meet you", "have a great day", "have a nice day"]
+
+    # Must-have categories that count as "Basic Details" for the flow check.
+    FLOW_BASIC_CATEGORIES = ["name", "age", "school"]
+
+    # "llm": LLM decides salutation/keywords/flow; "local": deterministic rules only;
+    # "hybrid": local rules, calling the LLM only below LOCAL_CONFIDENCE_THRESHOLD.
+    CONTENT_ANALYSIS_MODE = os.getenv("CONTENT_ANALYSIS_MODE", "llm").lower()
+    LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.75"))
+
+    # Pack transcripts awaiting LLM content analysis into shared requests (see llm_packing.py):
+    # up to LLM_PACK_MAX_ITEMS per request within LLM_PACK_MAX_TOKENS (estimated prompt plus
+    # reply), waiting at most LLM_PACK_WAIT_MS for a pack to fill.
+    LLM_PACKING = os.getenv("LLM_PACKING", "false").lower() == "true"
+    LLM_PACK_MAX_ITEMS = int(os.getenv("LLM_PACK_MAX_ITEMS", "8"))
+    LLM_PACK_MAX_TOKENS = int(os.getenv("LLM_PACK_MAX_TOKENS", "6000"))
+    LLM_PACK_WAIT_MS = float(os.getenv("LLM_PACK_WAIT_MS", "50"))
+
     FILLER_WORDS = [
         "um", "uh", "like", "you know", "so", "actually", "basically",
         "right", "i mean", "well", "kinda", "sort of", "okay", "hmm", "ah"
@@ -0,0 +1,301 @@
+"""Draft sessions: incremental re-scoring while a transcript is being edited.
+
+A draft keeps per-sentence analysis (LanguageTool error count, VADER compound,
+filler and keyword hits) keyed by sentence text. Each revision is split into
+sentences and only those not already analyzed are checked; the rubric totals
+are then re-aggregated from the kept results. Grammar errors are counted per
+sentence, so a match spanning a sentence boundary is not found. The lexical
+pass and VADER over the full text take well under a millisecond and are
+simply repeated on the rule-based executor, which keeps keyword order, flow
+and engagement identical to /score.
+
+LLM content analysis is reused while the structure signature (salutation,
+keyword categories in order of first mention, closing) stays the same. When
+it changes, the LLM is asked in the background and the revision is answered
+right away with local content analysis and `llm_pending`; GET /drafts/{id}
+returns the result with the LLM answer once it has arrived. A failed LLM call
+is not kept; the signature is asked again after `LLM_RETRY_SECONDS`.
+"""
+import re
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel
+from config import Config
+from logs import logger
+from scoring import engine
+from grammar import grammar_checker
+from analyzers import get_sentiment_analyzer
+from lexicon import LexicalAnalysis, lexicon
+from local_rules import ContentAnalysis, analyze_content
+from result_cache import make_key
+from metrics import collect_timings, record_stage, stage, timings_ms
+
+router = APIRouter(prefix="/drafts", tags=["Drafts"])
+
+_SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+# Structure signatures whose LLM answers a draft keeps, for edits that are undone.
+LLM_RESULTS_PER_DRAFT = 8
+# After a failed LLM call, revisions with the same signature use local analysis this long.
+LLM_RETRY_SECONDS = 30
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_RE.findall(text) if sentence.strip()]
+
+
+class SentenceAnalysis:
+    def __init__(self, text: str, lexical: LexicalAnalysis, grammar_errors: Optional[int], sentiment: Optional[float]):
+        self.text = text
+        self.word_count = lexical.word_count
+        self.filler_hits = dict(lexical.filler_hits)
+        self.keywords = sorted({category for group, category in lexical.keyword_hits
+                                if group in ("must_have", "good_to_have")})
+        self.grammar_errors = grammar_errors
+        self.sentiment = sentiment
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "word_count": self.word_count,
+            "grammar_errors": self.grammar_errors,
+            "sentiment": self.sentiment,
+            "filler_hits": self.filler_hits,
+            "keywords": self.keywords,
+        }
+
+
+def analyze_sentence(text: str) -> SentenceAnalysis:
+    """Blocking per-sentence checks; runs on the engine's rule-based executor."""
+    lexical = lexicon.analyze(text)
+    errors = grammar_checker.count_errors(text) if lexical.word_count else 0
+    analyzer = get_sentiment_analyzer()
+    sentiment = analyzer.polarity_scores(text)["compound"] if analyzer else None
+    return SentenceAnalysis(text, lexical, errors, sentiment)
+
+
+def draft_metrics(transcript: str, duration: Optional[int], grammar_errors: Optional[int]):
+    """Blocking full-text pass (lexicon, VADER, rubric inputs) with the per-sentence grammar total."""
+    lexical = lexicon.analyze(transcript)
+    if not lexical.word_count:
+        return lexical, None
+    return lexical, engine.raw_metrics(transcript, duration, lexical, count_errors=lambda _: grammar_errors)
+
+
+def structure_signature(lexical: LexicalAnalysis, local: ContentAnalysis) -> str:
+    """What the LLM's salutation, keyword and flow judgement depends on."""
+    mentions = sorted(
+        (hits[0][0], group, category)
+        for (group, category), hits in lexical.keyword_hits.items()
+        if group in ("must_have", "good_to_have")
+    )
+    closing = bool(lexical.keyword_hits.get(("closing", "closing")))
+    return make_key(local.salutation_level, [(group, category) for _, group, category in mentions], closing)
+
+
+class Draft:
+    def __init__(self, draft_id: str):
+        self.id = draft_id
+        self.revision = 0
+        self.transcript = ""
+        self.duration: Optional[int] = None
+        self.sentences: Dict[str, SentenceAnalysis] = {}
+        self.changes = {"changed": 0, "reused": 0, "removed": 0}
+        self.touched = time.monotonic()
+        self.lock = asyncio.Lock()
+        # structure signature -> LLM content fields
+        self.llm_results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.llm_tasks: Dict[str, asyncio.Task] = {}
+        # structure signature -> monotonic time of the last failed LLM call
+        self.llm_failures: Dict[str, float] = {}
+
+    async def revise(self, transcript: str, duration: Optional[int]):
+        previous = self.sentences
+        sentences = split_sentences(transcript)
+        unique = list(dict.fromkeys(sentences))
+        # Sentences whose grammar check was skipped (busy or warming checker) are checked again.
+        pending = [s for s in unique if s not in previous
+                   or (previous[s].grammar_errors is None and grammar_checker.configured)]
+
+        loop = asyncio.get_running_loop()
+        with stage("draft_sentences"):
+            analyzed = await asyncio.gather(*(
+                loop.run_in_executor(engine.executor, analyze_sentence, sentence) for sentence in pending
+            ))
+        fresh = dict(zip(pending, analyzed))
+
+        self.sentences = {sentence: fresh.get(sentence) or previous[sentence] for sentence in unique}
+        self.changes = {
+            "changed": sum(sentence not in previous for sentence in unique),
+            "reused": sum(sentence in previous for sentence in unique),
+            "removed": sum(sentence not in self.sentences for sentence in previous),
+        }
+        self.transcript = transcript
+        self.duration = duration
+        self.revision += 1
+
+    async def result(self) -> Dict[str, Any]:
+        """Re-aggregate the current revision from the kept sentence results."""
+        sentences = split_sentences(self.transcript)
+        draft_info = {"draft_id": self.id, "revision": self.revision, "sentences": len(sentences), **self.changes}
+        errors = [self.sentences[sentence].grammar_errors for sentence in sentences]
+        total_errors = None if any(count is None for count in errors) else sum(errors)
+        lexical, metrics = await asyncio.get_running_loop().run_in_executor(
+            engine.executor, draft_metrics, self.transcript, self.duration, total_errors
+        )
+        if metrics is None:
+            return {"overall_score": None, "breakdown": [], "draft": draft_info, "sentences": []}
+
+        # Grammar was counted per sentence in `revise`; only VADER ran here.
+        if "vader" in metrics["timings"]:
+            record_stage("vader", metrics["timings"]["vader"])
+        rb_metrics = engine.score_raw_metrics(metrics)
+
+        local = analyze_content(lexical)
+        content, source, pending = self._content(lexical, local)
+        result = engine.build_result(rb_metrics, content, self.duration)
+        result["content_analysis"] = {"source": source, "local_confidence": local.confidence, "llm_pending": pending}
+        result["draft"] = draft_info
+        result["sentences"] = [self.sentences[sentence].to_dict() for sentence in sentences]
+        return result
+
+    def _content(self, lexical: LexicalAnalysis, local: ContentAnalysis):
+        """(content fields, source, llm_pending) for the current revision."""
+        mode = Config.CONTENT_ANALYSIS_MODE
+        use_llm = mode == "llm" or (mode == "hybrid" and local.confidence < Config.LOCAL_CONFIDENCE_THRESHOLD)
+        if not use_llm:
+            return local.content(), "local", False
+
+        signature = structure_signature(lexical, local)
+        if signature in self.llm_results:
+            self.llm_results.move_to_end(signature)
+            return self.llm_results[signature], "llm", False
+        failed_at = self.llm_failures.get(signature)
+        if failed_at is not None and time.monotonic() - failed_at < LLM_RETRY_SECONDS:
+            return local.content(), "local_fallback", False
+
+        if signature not in self.llm_tasks:
+            task = asyncio.get_running_loop().create_task(self._query_llm(signature, self.transcript))
+            self.llm_tasks[signature] = task
+        return local.content(), "local", True
+
+    async def _query_llm(self, signature: str, transcript: str):
+        try:
+            content = await engine.llm_content(transcript)
+        except Exception as e:
+            logger.error(f"Draft {self.id}: LLM content analysis failed: {e}")
+            content = None
+        finally:
+            self.llm_tasks.pop(signature, None)
+        # Failures are not kept as answers; the signature is asked again after LLM_RETRY_SECONDS.
+        if content is None:
+            self.llm_failures[signature] = time.monotonic()
+            return
+        self.llm_failures.pop(signature, None)
+        self.llm_results[signature] = content
+        while len(self.llm_results) > LLM_RESULTS_PER_DRAFT:
+            self.llm_results.popitem(last=False)
+
+    def close(self):
+        for task in self.llm_tasks.values():
+            task.cancel()
+
+
+class DraftStore:
+    """In-memory drafts, least recently used first out, expiring after `ttl_seconds` idle."""
+
+    def __init__(self, max_drafts: int, ttl_seconds: float):
+        self.max_drafts = max_drafts
+        self.ttl_seconds = ttl_seconds
+        self._drafts: "OrderedDict[str, Draft]" = OrderedDict()
+
+    def create(self) -> Draft:
+        self._expire()
+        draft = Draft(uuid.uuid4().hex)
+        self._drafts[draft.id] = draft
+        while len(self._drafts) > self.max_drafts:
+            _, evicted = self._drafts.popitem(last=False)
+            evicted.close()
+        return draft
+
+    def get(self, draft_id: str) -> Optional[Draft]:
+        self._expire()
+        draft = self._drafts.get(draft_id)
+        if draft is None:
+            return None
+        draft.touched = time.monotonic()
+        self._drafts.move_to_end(draft_id)
+        return draft
+
+    def delete(self, draft_id: str):
+        draft = self._drafts.pop(draft_id, None)
+        if draft is not None:
+            draft.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"drafts": len(self._drafts), "max_drafts": self.max_drafts, "ttl_seconds": self.ttl_seconds}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._drafts:
+            draft_id, draft = next(iter(self._drafts.items()))
+            if draft.touched >= cutoff:
+                break
+            del self._drafts[draft_id]
+            draft.close()
+
+
+drafts = DraftStore(Config.DRAFT_MAX_SESSIONS, Config.DRAFT_TTL_SECONDS)
+
+
+class DraftRequest(BaseModel):
+    transcript: str = ""
+    duration: Optional[int] = None
+
+
+def _get_draft(draft_id: str) -> Draft:
+    draft = drafts.get(draft_id)
+    if draft is None:
+        raise HTTPException(status_code=404, detail="Draft not found or expired")
+    return draft
+
+
+async def _revise(draft: Draft, request: DraftRequest, timings: bool) -> Dict[str, Any]:
+    with collect_timings() as stage_timings:
+        async with draft.lock:
+            await draft.revise(request.transcript, request.duration)
+            result = await draft.result()
+    if timings:
+        result["timings"] = timings_ms(stage_timings)
+    return result
+
+
+@router.post("", status_code=201)
+async def create_draft(request: DraftRequest, timings: bool = False):
+    return await _revise(drafts.create(), request, timings)
+
+
+@router.get("/stats")
+async def draft_stats():
+    return drafts.stats()
+
+
+@router.put("/{draft_id}")
+async def revise_draft(draft_id: str, request: DraftRequest, timings: bool = False):
+    return await _revise(_get_draft(draft_id), request, timings)
+
+
+@router.get("/{draft_id}")
+async def get_draft(draft_id: str):
+    draft = _get_draft(draft_id)
+    async with draft.lock:
+        return await draft.result()
+
+
+@router.delete("/{draft_id}", status_code=204)
+async def delete_draft(draft_id: str):
+    drafts.delete(draft_id)
+    return Response(status_code=204)
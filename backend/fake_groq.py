@@ -0,0 +1,346 @@
+"""Local stand-in for the Groq API, for benchmarks and offline development.
+
+    python fake_groq.py --port 8090 --chat-latency 0.4 --rate-limit 0.05 --malformed 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=fake uvicorn main:app
+
+Serves the two endpoints the backend uses, `chat/completions` and
+`audio/transcriptions`, with configurable latency, 429 responses (with
+Retry-After and rate-limit headers) and malformed JSON bodies. Answers are
+synthetic but shaped like the real ones: chat replies carry the JSON analysis
+requested by SYSTEM_PROMPT, and transcriptions return a self-introduction
+whose length follows the audio duration, with verbose_json segments.
+Randomness is seeded, so runs with the same settings see the same failure
+rates. GET /fake/stats reports what was served.
+"""
+import io
+import re
+import sys
+import json
+import time
+import wave
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import uvicorn
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from config import Config
+
+# Roughly the speaking rate of a student introduction.
+WORDS_PER_SECOND = 2.2
+SEGMENT_SECONDS = 5.0
+
+_OPENINGS = ["Good morning everyone.", "Hello everyone.", "Hi.", "I am excited to introduce myself.", ""]
+_SENTENCES = [
+    "My name is {name}.",
+    "I am {age} years old.",
+    "I study in class {grade} at {school}.",
+    "I live with my family, my mother, my father and my {sibling}.",
+    "My hobby is {hobby} and I also enjoy {hobby2}.",
+    "I am from {city}.",
+    "My dream is to become a {job} one day.",
+    "A fun fact about me is that I {fact}.",
+    "My strength is that I am {trait}.",
+]
+_FILLERS = ["um", "uh", "like", "you know", "basically", "so"]
+_CLOSINGS = ["Thank you.", "Thank you for listening.", "That is all about me.", ""]
+_WORDS = {
+    "name": ["Ravi", "Ananya", "Kabir", "Meera", "Arjun", "Sara", "Vikram", "Diya"],
+    "age": ["twelve", "thirteen", "fourteen", "fifteen"],
+    "grade": ["seven", "eight", "nine", "ten"],
+    "school": ["Green Valley School", "Sunrise Public School", "St. Mary's School"],
+    "sibling": ["younger brother", "elder sister", "little sister"],
+    "hobby": ["playing cricket", "reading books", "painting", "dancing", "coding"],
+    "hobby2": ["music", "chess", "swimming", "cooking"],
+    "city": ["Pune", "Jaipur", "Chennai", "Lucknow"],
+    "job": ["doctor", "scientist", "teacher", "pilot", "engineer"],
+    "fact": ["can solve a cube in a minute", "have never missed a school day", "collect old coins"],
+    "trait": ["hardworking", "curious", "patient", "honest"],
+}
+
+
+def synthetic_transcript(rng: random.Random, target_words: Optional[int] = None, filler_rate: float = 0.05) -> str:
+    """A self-introduction in the shape students give, with some filler words."""
+    words = {name: rng.choice(choices) for name, choices in _WORDS.items()}
+    sentences = [rng.choice(_OPENINGS)]
+    body = _SENTENCES[:3] + rng.sample(_SENTENCES[3:], rng.randint(2, len(_SENTENCES) - 3))
+    sentences.extend(sentence.format(**words) for sentence in body)
+    sentences.append(rng.choice(_CLOSINGS))
+    text = " ".join(sentence for sentence in sentences if sentence)
+
+    tokens = text.split()
+    if target_words:
+        # Long recordings: keep talking about hobbies until the target length.
+        while len(tokens) < target_words:
+            tokens.extend(f"I really like {rng.choice(_WORDS['hobby'])} with my friends.".split())
+        tokens = tokens[:max(target_words, 1)]
+    out = []
+    for token in tokens:
+        if rng.random() < filler_rate:
+            out.append(rng.choice(_FILLERS) + ",")
+        out.append(token)
+    return " ".join(out)
+
+
+def _audio_seconds(data: bytes) -> float:
+    """Duration of a WAV upload; other formats are estimated from size (~128 kbit/s)."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(data), "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    return len(data) / 16000
+
+
+def _content_analysis(transcript: str) -> Dict[str, Any]:
+    """What a well-behaved LLM would answer for SYSTEM_PROMPT."""
+    text = transcript.lower()
+    salutation = "No Salutation"
+    for level in ("Excellent", "Good", "Normal"):
+        if any(re.search(rf"\b{re.escape(phrase)}\b", text) for phrase in Config.SALUTATION_PHRASES[level]):
+            salutation = level
+            break
+    found = [
+        category.title()
+        for keywords in (Config.MUST_HAVE_KEYWORDS, Config.GOOD_TO_HAVE_KEYWORDS)
+        for category, phrases in keywords.items()
+        if any(phrase in text for phrase in phrases)
+    ]
+    return {
+        "Salutation Level": salutation,
+        "Keyword Presence": found,
+        "Flow": "Order followed",
+        "Engagement/Sentiment": "Positive",
+    }
+
+
+def _packed_analysis(transcript: str) -> Dict[str, Any]:
+    """The same analysis in the schema of llm_packing.PACKED_PROMPT."""
+    text = transcript.lower()
+    analysis = _content_analysis(transcript)
+    return {
+        "salutation": "none" if analysis["Salutation Level"] == "No Salutation" else analysis["Salutation Level"].lower(),
+        "must_have": [category for category, phrases in Config.MUST_HAVE_KEYWORDS.items()
+                      if any(phrase in text for phrase in phrases)],
+        "good_to_have": [category for category, phrases in Config.GOOD_TO_HAVE_KEYWORDS.items()
+                         if any(phrase in text for phrase in phrases)],
+        "flow": True,
+        "sentiment": "positive",
+    }
+
+
+def _packed_transcripts(payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """id -> transcript when the request is a packed one (a JSON object as the user message)."""
+    try:
+        transcripts = json.loads(payload["messages"][-1]["content"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+    return transcripts if isinstance(transcripts, dict) else None
+
+
+class FakeGroq:
+    """Behaviour settings plus counters for one fake server."""
+
+    def __init__(self, chat_latency: float = 0.4, whisper_latency: float = 0.3, whisper_rtf: float = 0.02,
+                 jitter: float = 0.25, rate_limit: float = 0.0, malformed: float = 0.0,
+                 retry_after: float = 1.0, requests_per_window: int = 1000, seed: int = 0):
+        self.chat_latency = chat_latency
+        self.whisper_latency = whisper_latency
+        self.whisper_rtf = whisper_rtf
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.malformed = malformed
+        self.retry_after = retry_after
+        self.requests_per_window = requests_per_window
+        self.rng = random.Random(seed)
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._window_started = time.monotonic()
+        self._window_counts: Counter = Counter()
+
+    def _roll(self, probability: float) -> bool:
+        with self._lock:
+            return self.rng.random() < probability
+
+    async def _sleep(self, seconds: float):
+        with self._lock:
+            factor = self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(max(seconds * factor, 0))
+
+    def _quota_headers(self, request: Request) -> Dict[str, str]:
+        key = request.headers.get("authorization", "")
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_started >= 60:
+                self._window_started = now
+                self._window_counts.clear()
+            self._window_counts[key] += 1
+            remaining = max(self.requests_per_window - self._window_counts[key], 0)
+            reset = 60 - (now - self._window_started)
+        return {
+            "x-ratelimit-limit-requests": str(self.requests_per_window),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+        }
+
+    def _rate_limited(self, endpoint: str, headers: Dict[str, str]) -> Optional[Response]:
+        if headers["x-ratelimit-remaining-requests"] != "0" and not self._roll(self.rate_limit):
+            return None
+        self.stats[f"{endpoint}_429"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429, headers={**headers, "retry-after": f"{self.retry_after:g}"},
+        )
+
+    def _malformed(self, endpoint: str, body: str, headers: Dict[str, str]) -> Optional[Response]:
+        if not self._roll(self.malformed):
+            return None
+        self.stats[f"{endpoint}_malformed"] += 1
+        return Response(body[:max(len(body) // 2, 1)], media_type="application/json", headers=headers)
+
+    async def chat(self, request: Request) -> Response:
+        self.stats["chat_requests"] += 1
+        headers = self._quota_headers(request)
+        limited = self._rate_limited("chat", headers)
+        if limited is not None:
+            return limited
+
+        payload = await request.json()
+        prompt = "".join(message["content"] for message in payload["messages"])
+        packed = _packed_transcripts(payload)
+        await self._sleep(self.chat_latency)
+
+        if packed is not None:
+            self.stats["chat_packed_items"] += len(packed)
+            reply = {item_id: _packed_analysis(transcript) for item_id, transcript in packed.items()}
+        else:
+            reply = _content_analysis(prompt.split("Transcript:", 1)[-1])
+        content = json.dumps(reply)
+        if self._roll(self.malformed):
+            self.stats["chat_malformed"] += 1
+            if packed is not None and len(packed) > 1:
+                # One entry off-schema while the rest of the reply is fine.
+                with self._lock:
+                    broken = self.rng.choice(sorted(reply))
+                reply[broken]["salutation"] = "great"
+                content = json.dumps(reply)
+            else:
+                # The model ignoring the JSON instruction: a valid envelope around broken content.
+                content = content[:len(content) // 2]
+        body = {
+            "id": f"chatcmpl-fake-{self.stats['chat_requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", Config.MODEL_NAME),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+        return JSONResponse(body, headers=headers)
+
+    async def transcribe(self, request: Request, file: UploadFile, model: str, response_format: str,
+                         prompt: Optional[str]) -> Response:
+        self.stats["transcription_requests"] += 1
+        headers = self._quota_headers(request)
+        limited = self._rate_limited("transcription", headers)
+        if limited is not None:
+            return limited
+
+        data = await file.read()
+        seconds = _audio_seconds(data)
+        await self._sleep(self.whisper_latency + self.whisper_rtf * seconds)
+
+        # The same audio always gets the same words.
+        rng = random.Random(hashlib.sha256(data).digest())
+        text = synthetic_transcript(rng, target_words=max(int(seconds * WORDS_PER_SECOND), 1))
+        if response_format == "text":
+            return PlainTextResponse(text, headers=headers)
+
+        body = {"text": text}
+        if response_format == "verbose_json":
+            body.update(task="transcribe", language="english", duration=round(seconds, 2),
+                        segments=_segments(text, seconds))
+        encoded = json.dumps(body)
+        return self._malformed("transcription", encoded, headers) or Response(
+            encoded, media_type="application/json", headers=headers
+        )
+
+
+def _segments(text: str, seconds: float) -> List[Dict[str, Any]]:
+    """Split `text` evenly over `seconds` in SEGMENT_SECONDS pieces."""
+    words = text.split()
+    count = max(int(seconds // SEGMENT_SECONDS) + (seconds % SEGMENT_SECONDS > 0), 1)
+    per_segment = max(-(-len(words) // count), 1)
+    segments = []
+    for i in range(count):
+        piece = words[i * per_segment:(i + 1) * per_segment]
+        if not piece:
+            break
+        segments.append({
+            "id": i, "seek": 0, "start": round(i * seconds / count, 2), "end": round((i + 1) * seconds / count, 2),
+            "text": " " + " ".join(piece), "tokens": [], "temperature": 0.0,
+            "avg_logprob": -0.2, "compression_ratio": 1.5, "no_speech_prob": 0.01,
+        })
+    return segments
+
+
+def create_app(fake: FakeGroq) -> FastAPI:
+    app = FastAPI(title="Fake Groq API")
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await fake.chat(request)
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def audio_transcriptions(
+        request: Request,
+        file: UploadFile = File(...),
+        model: str = Form(...),
+        response_format: str = Form("json"),
+        prompt: Optional[str] = Form(None),
+    ):
+        return await fake.transcribe(request, file, model, response_format, prompt)
+
+    @app.get("/fake/stats")
+    def fake_stats():
+        return dict(fake.stats)
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Groq API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--chat-latency", type=float, default=0.4, help="Seconds per chat completion")
+    parser.add_argument("--whisper-latency", type=float, default=0.3, help="Fixed seconds per transcription")
+    parser.add_argument("--whisper-rtf", type=float, default=0.02,
+                        help="Extra transcription seconds per second of audio")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency varies by +/- this fraction")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Fraction of responses with broken JSON")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--requests-per-window", type=int, default=1000,
+                        help="Per-key requests per minute before every request gets a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    fake = FakeGroq(
+        chat_latency=args.chat_latency, whisper_latency=args.whisper_latency, whisper_rtf=args.whisper_rtf,
+        jitter=args.jitter, rate_limit=args.rate_limit, malformed=args.malformed,
+        retry_after=args.retry_after, requests_per_window=args.requests_per_window, seed=args.seed,
+    )
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import os
+import time
+import atexit
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import Config
+from logs import logger
+from rubric import METRIC_DTYPE
+
+# One row per scored transcript: the raw rule-based metrics, the content fields
+# extracted by the LLM (or local rules), and the score given at the time.
+FEATURE_DTYPE = np.dtype([
+    ("record_id", "U64"),
+    ("transcript_key", "U64"),
+    ("recorded_at", np.float64),
+    ("rules_version", np.int16),
+    ("duration", np.float64),
+] + METRIC_DTYPE.descr + [
+    ("content_source", "U16"),
+    ("salutation_level", "U16"),
+    ("salutation_score", np.int16),
+    ("must_have_count", np.int16),
+    ("good_to_have_count", np.int16),
+    ("flow_followed", np.bool_),
+    ("sentiment", "U16"),
+    ("overall_score", np.int16),
+])
+
+
+def _empty_value(dtype: np.dtype):
+    if dtype.kind == "f":
+        return np.nan
+    if dtype.kind == "U":
+        return ""
+    return 0
+
+
+class FeatureStore:
+    """Append-only columnar store of scoring features.
+
+    Rows are buffered and written as compressed `.npz` segments holding one
+    array per column, so re-scoring reads only numbers and never touches the
+    analyzers or the LLM. Segment names carry the pid, so several processes can
+    share a directory. Columns missing from older segments load as NaN/0/"".
+    """
+
+    def __init__(self, path: str, flush_rows: int = 256):
+        self.path = path
+        self.flush_rows = max(flush_rows, 1)
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._sequence = 0
+        self.rows_written = 0
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, row: Dict[str, Any]):
+        rows = self._buffer(row)
+        if rows:
+            self._write(rows)
+
+    async def aappend(self, row: Dict[str, Any]):
+        """`append` for the event loop: compressing and writing a full buffer runs in a thread."""
+        rows = self._buffer(row)
+        if rows:
+            await asyncio.to_thread(self._write, rows)
+
+    def _buffer(self, row: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Buffer `row`; returns the rows to write once `flush_rows` are buffered."""
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) < self.flush_rows:
+                return None
+            rows, self._rows = self._rows, []
+        return rows
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            self._write(rows)
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        columns = {}
+        for name in FEATURE_DTYPE.names:
+            dtype = FEATURE_DTYPE[name]
+            empty = _empty_value(dtype)
+            columns[name] = np.array([empty if row.get(name) is None else row[name] for row in rows], dtype=dtype)
+
+        with self._write_lock:
+            self._sequence += 1
+            name = f"{time.time_ns()}-{os.getpid()}-{self._sequence}.npz"
+            final_path = os.path.join(self.path, name)
+            tmp_path = f"{final_path}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **columns)
+                os.replace(tmp_path, final_path)
+            except OSError as e:
+                logger.error(f"Failed to write feature segment {final_path}: {e}")
+                return
+            self.rows_written += len(rows)
+
+    def segments(self) -> List[str]:
+        return sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".npz")
+        )
+
+    def load(self, since: Optional[float] = None) -> np.ndarray:
+        """All flushed rows as one `FEATURE_DTYPE` array, oldest first."""
+        parts = []
+        for segment in self.segments():
+            with np.load(segment, allow_pickle=False) as data:
+                length = len(data[FEATURE_DTYPE.names[0]])
+                part = np.empty(length, dtype=FEATURE_DTYPE)
+                for name in FEATURE_DTYPE.names:
+                    part[name] = data[name] if name in data.files else _empty_value(FEATURE_DTYPE[name])
+            parts.append(part)
+
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=FEATURE_DTYPE)
+        rows = rows[np.argsort(rows["recorded_at"], kind="stable")]
+        if since is not None:
+            rows = rows[rows["recorded_at"] >= since]
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._rows)
+        return {
+            "path": self.path,
+            "segments": len(self.segments()),
+            "rows_written": self.rows_written,
+            "buffered": buffered,
+        }
+
+
+feature_store = None
+if Config.FEATURE_STORE_PATH:
+    feature_store = FeatureStore(Config.FEATURE_STORE_PATH, Config.FEATURE_STORE_FLUSH_ROWS)
+    atexit.register(feature_store.flush)
@@ -0,0 +1,170 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from logs import logger
+
+try:
+    import language_tool_python
+except ImportError:
+    language_tool_python = None
+    logger.warning("language-tool-python not found. Grammar scoring will be mocked or limited.")
+
+
+class GrammarChecker:
+    """Grammar checking off the request thread.
+
+    Either keeps `pool_size` warm local LanguageTool instances, or, when
+    `server_url` is set, talks to a running LanguageTool server over a pooled
+    keep-alive HTTP session. `count_errors` returns None instead of blocking
+    when every checker is busy or a check exceeds its timeout, so callers can
+    fall back to a default grammar score.
+
+    Nothing starts at construction. `warm_up` boots the checkers; it runs either
+    in the background (see `analyzers.start_warmup`), during which checks return
+    None, or lazily on the first check when no background warm-up was started.
+    """
+
+    def __init__(self, pool_size: int, server_url: Optional[str] = None, language: str = "en-US"):
+        self.pool_size = max(pool_size, 1)
+        self.server_url = server_url.rstrip("/") if server_url else None
+        self.language = language
+        self._idle: "queue.Queue" = queue.Queue()
+        self._instances = []
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="grammar")
+        self._lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self.warm = False
+        self.warming = False
+        self.checks = 0
+        self.saturated = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    @property
+    def configured(self) -> bool:
+        """Whether grammar checking is possible at all (it may still be warming up)."""
+        return bool(self.server_url) or language_tool_python is not None
+
+    @property
+    def available(self) -> bool:
+        return bool(self._session or self._instances)
+
+    def mark_warming(self):
+        """Flag a background warm-up as pending so checks degrade instead of blocking on it."""
+        if not self.warm:
+            self.warming = True
+
+    def warm_up(self):
+        with self._warmup_lock:
+            if self.warm:
+                return
+            self.warming = True
+            try:
+                self._start_checkers()
+            finally:
+                self.warm = True
+                self.warming = False
+
+    def _start_checkers(self):
+        if self.server_url:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            for _ in range(self.pool_size):
+                self._idle.put(None)
+            logger.info(f"Using LanguageTool server at {self.server_url}")
+            return
+
+        if language_tool_python is None:
+            return
+
+        for i in range(self.pool_size):
+            try:
+                instance = language_tool_python.LanguageTool(self.language)
+            except Exception as e:
+                logger.warning(f"LanguageTool failed to init: {e}")
+                break
+            self._instances.append(instance)
+            self._idle.put(instance)
+        logger.info(f"Started {len(self._instances)} LanguageTool checker(s)")
+
+    def count_errors(self, text: str) -> Optional[int]:
+        """Number of grammar matches in `text`, or None if no checker answered in time."""
+        if not self.warm:
+            if self.warming:
+                # Background warm-up still running: serve degraded rather than wait.
+                return None
+            self.warm_up()
+        if not self.available:
+            return None
+
+        try:
+            checker = self._idle.get(timeout=Config.GRAMMAR_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            with self._lock:
+                self.saturated += 1
+            logger.warning("All grammar checkers busy, using fallback grammar score")
+            return None
+
+        future = self._executor.submit(self._check, checker, text)
+        # The checker goes back to the pool when the check really finishes, even after a timeout.
+        future.add_done_callback(lambda _: self._idle.put(checker))
+        try:
+            errors = future.result(timeout=Config.GRAMMAR_CHECK_TIMEOUT)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"Grammar check timed out after {Config.GRAMMAR_CHECK_TIMEOUT}s, using fallback grammar score")
+            return None
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"Grammar check failed: {e}")
+            return None
+
+        with self._lock:
+            self.checks += 1
+        return errors
+
+    def _check(self, checker, text: str) -> int:
+        if self._session is not None:
+            response = self._session.post(
+                f"{self.server_url}/v2/check",
+                data={"text": text, "language": self.language},
+                timeout=Config.GRAMMAR_CHECK_TIMEOUT,
+            )
+            response.raise_for_status()
+            return len(response.json().get("matches", []))
+        return len(checker.check(text))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "server" if self.server_url else "local",
+                "warm": self.warm,
+                "pool_size": self.pool_size if self._session else len(self._instances),
+                "idle": self._idle.qsize(),
+                "checks": self.checks,
+                "saturated": self.saturated,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+        for instance in self._instances:
+            try:
+                instance.close()
+            except Exception as e:
+                logger.warning(f"Failed to close LanguageTool: {e}")
+
+
+grammar_checker = GrammarChecker(Config.LANGUAGETOOL_POOL_SIZE, Config.LANGUAGETOOL_SERVER_URL)
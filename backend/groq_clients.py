@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from config import Config
+from metrics import GROQ_REQUESTS, GROQ_RETRIES
+from logs import logger
+from key_scheduler import KeyScheduler
+from shared_state import shared_state
+
+
+class GroqClientPool:
+    """Process-wide pool holding one long-lived AsyncGroq client per API key.
+
+    Clients keep their HTTP connections alive between requests, so only the
+    first call on each key pays for connection setup and the TLS handshake.
+    Key selection, retries and backoff go through the `KeyScheduler`.
+    """
+
+    def __init__(self, api_keys: List[str], shared=None):
+        self.api_keys = list(api_keys)
+        self.scheduler = KeyScheduler(self.api_keys, shared)
+        self._lock = threading.Lock()
+        self._clients: Dict[str, AsyncGroq] = {}
+        self._loop = None
+
+    def get_client(self, key: str) -> AsyncGroq:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if loop is not self._loop:
+                # httpx connection pools belong to the loop that opened them, so a
+                # new loop (e.g. a script calling `asyncio.run`) gets fresh clients.
+                self._close_on(self._loop, list(self._clients.values()))
+                self._clients = {}
+                self._loop = loop
+
+            client = self._clients.get(key)
+            if client is None:
+                client = AsyncGroq(
+                    api_key=key,
+                    # Retries are handled by `run` so every attempt is seen by the scheduler.
+                    max_retries=0,
+                    http_client=DefaultAsyncHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=Config.GROQ_MAX_CONNECTIONS,
+                            max_keepalive_connections=Config.GROQ_MAX_CONNECTIONS,
+                            keepalive_expiry=Config.GROQ_KEEPALIVE_SECONDS,
+                        )
+                    ),
+                )
+                self._clients[key] = client
+        return client
+
+    async def run(
+        self,
+        label: str,
+        operation: Callable[[AsyncGroq], Awaitable[Any]],
+        parse: Callable[[Any], Any] = None,
+    ) -> Any:
+        """Run a raw-response Groq call on the healthiest key, retrying with backoff.
+
+        `operation` must return a raw response (`client.<resource>.with_raw_response...`)
+        so the rate-limit headers can be read. `parse` post-processes the parsed body;
+        if it raises, the attempt is retried without counting against the key.
+        Failed keys are put on a jittered cooldown by the scheduler, so the backoff
+        happens in `acquire` only once no healthy key is left.
+        """
+        max_attempts = max(Config.GROQ_MAX_ATTEMPTS, 1)
+        last_error = None
+
+        for attempt in range(max_attempts):
+            key, wait = self.scheduler.acquire()
+            try:
+                if wait > Config.KEY_MAX_WAIT_SECONDS:
+                    raise RuntimeError(f"All Groq keys are cooling down for at least {wait:.1f}s")
+                if wait > 0:
+                    logger.info(f"All Groq keys cooling down, waiting {wait:.1f}s")
+                    await asyncio.sleep(wait)
+
+                logger.info(f"{label} request (attempt {attempt + 1}/{max_attempts})")
+                if attempt:
+                    GROQ_RETRIES.inc(operation=label)
+                try:
+                    raw = await operation(self.get_client(key))
+                except Exception as e:
+                    GROQ_REQUESTS.inc(operation=label, outcome="error")
+                    if self.scheduler.report_failure(key, e) and self.scheduler.shared is not None:
+                        # Other workers should stop using the key now, not at the next periodic sync.
+                        await self.sync_keys()
+                    raise
+
+                GROQ_REQUESTS.inc(operation=label, outcome="success")
+                self.scheduler.report_success(key, raw.headers)
+                result = await raw.parse()
+                return parse(result) if parse else result
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{label} call failed (attempt {attempt + 1}/{max_attempts}): {e}")
+            finally:
+                self.scheduler.release(key)
+
+        raise RuntimeError(f"{label} failed after {max_attempts} attempts: {last_error}")
+
+    async def sync_keys(self):
+        """Merge key usage with other workers through the shared store, off the event loop."""
+        try:
+            await asyncio.to_thread(self.scheduler.sync)
+        except Exception as e:
+            logger.warning(f"Syncing Groq key usage failed: {e}")
+
+    @staticmethod
+    def _close_on(loop, clients: List[AsyncGroq]):
+        """Close clients of a loop this pool no longer uses, on that loop."""
+        if not clients:
+            return
+        if loop is not None and loop.is_running():
+            for client in clients:
+                asyncio.run_coroutine_threadsafe(client.close(), loop)
+        else:
+            # Their loop has ended; callers that run their own loop should close the pool before it does.
+            logger.warning(f"Dropping {len(clients)} Groq client(s) of an event loop that has stopped")
+
+    async def aclose(self):
+        with self._lock:
+            loop, clients = self._loop, list(self._clients.values())
+            self._clients = {}
+            self._loop = None
+        if loop is not asyncio.get_running_loop():
+            self._close_on(loop, clients)
+            return
+
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Groq client: {e}")
+
+
+client_pool = GroqClientPool(Config.GROQ_API_KEYS, shared_state)
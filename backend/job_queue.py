@@ -0,0 +1,387 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import socket
+import sqlite3
+import ipaddress
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import httpx
+from config import Config
+from logs import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    lease_token TEXT,
+    callback_status TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, created_at);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+def callback_url_error(url: str) -> Optional[str]:
+    """Why `url` may not receive job callbacks, or None if it may.
+
+    Resolves the host (blocking), so the server is not made to POST to its own
+    network, e.g. cloud metadata at 169.254.169.254 or RFC 1918 hosts.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an http(s) URL"
+    host = parsed.hostname.lower()
+    if Config.JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in Config.JOB_CALLBACK_ALLOWED_HOSTS:
+            return f"callback host {host} is not allowed"
+        return None
+    try:
+        infos = socket.getaddrinfo(host, parsed.port or 80, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        return f"callback host {host} does not resolve"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return f"callback host {host} resolves to a non-public address"
+    return None
+
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """Persistent scoring jobs in SQLite, processed by in-process async workers.
+
+    Database and file work is blocking; callers on the event loop run it (and
+    `submit`) in a thread. Submissions with the same dedup key as a queued, running or recently
+    finished job return that job instead of queueing the work again. A worker
+    holds a lease on the job it runs and renews it while the job runs; if the
+    process dies, the lease expires and another worker (in this or another
+    process sharing the file) picks the job up again, up to `max_attempts`. A
+    worker whose lease was taken over meanwhile discards its result. Handlers
+    are registered per job kind.
+    """
+
+    def __init__(self, path: str, workers: int, max_attempts: int = 3, lease_seconds: float = 600,
+                 retention_seconds: float = 7 * 86400):
+        self.path = path
+        self.workers = max(workers, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.handlers: Dict[str, Handler] = {}
+        self.cleanups: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        self._last_prune = 0.0
+
+    def register(self, kind: str, handler: Handler, cleanup: Callable[[Dict[str, Any]], None] = None):
+        self.handlers[kind] = handler
+        if cleanup:
+            self.cleanups[kind] = cleanup
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "lease_token" not in columns:
+                # Queue files created before leases were renewed.
+                self._db.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+        return self._db
+
+    # Submission and lookup
+
+    def submit(self, kind: str, dedup_key: str, payload: Dict[str, Any],
+               callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job, or return the existing one for the same work."""
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self.db.execute(
+                    "SELECT * FROM jobs WHERE dedup_key = ? AND (status IN (?, ?) OR (status = ? AND finished_at > ?)) "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (dedup_key, QUEUED, RUNNING, DONE, now - self.retention_seconds),
+                ).fetchone()
+                if existing is not None:
+                    self.db.execute("COMMIT")
+                    return {**self._public(existing), "deduplicated": True}
+
+                job_id = uuid.uuid4().hex
+                self.db.execute(
+                    "INSERT INTO jobs (id, kind, dedup_key, status, payload, callback_url, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, dedup_key, QUEUED, json.dumps(payload), callback_url, now),
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return {**self.get(job_id), "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._public(row) if row is not None else None
+
+    def _public(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["status"] == QUEUED:
+            job["position"] = self._position(row["created_at"])
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        if row["callback_url"]:
+            job["callback_status"] = row["callback_status"]
+        return job
+
+    def _position(self, created_at: float) -> int:
+        return self.db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, created_at)
+        ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": len(self._tasks),
+            **{status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)},
+        }
+
+    # Workers
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._http = httpx.AsyncClient(timeout=Config.JOB_CALLBACK_TIMEOUT)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job worker(s) on {self.path}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _worker(self, index: int):
+        while True:
+            # Cleared before claiming so a submission during the claim still wakes us.
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                logger.error(f"Job worker {index}: claim failed: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    # Also poll, for jobs submitted by other processes and expired leases.
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=Config.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(self._prune)
+                continue
+
+            await self._run(job)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died give up their lease; give up entirely after max_attempts.
+                expired = self.db.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (RUNNING, now, self.max_attempts),
+                ).fetchall()
+                for row in expired:
+                    self.db.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Worker lost while processing the job", now, row["id"]),
+                    )
+                row = self.db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, lease_until = ?, lease_token = ?, "
+                    "attempts = attempts + 1 "
+                    "WHERE id = (SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1) RETURNING *",
+                    (RUNNING, now, now + self.lease_seconds, uuid.uuid4().hex, QUEUED, RUNNING, now),
+                ).fetchone()
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        for lost in expired:
+            self._cleanup(lost)
+        return row
+
+    async def _run(self, row: sqlite3.Row):
+        job_id, kind, token = row["id"], row["kind"], row["lease_token"]
+        handler = self.handlers.get(kind)
+        started = time.monotonic()
+        renewal = asyncio.create_task(self._renew(job_id, token))
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for job kind {kind!r}")
+            result = await handler(json.loads(row["payload"]))
+            owned = await asyncio.to_thread(self._finish, job_id, token, DONE, json.dumps(result))
+            if owned:
+                logger.info(f"Job {job_id} ({kind}) done in {time.monotonic() - started:.1f}s")
+        except asyncio.CancelledError:
+            # Shutting down; the lease lets the job be picked up again after restart.
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            # HTTPException from shared request code carries its message in `detail`.
+            owned = await asyncio.to_thread(
+                self._finish, job_id, token, FAILED, None, str(getattr(e, "detail", None) or e)
+            )
+        finally:
+            renewal.cancel()
+        if not owned:
+            # Another worker holds the job now; its run owns the result, payload and callback.
+            logger.warning(f"Job {job_id} ({kind}): lease was taken over, result discarded")
+            return
+        await asyncio.to_thread(self._cleanup, row)
+
+        if row["callback_url"]:
+            await self._callback(job_id, row["callback_url"])
+
+    async def _renew(self, job_id: str, token: str):
+        """Extend the lease while the job runs, so a long job is not claimed a second time."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(self._extend_lease, job_id, token)
+            except sqlite3.Error as e:
+                logger.warning(f"Job {job_id}: lease renewal failed: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Job {job_id}: lease expired before it could be renewed")
+                return
+
+    def _extend_lease(self, job_id: str, token: str) -> bool:
+        with self._lock:
+            cursor = self.db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (time.time() + self.lease_seconds, job_id, RUNNING, token),
+            )
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id: str, token: str, status: str, result: str = None, error: str = None) -> bool:
+        """Record the outcome if this run still holds the lease; False when it was taken over."""
+        with self._lock:
+            cursor = self.db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (status, result, error, time.time(), job_id, RUNNING, token),
+            )
+        return cursor.rowcount == 1
+
+    def _cleanup(self, row: sqlite3.Row):
+        cleanup = self.cleanups.get(row["kind"])
+        if cleanup is None:
+            return
+        try:
+            cleanup(json.loads(row["payload"]))
+        except Exception as e:
+            logger.warning(f"Job {row['id']}: cleanup failed: {e}")
+
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cutoff = now - self.retention_seconds
+        with self._lock:
+            self.db.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff))
+
+    # Callbacks
+
+    async def _callback(self, job_id: str, url: str):
+        # Checked at submit time too; resolving again here catches hosts re-pointed since.
+        error = await asyncio.to_thread(callback_url_error, url)
+        if error:
+            logger.warning(f"Job {job_id}: callback to {url} refused: {error}")
+            await asyncio.to_thread(self._set_callback_status, job_id, "refused")
+            return
+        job = await asyncio.to_thread(self.get, job_id)
+        body = json.dumps(job).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if Config.JOB_CALLBACK_SECRET:
+            signature = hmac.new(Config.JOB_CALLBACK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Nirmaan-Signature"] = f"sha256={signature}"
+
+        status = "failed"
+        for attempt in range(Config.JOB_CALLBACK_ATTEMPTS):
+            try:
+                response = await self._http.post(url, content=body, headers=headers)
+                if response.status_code < 300:
+                    status = "delivered"
+                    break
+                logger.warning(f"Job {job_id}: callback to {url} returned {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Job {job_id}: callback to {url} failed: {e}")
+            if attempt + 1 < Config.JOB_CALLBACK_ATTEMPTS:
+                await asyncio.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1))
+
+        await asyncio.to_thread(self._set_callback_status, job_id, status)
+
+    def _set_callback_status(self, job_id: str, status: str):
+        with self._lock:
+            self.db.execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (status, job_id))
+
+
+job_queue = JobQueue(
+    os.path.join(Config.JOB_QUEUE_DIR, "jobs.sqlite3"),
+    Config.JOB_WORKERS,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    lease_seconds=Config.JOB_LEASE_SECONDS,
+    retention_seconds=Config.JOB_RETENTION_SECONDS,
+)
@@ -0,0 +1,108 @@
+import os
+import asyncio
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from pydantic import BaseModel
+from config import Config
+from logs import logger
+from scoring import engine
+from result_cache import make_key
+from audio_ingest import AudioBuffer
+from audio_processing import score_audio
+from job_queue import DONE, callback_url_error, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+AUDIO_DIR = os.path.join(Config.JOB_QUEUE_DIR, "audio")
+
+
+class TranscriptJobRequest(BaseModel):
+    transcript: str
+    duration: Optional[int] = None
+    callback_url: Optional[str] = None
+
+
+def _check_callback(callback_url: Optional[str]):
+    error = callback_url and callback_url_error(callback_url)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+
+@router.post("/score", status_code=202)
+def submit_transcript_job(request: TranscriptJobRequest):
+    if not request.transcript:
+        raise HTTPException(status_code=400, detail="Transcript is required")
+    _check_callback(request.callback_url)
+
+    # Same inputs as the result cache, so a rubric or model change is not answered from older jobs.
+    key = make_key("score", engine.cache_key(request.transcript, request.duration))
+    payload = {"transcript": request.transcript, "duration": request.duration}
+    return job_queue.submit("score", key, payload, request.callback_url)
+
+
+@router.post("/audio", status_code=202)
+async def submit_audio_job(
+    audio_file: UploadFile = File(...),
+    duration: Optional[int] = None,
+    callback_url: Optional[str] = None
+):
+    await asyncio.to_thread(_check_callback, callback_url)
+    buffer = await AudioBuffer.from_upload(audio_file)
+    try:
+        key = make_key(
+            "audio", buffer.sha256, duration, Config.WHISPER_MODEL, Config.WHISPER_LANGUAGE,
+            Config.MODEL_NAME, engine.rubric_hash,
+        )
+        path = os.path.join(AUDIO_DIR, f"{key}{buffer.extension}")
+        await asyncio.to_thread(_save_audio, buffer, path)
+    finally:
+        buffer.close()
+
+    payload = {"path": path, "filename": buffer.filename, "sha256": buffer.sha256, "duration": duration}
+    job = await asyncio.to_thread(job_queue.submit, "audio", key, payload, callback_url)
+    if job["deduplicated"] and job["status"] == DONE:
+        # Already scored; the copy just saved is not needed.
+        await asyncio.to_thread(_remove_audio, payload)
+    logger.info(f"Audio job {job['job_id']} {'deduplicated' if job['deduplicated'] else 'queued'} ({buffer.size} bytes)")
+    return job
+
+
+@router.get("/stats")
+def job_stats():
+    return job_queue.stats()
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def run_score_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await engine.score_transcript_async(payload["transcript"], payload.get("duration"))
+
+
+async def run_audio_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    buffer = await asyncio.to_thread(AudioBuffer.from_path, payload["path"], payload.get("filename"), payload.get("sha256"))
+    try:
+        return await score_audio(buffer, payload.get("duration"))
+    finally:
+        buffer.close()
+
+
+def _save_audio(buffer: AudioBuffer, path: str):
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    buffer.save(path)
+
+
+def _remove_audio(payload: Dict[str, Any]):
+    try:
+        os.remove(payload["path"])
+    except FileNotFoundError:
+        pass
+
+
+job_queue.register("score", run_score_job)
+job_queue.register("audio", run_audio_job, cleanup=_remove_audio)
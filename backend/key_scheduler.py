@@ -0,0 +1,269 @@
+import re
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+from config import Config
+from metrics import KEY_COOLDOWNS
+from shared_state import key_id
+from logs import logger
+
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse Groq's reset headers ("2m59.56s", "7.66s", "120ms") into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except Exception:
+        return None
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def mask_key(key: str) -> str:
+    return f"{key[:4]}...{key[-4:]}" if len(key) > 8 else "****"
+
+
+class KeyState:
+    def __init__(self, key: str):
+        self.key = key
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.last_error: Optional[str] = None
+
+    def quota(self, now: float) -> Tuple[float, float]:
+        """Remaining (requests, tokens); unknown or already reset quota counts as unlimited."""
+        requests = self.remaining_requests
+        if requests is None or now >= self.requests_reset_at:
+            requests = float("inf")
+        tokens = self.remaining_tokens
+        if tokens is None or now >= self.tokens_reset_at:
+            tokens = float("inf")
+        return requests, tokens
+
+
+class KeyScheduler:
+    """Picks the healthiest Groq API key and tracks rate-limit signals per key.
+
+    Keys that return 429s or repeated errors are put on cooldown; among the
+    remaining keys, the one with the most remaining quota (then the fewest
+    in-flight calls) is chosen.
+
+    Decisions only use this process's state, so they never wait on disk. With
+    a `SharedState`, `sync` merges that state with the shared store (later
+    cooldowns and the lowest current remaining quota win), so worker processes
+    see each other's 429s and spend quota together. It blocks, so callers run
+    it off the event loop: periodically, and right after a key is put on
+    cooldown. Call counts and in-flight numbers stay per process.
+    """
+
+    def __init__(self, api_keys: List[str], shared=None):
+        self.states: Dict[str, KeyState] = {key: KeyState(key) for key in api_keys}
+        self.shared = shared
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Merge key usage with the shared store and write the result back (blocking)."""
+        if self.shared is None:
+            return
+        with self.shared.transaction() as db:
+            rows = self.shared.load_keys(db)
+            # Shared times are wall-clock; convert to and from this process's monotonic clock.
+            offset = time.monotonic() - time.time()
+            with self._lock:
+                now = time.monotonic()
+                merged = []
+                for state in self.states.values():
+                    row = rows.get(key_id(state.key))
+                    if row is not None:
+                        self._merge(state, row, offset, now)
+                    merged.append((state.key, {
+                        "remaining_requests": state.remaining_requests,
+                        "remaining_tokens": state.remaining_tokens,
+                        **{name: getattr(state, name) - offset if getattr(state, name) else 0.0
+                           for name in ("requests_reset_at", "tokens_reset_at", "cooldown_until")},
+                    }))
+            for key, fields in merged:
+                self.shared.save_key(db, key, fields)
+
+    @staticmethod
+    def _merge(state: KeyState, row: Dict[str, Any], offset: float, now: float):
+        if row["cooldown_until"]:
+            state.cooldown_until = max(state.cooldown_until, row["cooldown_until"] + offset)
+        for remaining, reset_at in (("remaining_requests", "requests_reset_at"), ("remaining_tokens", "tokens_reset_at")):
+            theirs = row[remaining]
+            their_reset = row[reset_at] + offset if row[reset_at] else 0.0
+            if theirs is None or their_reset <= now:
+                continue
+            ours = getattr(state, remaining)
+            if ours is None or getattr(state, reset_at) <= now or theirs < ours:
+                setattr(state, remaining, theirs)
+                setattr(state, reset_at, their_reset)
+
+    def acquire(self) -> Tuple[str, float]:
+        """Reserve a key. Returns the key and how long to wait before using it."""
+        if not self.states:
+            raise ValueError("No Groq API keys found in environment variables.")
+
+        with self._lock:
+            now = time.monotonic()
+            available = [s for s in self.states.values() if s.cooldown_until <= now]
+            if available:
+                state = max(available, key=lambda s: (*s.quota(now), -s.in_flight, -s.last_used))
+                wait = 0.0
+            else:
+                state = min(self.states.values(), key=lambda s: s.cooldown_until)
+                wait = state.cooldown_until - now
+
+            state.in_flight += 1
+            state.last_used = now
+            if state.remaining_requests is not None and state.remaining_requests > 0:
+                # Optimistically spend quota so a burst spreads over keys before headers come back.
+                state.remaining_requests -= 1
+        return state.key, wait
+
+    def next_available_in(self) -> float:
+        """Seconds until some key is off cooldown (0 when one is usable now)."""
+        if not self.states:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            return max(min(s.cooldown_until for s in self.states.values()) - now, 0.0)
+
+    def release(self, key: str):
+        with self._lock:
+            state = self.states[key]
+            state.in_flight = max(state.in_flight - 1, 0)
+
+    def report_success(self, key: str, headers=None):
+        with self._lock:
+            now = time.monotonic()
+            state = self.states[key]
+            state.successes += 1
+            state.consecutive_failures = 0
+            state.last_error = None
+            self._observe_headers(state, headers, now)
+
+            if state.remaining_requests == 0:
+                state.cooldown_until = max(state.cooldown_until, state.requests_reset_at)
+
+    def report_failure(self, key: str, error: Exception) -> float:
+        """Record a failed call; returns the cooldown (seconds) the key was put on."""
+        response = getattr(error, "response", None)
+        status = getattr(error, "status_code", None)
+        headers = getattr(response, "headers", None)
+
+        with self._lock:
+            now = time.monotonic()
+            state = self.states[key]
+            state.failures += 1
+            state.consecutive_failures += 1
+            state.last_error = str(error)[:200]
+            self._observe_headers(state, headers, now)
+
+            if status == 429:
+                state.rate_limited += 1
+                cooldown = parse_retry_after(headers.get("retry-after")) if headers else None
+                if cooldown is None and headers:
+                    resets = [parse_reset(headers.get("x-ratelimit-reset-requests")),
+                              parse_reset(headers.get("x-ratelimit-reset-tokens"))]
+                    resets = [r for r in resets if r is not None]
+                    cooldown = max(resets) if resets else None
+                if cooldown is None:
+                    cooldown = self.backoff_delay(state.consecutive_failures)
+            elif status in (401, 403):
+                cooldown = Config.KEY_AUTH_COOLDOWN_SECONDS
+            elif status is not None and status < 500:
+                # The request itself was bad; the key is fine.
+                state.consecutive_failures = 0
+                cooldown = 0.0
+            else:
+                cooldown = self.backoff_delay(state.consecutive_failures)
+
+            state.cooldown_until = max(state.cooldown_until, now + cooldown)
+
+        if cooldown:
+            reason = "rate_limited" if status == 429 else "auth" if status in (401, 403) else "error"
+            KEY_COOLDOWNS.inc(reason=reason)
+            logger.warning(f"Groq key {mask_key(key)} cooling down for {cooldown:.1f}s (status {status})")
+        return cooldown
+
+    def _observe_headers(self, state: KeyState, headers, now: float):
+        if not headers:
+            return
+
+        remaining_requests = _to_int(headers.get("x-ratelimit-remaining-requests"))
+        if remaining_requests is not None:
+            state.remaining_requests = remaining_requests
+            reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+            state.requests_reset_at = now + (reset if reset is not None else 60.0)
+
+        remaining_tokens = _to_int(headers.get("x-ratelimit-remaining-tokens"))
+        if remaining_tokens is not None:
+            state.remaining_tokens = remaining_tokens
+            reset = parse_reset(headers.get("x-ratelimit-reset-tokens"))
+            state.tokens_reset_at = now + (reset if reset is not None else 60.0)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        ceiling = min(Config.KEY_BACKOFF_MAX_SECONDS, Config.KEY_BACKOFF_BASE_SECONDS * (2 ** max(attempt, 0)))
+        return random.uniform(0, ceiling)
+
+    def health(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": mask_key(s.key),
+                    "healthy": s.cooldown_until <= now,
+                    "cooldown_remaining": round(max(s.cooldown_until - now, 0.0), 2),
+                    "remaining_requests": s.remaining_requests if now < s.requests_reset_at else None,
+                    "remaining_tokens": s.remaining_tokens if now < s.tokens_reset_at else None,
+                    "in_flight": s.in_flight,
+                    "successes": s.successes,
+                    "failures": s.failures,
+                    "rate_limited": s.rate_limited,
+                    "consecutive_failures": s.consecutive_failures,
+                    "last_error": s.last_error,
+                }
+                for s in self.states.values()
+            ]
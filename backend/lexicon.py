@@ -0,0 +1,152 @@
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, Tuple
+from config import Config
+
+TOKEN_RE = re.compile(r'\b\w+\b')
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Phrases are sequences of tokens, so multi-word entries such as "you know"
+    match across token boundaries and every match is found in one left-to-right
+    pass, regardless of how many phrases are registered.
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, Any]]] = [[]]
+        self.max_length = 0
+
+    def add(self, phrase: str, payload: Any):
+        tokens = TOKEN_RE.findall(phrase.lower())
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            nxt = self.goto[node].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(tokens), payload))
+        self.max_length = max(self.max_length, len(tokens))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and token not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(token, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+                queue.append(child)
+        return self
+
+    def step(self, state: int, token: str) -> int:
+        while state and token not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(token, 0)
+
+    def outputs(self, state: int) -> List[Tuple[int, Any]]:
+        return self.out[state]
+
+
+class LexicalAnalysis:
+    """Everything the rule-based metrics need from one pass over a transcript."""
+
+    def __init__(self):
+        self.word_count = 0
+        self.unique_words = 0
+        self.filler_count = 0
+        self.filler_hits: Counter = Counter()
+        # (group, category) -> [(token_index, char_offset, phrase), ...] in transcript order
+        self.keyword_hits: Dict[Tuple[str, str], List[Tuple[int, int, str]]] = {}
+
+    @property
+    def type_token_ratio(self) -> float:
+        return self.unique_words / self.word_count if self.word_count else 0
+
+    def categories(self, group: str) -> List[str]:
+        return [category for g, category in self.keyword_hits if g == group]
+
+    def to_dict(self) -> Dict[str, Any]:
+        keywords: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for (group, category), hits in self.keyword_hits.items():
+            keywords.setdefault(group, {})[category] = [
+                {"token": token, "offset": offset, "phrase": phrase} for token, offset, phrase in hits
+            ]
+        return {
+            "word_count": self.word_count,
+            "unique_words": self.unique_words,
+            "filler_count": self.filler_count,
+            "filler_hits": dict(self.filler_hits),
+            "keywords": keywords,
+        }
+
+
+class Lexicon:
+    """Compiled filler and keyword phrases from `Config`, built once per process."""
+
+    def __init__(self, fillers: List[str], keyword_groups: Dict[str, Dict[str, List[str]]]):
+        self.automaton = PhraseAutomaton()
+        for phrase in fillers:
+            self.automaton.add(phrase, ("filler", phrase))
+        for group, categories in keyword_groups.items():
+            for category, phrases in categories.items():
+                for phrase in phrases:
+                    self.automaton.add(phrase, (group, category, phrase))
+        self.automaton.build()
+
+    @classmethod
+    def from_config(cls) -> "Lexicon":
+        return cls(Config.FILLER_WORDS, {
+            "must_have": Config.MUST_HAVE_KEYWORDS,
+            "good_to_have": Config.GOOD_TO_HAVE_KEYWORDS,
+            "salutation": Config.SALUTATION_PHRASES,
+            "closing": {"closing": Config.CLOSING_PHRASES},
+        })
+
+    def analyze(self, text: str) -> LexicalAnalysis:
+        result = LexicalAnalysis()
+        matches = list(TOKEN_RE.finditer(text.lower()))
+        goto, fail, out = self.automaton.goto, self.automaton.fail, self.automaton.out
+        filler_hits = result.filler_hits
+        keyword_hits = result.keyword_hits
+        tokens = []
+        state = 0
+
+        for index, match in enumerate(matches):
+            token = match.group()
+            tokens.append(token)
+
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if not out[state]:
+                continue
+
+            for length, payload in out[state]:
+                if payload[0] == "filler":
+                    filler_hits[payload[1]] += 1
+                else:
+                    group, category, phrase = payload
+                    first_token = index - length + 1
+                    keyword_hits.setdefault((group, category), []).append(
+                        (first_token, matches[first_token].start(), phrase)
+                    )
+
+        result.word_count = len(tokens)
+        result.unique_words = len(set(tokens))
+        result.filler_count = sum(filler_hits.values())
+        return result
+
+
+lexicon = Lexicon.from_config()
@@ -0,0 +1,202 @@
+"""Packed LLM content analysis: several transcripts per request.
+
+Transcripts waiting for content analysis at the same time are sent together
+under a compact prompt whose reply is a JSON object keyed by transcript id,
+each entry following a fixed schema:
+
+    {"salutation": "none" | "normal" | "good" | "excellent",
+     "must_have": [category, ...], "good_to_have": [category, ...],
+     "flow": true | false, "sentiment": "positive" | "neutral" | "negative"}
+
+A pack closes when it reaches LLM_PACK_MAX_ITEMS transcripts or the
+LLM_PACK_MAX_TOKENS estimate (prompt plus reply), or LLM_PACK_WAIT_MS after
+its first transcript arrived. Entries that are missing or fail validation are
+sent again on their own; if that fails too, or the whole request failed, the
+caller gets None and falls back to local content analysis.
+"""
+import json
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import Config
+from groq_clients import GroqClientPool
+from admission import llm_capacity
+from local_rules import SALUTATION_POINTS
+from metrics import LLM_PACK_ITEMS, LLM_PACK_RETRIES, stage
+from logs import logger
+
+SALUTATIONS = {"none": "No Salutation", "normal": "Normal", "good": "Good", "excellent": "Excellent"}
+SENTIMENTS = {"positive": "Positive", "neutral": "Neutral", "negative": "Negative"}
+FIELDS = {"salutation", "must_have", "good_to_have", "flow", "sentiment"}
+
+# Rough token estimates: ~4 characters per token, plus JSON framing per transcript.
+CHARS_PER_TOKEN = 4
+ITEM_OVERHEAD_TOKENS = 8
+REPLY_TOKENS_PER_ITEM = 60
+
+
+def build_prompt(config=Config) -> str:
+    examples = {tier: ", ".join(phrases[:3]) for tier, phrases in config.SALUTATION_PHRASES.items()}
+    return (
+        "You grade student self-introductions. The user message is a JSON object mapping ids to transcripts. "
+        "Reply with one JSON object that has exactly the same ids as keys, each mapped to "
+        '{"salutation": S, "must_have": [...], "good_to_have": [...], "flow": B, "sentiment": T}.\n'
+        f'S: "none", "normal" ({examples["Normal"]}), "good" ({examples["Good"]}) '
+        f'or "excellent" ({examples["Excellent"]}).\n'
+        f"must_have: topics mentioned, from {', '.join(config.MUST_HAVE_KEYWORDS)}.\n"
+        f"good_to_have: topics mentioned, from {', '.join(config.GOOD_TO_HAVE_KEYWORDS)}.\n"
+        "B: true if the order is salutation, then name/age/school, then other details, then closing.\n"
+        'T: "positive", "neutral" or "negative" tone.\n'
+        "No other keys, no other text."
+    )
+
+
+PACKED_PROMPT = build_prompt()
+
+
+def estimate_tokens(transcript: str) -> int:
+    return len(transcript) // CHARS_PER_TOKEN + ITEM_OVERHEAD_TOKENS + REPLY_TOKENS_PER_ITEM
+
+
+def _categories(value: Any, allowed: Set[str], field: str) -> Set[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{field} must be a list of strings")
+    found = {item.strip().lower() for item in value}
+    unknown = found - allowed
+    if unknown:
+        raise ValueError(f"{field} has unknown categories: {', '.join(sorted(unknown))}")
+    return found
+
+
+def parse_packed_item(item: Any) -> Dict[str, Any]:
+    """Validate one reply entry and convert it to the content fields used for scoring."""
+    if not isinstance(item, dict) or set(item) != FIELDS:
+        raise ValueError(f"expected an object with keys {', '.join(sorted(FIELDS))}")
+    salutation = SALUTATIONS.get(str(item["salutation"]).lower())
+    sentiment = SENTIMENTS.get(str(item["sentiment"]).lower())
+    if salutation is None:
+        raise ValueError(f"unknown salutation {item['salutation']!r}")
+    if sentiment is None:
+        raise ValueError(f"unknown sentiment {item['sentiment']!r}")
+    if not isinstance(item["flow"], bool):
+        raise ValueError("flow must be true or false")
+    must_have = _categories(item["must_have"], set(Config.MUST_HAVE_KEYWORDS), "must_have")
+    good_to_have = _categories(item["good_to_have"], set(Config.GOOD_TO_HAVE_KEYWORDS), "good_to_have")
+
+    return {
+        "salutation_level": salutation,
+        "salutation_score": SALUTATION_POINTS[salutation],
+        "keywords_found": len(must_have) + len(good_to_have),
+        "must_have_count": len(must_have),
+        "good_to_have_count": len(good_to_have),
+        "flow_status": "Order followed" if item["flow"] else "Order Not followed",
+        "flow_score": 5 if item["flow"] else 0,
+        "sentiment": sentiment,
+    }
+
+
+class LLMPacker:
+    """Collects concurrent `analyze` calls into packed LLM requests on the running loop."""
+
+    def __init__(self, clients: GroqClientPool, max_items: int, max_tokens: int, wait_seconds: float):
+        self.clients = clients
+        self.max_items = max(max_items, 1)
+        self.max_tokens = max_tokens
+        self.wait_seconds = wait_seconds
+        self._loop = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def analyze(self, transcript: str) -> Optional[Dict[str, Any]]:
+        """Content fields for `transcript`, or None when the LLM could not provide them."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pending work and timers belong to the loop that created them.
+            self._loop = loop
+            self._pending, self._pending_tokens, self._timer = [], 0, None
+
+        tokens = estimate_tokens(transcript)
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+        future = loop.create_future()
+        self._pending.append((transcript, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_items or self._pending_tokens >= self.max_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait_seconds, self._flush)
+
+        # Timed here rather than in the pack, so each request sees its own wait.
+        with stage("llm"):
+            return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending, self._pending_tokens = self._pending, [], 0
+        if items:
+            task = self._loop.create_task(self._run_pack(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_pack(self, items: List[Tuple[str, asyncio.Future]]):
+        LLM_PACK_ITEMS.observe(len(items))
+        ids = [f"t{i}" for i in range(len(items))]
+        try:
+            reply = await self._request(dict(zip(ids, (transcript for transcript, _ in items))))
+        except Exception as e:
+            logger.error(f"Packed LLM request for {len(items)} transcripts failed, using local content analysis: {e}")
+            for _, future in items:
+                _resolve(future, None)
+            return
+
+        retries = []
+        for item_id, (transcript, future) in zip(ids, items):
+            try:
+                _resolve(future, parse_packed_item(reply.get(item_id)))
+            except ValueError as e:
+                logger.warning(f"Packed LLM result {item_id} invalid ({e}), retrying on its own")
+                retries.append((transcript, future))
+        if retries:
+            LLM_PACK_RETRIES.inc(len(retries))
+            await asyncio.gather(*(self._retry(transcript, future) for transcript, future in retries))
+
+    async def _retry(self, transcript: str, future: asyncio.Future):
+        try:
+            reply = await self._request({"t0": transcript})
+            _resolve(future, parse_packed_item(reply.get("t0")))
+        except Exception as e:
+            logger.error(f"LLM retry failed, using local content analysis: {e}")
+            _resolve(future, None)
+
+    async def _request(self, transcripts: Dict[str, str]) -> Dict[str, Any]:
+        def parse_reply(chat_completion):
+            content = chat_completion.choices[0].message.content
+            logger.debug(f"Received packed response from LLM: {content}")
+            reply = json.loads(content)
+            if not isinstance(reply, dict):
+                raise ValueError("packed reply is not a JSON object")
+            return reply
+
+        with llm_capacity.call():
+            return await self.clients.run(
+                f"Groq LLM packed ({Config.MODEL_NAME})",
+                lambda client: client.chat.completions.with_raw_response.create(
+                    messages=[
+                        {"role": "system", "content": PACKED_PROMPT},
+                        {"role": "user", "content": json.dumps(transcripts, ensure_ascii=False)},
+                    ],
+                    model=Config.MODEL_NAME,
+                    response_format={"type": "json_object"},
+                    temperature=0,
+                ),
+                parse=parse_reply,
+            )
+
+
+def _resolve(future: asyncio.Future, value: Optional[Dict[str, Any]]):
+    # The caller may have been cancelled (e.g. a batch client disconnected).
+    if not future.done():
+        future.set_result(value)
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+from config import Config
+from lexicon import LexicalAnalysis
+
+SALUTATION_POINTS = {"No Salutation": 0, "Normal": 2, "Good": 4, "Excellent": 5}
+SALUTATION_TIERS = ["Excellent", "Good", "Normal"]
+
+# A salutation only counts near the start, a closing only near the end.
+OPENING_TOKENS = 15
+CLOSING_TOKENS = 15
+
+
+class ContentAnalysis:
+    """Deterministic salutation, keyword and flow detection for one transcript.
+
+    `confidence` (0-1) estimates how likely the LLM would agree; phrase matches
+    are exact, so the main uncertainty is content phrased in ways the keyword
+    lists do not cover.
+    """
+
+    def __init__(self):
+        self.salutation_level = "No Salutation"
+        self.must_have: Dict[str, int] = {}
+        self.good_to_have: Dict[str, int] = {}
+        self.flow_followed = False
+        self.flow_missing: List[str] = []
+        self.confidence = 0.0
+
+    def content(self) -> Dict[str, Any]:
+        """Content fields in the same shape as `ScoringEngine._parse_llm_content`."""
+        return {
+            "salutation_level": self.salutation_level,
+            "salutation_score": SALUTATION_POINTS[self.salutation_level],
+            "keywords_found": len(self.must_have) + len(self.good_to_have),
+            "must_have_count": len(self.must_have),
+            "good_to_have_count": len(self.good_to_have),
+            "flow_status": "Order followed" if self.flow_followed else "Order Not followed",
+            "flow_score": 5 if self.flow_followed else 0,
+            "sentiment": None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "salutation_level": self.salutation_level,
+            "must_have": self.must_have,
+            "good_to_have": self.good_to_have,
+            "flow_followed": self.flow_followed,
+            "flow_missing": self.flow_missing,
+            "confidence": self.confidence,
+        }
+
+
+def _first_positions(lexical: LexicalAnalysis, group: str) -> Dict[str, int]:
+    return {
+        category: hits[0][0]
+        for (hit_group, category), hits in lexical.keyword_hits.items()
+        if hit_group == group
+    }
+
+
+def analyze_content(lexical: LexicalAnalysis) -> ContentAnalysis:
+    result = ContentAnalysis()
+    word_count = lexical.word_count
+    if not word_count:
+        return result
+
+    salutation_pos: Optional[int] = None
+    for tier in SALUTATION_TIERS:
+        hits = [h for h in lexical.keyword_hits.get(("salutation", tier), []) if h[0] < OPENING_TOKENS]
+        if hits:
+            result.salutation_level = tier
+            salutation_pos = min(h[0] for h in hits)
+            break
+
+    result.must_have = _first_positions(lexical, "must_have")
+    result.good_to_have = _first_positions(lexical, "good_to_have")
+
+    closing_hits = lexical.keyword_hits.get(("closing", "closing"), [])
+    closing_pos = closing_hits[-1][0] if closing_hits else None
+    if closing_pos is not None and closing_pos < word_count - CLOSING_TOKENS:
+        closing_pos = None
+
+    # Salutation -> Basic Details -> Additional Details -> Closing
+    basic = [pos for category, pos in result.must_have.items() if category in Config.FLOW_BASIC_CATEGORIES]
+    additional = [pos for category, pos in result.must_have.items() if category not in Config.FLOW_BASIC_CATEGORIES]
+    additional += list(result.good_to_have.values())
+
+    if salutation_pos is None:
+        result.flow_missing.append("salutation")
+    if not basic:
+        result.flow_missing.append("basic details")
+    if closing_pos is None:
+        result.flow_missing.append("closing")
+
+    if not result.flow_missing:
+        body = basic + additional
+        result.flow_followed = (
+            salutation_pos < min(basic)
+            and (not additional or min(basic) < min(additional))
+            and closing_pos > max(body)
+        )
+
+    salutation_confidence = 0.6 if salutation_pos is None else (0.85 if result.salutation_level == "Normal" else 0.95)
+    keyword_confidence = len(result.must_have) / len(Config.MUST_HAVE_KEYWORDS) if Config.MUST_HAVE_KEYWORDS else 1.0
+    flow_confidence = 0.6 if result.flow_missing else 0.9
+    result.confidence = round(0.2 * salutation_confidence + 0.6 * keyword_confidence + 0.2 * flow_confidence, 3)
+    return result
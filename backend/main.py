@@ -1,14 +1,83 @@
-from fastapi import FastAPI, HTTPException
+import os
+import time
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import json
 import uvicorn
-from scoring import ScoringEngine
+from scoring import engine
 from logs import logger
 from config import Config
-from audio_processing import router as audio_router
+from groq_clients import client_pool
+from grammar import grammar_checker
+import analyzers
+from audio_processing import router as audio_router, transcription_cache
+from jobs import router as jobs_router
+from drafts import router as drafts_router
+from job_queue import job_queue
+from admission import AdmissionMiddleware, admission
+import profiling
+from metrics import REQUEST_SECONDS, collect_timings, registry, timings_ms
+from shared_state import shared_state
+from feature_store import feature_store
+import prefork
 
-app = FastAPI(title="Nirmaan AI Scoring Tool")
+
+async def publish_metrics():
+    """Keep this worker's numbers in the shared store for whichever worker answers /metrics."""
+    while True:
+        await asyncio.sleep(Config.METRICS_SYNC_SECONDS)
+        try:
+            await asyncio.to_thread(registry.sync)
+        except Exception as e:
+            logger.warning(f"Publishing metrics failed: {e}")
+
+async def sync_key_usage():
+    """Merge this worker's API key usage with the other workers' in the background."""
+    while True:
+        await asyncio.sleep(Config.KEY_SYNC_SECONDS)
+        await client_pool.sync_keys()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if Config.WARMUP_ON_STARTUP:
+        analyzers.start_warmup()
+    profiling.start()
+    publisher = key_syncer = None
+    if shared_state is not None:
+        registry.share(shared_state, f"{os.getpid()}-{time.time_ns()}", stale_seconds=3 * Config.METRICS_SYNC_SECONDS)
+        publisher = asyncio.create_task(publish_metrics())
+        # Start from the cooldowns and quota other workers already know about.
+        await client_pool.sync_keys()
+        key_syncer = asyncio.create_task(sync_key_usage())
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if publisher is not None:
+        publisher.cancel()
+        key_syncer.cancel()
+        registry.sync()
+        await client_pool.sync_keys()
+    profiling.stop()
+    await client_pool.aclose()
+    grammar_checker.close()
+    if feature_store is not None:
+        # Prefork workers leave with os._exit, so the atexit flush would not run.
+        await asyncio.to_thread(feature_store.flush)
+
+app = FastAPI(title="Nirmaan AI Scoring Tool", lifespan=lifespan)
+
+# Innermost, so only admitted requests are profiled; not installed at all unless configured.
+if Config.PROFILING_ADMIN_TOKEN or Config.SLOW_REQUEST_SECONDS > 0:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Added before CORS so rejections still carry CORS headers and browsers can read Retry-After.
+if Config.ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,32 +85,157 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Profile-Id"],
 )
 
-engine = ScoringEngine()
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series count bounded.
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route, status=str(status))
+
+def require_ready():
+    if not Config.SERVE_BEFORE_READY and not analyzers.is_ready():
+        raise HTTPException(status_code=503, detail="Analyzers are warming up", headers={"Retry-After": "5"})
 
-app.include_router(audio_router)
+app.include_router(audio_router, dependencies=[Depends(require_ready)])
+app.include_router(jobs_router)
+if Config.WORKERS > 1:
+    # Draft sessions live in one worker's memory, and requests land on any worker.
+    logger.info("Draft sessions (/drafts) are disabled with WORKERS > 1")
+else:
+    app.include_router(drafts_router, dependencies=[Depends(require_ready)])
+app.include_router(profiling.router)
 
 class ScoreRequest(BaseModel):
     transcript: str
     duration: Optional[int] = None
 
+class BatchScoreRequest(BaseModel):
+    items: List[ScoreRequest]
+
 @app.get("/")
 def read_root():
     return {"message": "Nirmaan AI Scoring API is running"}
 
-@app.post("/score")
-def score_transcript_endpoint(request: ScoreRequest):
+@app.get("/healthz")
+def liveness():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readiness():
+    status = analyzers.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/keys/health")
+def key_health():
+    return {"keys": client_pool.scheduler.health()}
+
+@app.get("/grammar/stats")
+def grammar_stats():
+    return grammar_checker.stats()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "scoring": engine.cache.stats() if engine.cache else None,
+        "transcription": transcription_cache.stats() if transcription_cache else None,
+    }
+
+@app.get("/admission/stats")
+def admission_stats():
+    return admission.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@registry.collector
+def collect_component_stats():
+    caches = {"scoring": engine.cache, "transcription": transcription_cache}
+    stats = {name: cache.stats() for name, cache in caches.items() if cache}
+    grammar = grammar_checker.stats()
+    return [
+        ("nirmaan_cache_hits_total", "Cache hits (memory and disk).", "counter",
+         [({"cache": name}, s["hits"]) for name, s in stats.items()]),
+        ("nirmaan_cache_misses_total", "Cache misses.", "counter",
+         [({"cache": name}, s["misses"]) for name, s in stats.items()]),
+        ("nirmaan_cache_entries", "Entries held in memory.", "gauge",
+         [({"cache": name}, s["entries"]) for name, s in stats.items()]),
+        ("nirmaan_grammar_checks_total", "Grammar checks by outcome.", "counter",
+         [({"outcome": outcome}, grammar[outcome]) for outcome in ("checks", "saturated", "timeouts", "failures")]),
+        ("nirmaan_grammar_idle_checkers", "Idle LanguageTool checkers.", "gauge", [({}, grammar["idle"])]),
+    ]
+
+@registry.collector(per_process=False)
+def collect_shared_stats():
+    # The job queue and (under several workers) key cooldowns are the same for every worker.
+    jobs = job_queue.stats()
+    keys = client_pool.scheduler.health()
+    return [
+        ("nirmaan_jobs", "Jobs by status.", "gauge",
+         [({"status": status}, jobs[status]) for status in ("queued", "running", "done", "failed")]),
+        ("nirmaan_keys_available", "API keys not cooling down.", "gauge",
+         [({}, sum(1 for key in keys if key["healthy"]))]),
+    ]
+
+@app.post("/score", dependencies=[Depends(require_ready)])
+async def score_transcript_endpoint(request: ScoreRequest, timings: bool = False):
     if not request.transcript:
         raise HTTPException(status_code=400, detail="Transcript is required")
     
     try:
         logger.info(f"Scoring transcript of length {len(request.transcript)}")
-        result = engine.score_transcript(request.transcript, request.duration)
+        with collect_timings() as stage_timings:
+            result = await engine.score_transcript_async(request.transcript, request.duration)
+        if timings:
+            result["timings"] = timings_ms(stage_timings)
         return result
     except Exception as e:
         logger.error(f"Error scoring transcript: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/score/batch", dependencies=[Depends(require_ready)])
+async def score_batch_endpoint(request: BatchScoreRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(request.items) > Config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {Config.BATCH_MAX_ITEMS} items")
+
+    logger.info(f"Scoring batch of {len(request.items)} transcripts")
+    llm_limit = asyncio.Semaphore(Config.BATCH_LLM_CONCURRENCY)
+
+    async def score_item(index: int, item: ScoreRequest):
+        if not item.transcript:
+            return {"index": index, "error": "Transcript is required"}
+        try:
+            result = await engine.score_transcript_async(item.transcript, item.duration, llm_limit=llm_limit)
+            return {"index": index, "result": result}
+        except Exception as e:
+            logger.error(f"Error scoring batch item {index}: {e}")
+            return {"index": index, "error": str(e)}
+
+    async def stream_results():
+        tasks = [asyncio.create_task(score_item(i, item)) for i, item in enumerate(request.items)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Stop outstanding work if the client goes away mid-stream.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    if Config.WORKERS > 1:
+        prefork.serve(app, host="0.0.0.0", port=8001, workers=Config.WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,301 @@
+"""Counters, histograms and per-request stage timings, rendered for Prometheus.
+
+Stage timings go to the `nirmaan_stage_seconds` histogram and, inside
+`collect_timings()`, into a per-request dict that endpoints can return as
+`timings`. The dict lives in a context variable, so tasks spawned by the
+request (gathers, `asyncio.to_thread`) add to it; work on executor threads or
+processes returns its timings and is recorded by the caller.
+
+Under a multi-worker server, `Registry.share` makes each worker publish its
+values to the shared store (see shared_state.py) and render the sum over all
+workers: counters and histograms including workers that have exited, values
+from per-process collectors only from workers that published recently.
+"""
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        """Current values by label key."""
+        raise NotImplementedError
+
+    def samples(self, values: Dict[Tuple[str, ...], Any] = None) -> List[Tuple[str, Dict[str, str], float]]:
+        """Exposition samples for `values` (by default this process's own)."""
+        raise NotImplementedError
+
+    def render(self, values: Dict[Tuple[str, ...], Any] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples(values):
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self, values=None):
+        items = (self.snapshot() if values is None else values).items()
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+    def samples(self, values=None):
+        samples = []
+        for key, state in (self.snapshot() if values is None else values).items():
+            labels = dict(zip(self.labels, key))
+            for bound, count in zip(self.buckets, state):
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count))
+            samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, state[-1]))
+            samples.append((f"{self.name}_sum", labels, state[-2]))
+            samples.append((f"{self.name}_count", labels, state[-1]))
+        return samples
+
+
+def _add(total: Any, value: Any) -> Any:
+    if total is None:
+        return value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(total, value)]
+    return total + value
+
+
+class Registry:
+    """Metrics plus collectors that report point-in-time values (cache and pool stats)."""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        # (collect function, whether its values are per process and summed across workers)
+        self.collectors: List[Tuple[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]], bool]] = []
+        self.shared = None
+        self.worker: Optional[str] = None
+        self.stale_seconds = 0.0
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn=None, *, per_process: bool = True):
+        """Register `fn() -> [(name, help, type, [(labels, value), ...]), ...]`.
+
+        Use `per_process=False` for collectors that already report state shared by all
+        workers (the job queue, key cooldowns), so it is not summed across them.
+        """
+        def register(fn):
+            self.collectors.append((fn, per_process))
+            return fn
+        return register(fn) if fn is not None else register
+
+    def share(self, store, worker: str, stale_seconds: float):
+        """Publish to `store` as `worker` and render totals over all workers from now on."""
+        self.shared = store
+        self.worker = worker
+        self.stale_seconds = stale_seconds
+
+    def _collect(self, collect, lines: List[str]) -> List[Tuple[str, str, str, List[Sample]]]:
+        try:
+            return list(collect())
+        except Exception as e:
+            lines.append(f"# collector {getattr(collect, '__name__', 'collector')} failed: {_escape(e)}")
+            return []
+
+    def _render_family(self, lines: List[str], name: str, help: str, kind: str, samples: Iterable[Sample]):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+
+    def sync(self, lines: List[str] = None) -> List[Tuple[str, str, str]]:
+        """Publish this process's values; returns the per-process collector families seen."""
+        lines = [] if lines is None else lines
+        samples = []
+        for metric in self.metrics:
+            samples.extend((metric.name, json.dumps(key), value) for key, value in metric.snapshot().items())
+        families = []
+        for collect, per_process in self.collectors:
+            if not per_process:
+                continue
+            for name, help, kind, family_samples in self._collect(collect, lines):
+                families.append((name, help, kind))
+                samples.extend((name, json.dumps(labels, sort_keys=True), value) for labels, value in family_samples)
+        self.shared.save_metrics(self.worker, samples)
+        return families
+
+    def render(self) -> str:
+        if self.shared is not None:
+            return self._render_shared()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect, _ in self.collectors:
+            for family in self._collect(collect, lines):
+                self._render_family(lines, *family)
+        return "\n".join(lines) + "\n"
+
+    def _render_shared(self) -> str:
+        lines = []
+        families = self.sync(lines)
+        metric_names = {metric.name for metric in self.metrics}
+        fresh_after = time.time() - self.stale_seconds
+        totals: Dict[str, Dict[str, Any]] = {}
+        for worker, name, labels, value, updated_at in self.shared.load_metrics():
+            # Collector values of workers that stopped publishing are dropped; their counters are kept.
+            if name not in metric_names and updated_at < fresh_after and worker != self.worker:
+                continue
+            family = totals.setdefault(name, {})
+            family[labels] = _add(family.get(labels), value)
+
+        for metric in self.metrics:
+            values = {tuple(json.loads(labels)): value for labels, value in totals.get(metric.name, {}).items()}
+            lines.extend(metric.render(values))
+        for name, help, kind in dict.fromkeys(families):
+            samples = [(json.loads(labels), value) for labels, value in totals.get(name, {}).items()]
+            self._render_family(lines, name, help, kind, samples)
+        for collect, per_process in self.collectors:
+            if not per_process:
+                for family in self._collect(collect, lines):
+                    self._render_family(lines, *family)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.add(Histogram(
+    "nirmaan_stage_seconds", "Time spent in each scoring stage.", ["stage"]
+))
+REQUEST_SECONDS = registry.add(Histogram(
+    "nirmaan_request_seconds", "HTTP request latency by route.", ["method", "route", "status"]
+))
+GROQ_REQUESTS = registry.add(Counter(
+    "nirmaan_groq_requests_total", "Groq API attempts by operation and outcome.", ["operation", "outcome"]
+))
+GROQ_RETRIES = registry.add(Counter(
+    "nirmaan_groq_retries_total", "Groq attempts retried on the next scheduled key.", ["operation"]
+))
+KEY_COOLDOWNS = registry.add(Counter(
+    "nirmaan_key_cooldowns_total", "API keys put on cooldown, by reason.", ["reason"]
+))
+FALLBACKS = registry.add(Counter(
+    "nirmaan_fallbacks_total", "Degraded results served, by the stage that fell back.", ["stage"]
+))
+LLM_PACK_ITEMS = registry.add(Histogram(
+    "nirmaan_llm_pack_items", "Transcripts per packed LLM request.", buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+))
+LLM_PACK_RETRIES = registry.add(Counter(
+    "nirmaan_llm_pack_retries_total", "Packed LLM results re-sent on their own after failing validation."
+))
+
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("nirmaan_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        # Stages that run more than once per request (e.g. Whisper chunks) are summed.
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_timings():
+    """Collect stage timings for the current request into the yielded dict (seconds).
+
+    Stages collected inside a nested `collect_timings` are added to the enclosing one too.
+    """
+    timings: Dict[str, float] = {}
+    outer = _timings.get()
+    token = _timings.set(timings)
+    started = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings["total"] = time.perf_counter() - started
+        _timings.reset(token)
+        if outer is not None:
+            for name, seconds in timings.items():
+                if name != "total":
+                    outer[name] = outer.get(name, 0.0) + seconds
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {f"{name}_ms": round(seconds * 1000, 1) for name, seconds in timings.items()}
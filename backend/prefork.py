@@ -0,0 +1,135 @@
+"""Pre-fork multi-worker serving, used by `python main.py` when WORKERS > 1.
+
+The parent process loads what workers only read (the VADER lexicon; the
+keyword automaton and rubric tables are built at import), binds the listening
+socket and forks the workers, which then share those pages copy-on-write.
+`gc.freeze()` keeps the garbage collector from touching, and so copying, the
+preloaded objects. When grammar would run in-process, the parent also starts
+one LanguageTool server that every worker uses over HTTP, instead of each
+worker booting LANGUAGETOOL_POOL_SIZE JVMs of its own.
+
+Each worker runs its own uvicorn server and event loop on the inherited
+socket; thread pools, Groq clients and SQLite connections are created after
+the fork. Key usage, result caches and metrics are shared through
+SHARED_STATE_PATH (see shared_state.py). Admission limits and the in-memory
+cache tier stay per worker. Draft sessions are kept in memory and would be
+found by only one worker, so /drafts is not served at all with WORKERS > 1
+and the frontend turns live draft scoring off when it gets a 404. Workers that die are replaced;
+SIGTERM or SIGINT to the parent shuts all of them down gracefully.
+"""
+import gc
+import os
+import time
+import signal
+import socket
+from typing import Dict
+import uvicorn
+import analyzers
+from grammar import grammar_checker, language_tool_python
+from shared_state import shared_state
+from logs import logger
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def start_shared_grammar_server():
+    """Start one LanguageTool server for all workers; returns it (to close on shutdown) or None."""
+    if grammar_checker.server_url or language_tool_python is None:
+        return None
+    try:
+        tool = language_tool_python.LanguageTool(grammar_checker.language)
+    except Exception as e:
+        logger.warning(f"Shared LanguageTool server failed to start, each worker starts its own: {e}")
+        return None
+    # language_tool_python serves its local JVM over HTTP at "<base>/v2/".
+    url = getattr(tool, "_url", None)
+    if not url:
+        logger.warning("Shared LanguageTool server has no HTTP address, each worker starts its own")
+        tool.close()
+        return None
+    grammar_checker.server_url = url.rstrip("/").removesuffix("/v2")
+    logger.info(f"Workers share the LanguageTool server at {grammar_checker.server_url}")
+    return tool
+
+
+def _run_worker(app, sock: socket.socket, host: str, port: int):
+    # Own process group, so a terminal Ctrl-C reaches only the parent, which then stops
+    # every worker once; a second signal would make uvicorn skip the lifespan shutdown.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    code = 0
+    try:
+        uvicorn.Server(uvicorn.Config(app, host=host, port=port)).run(sockets=[sock])
+    except BaseException as e:
+        logger.error(f"Worker {os.getpid()} failed: {e}")
+        code = 1
+    finally:
+        # Skip the parent's atexit handlers (e.g. stopping the shared LanguageTool server).
+        os._exit(code)
+
+
+def serve(app, host: str, port: int, workers: int):
+    if not hasattr(os, "fork"):
+        logger.warning("fork() is not available on this platform, serving with one process")
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    analyzers.get_sentiment_analyzer()
+    grammar_server = start_shared_grammar_server()
+    if shared_state is not None:
+        shared_state.reset_metrics()
+        shared_state.close()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, sock, host, port)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Stopping {len(children)} workers")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Serving on http://{host}:{port} with {workers} workers (parent {os.getpid()})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if children.pop(pid, None) is None:
+            # Not a worker (e.g. the LanguageTool JVM).
+            continue
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}, starting a new one")
+            time.sleep(RESPAWN_DELAY_SECONDS)
+            if not stopping:
+                spawn()
+
+    sock.close()
+    if grammar_server is not None:
+        grammar_server.close()
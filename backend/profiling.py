@@ -0,0 +1,419 @@
+"""On-demand request profiling and slow-request stack capture.
+
+A request carrying `X-Admin-Token: <PROFILING_ADMIN_TOKEN>` and either
+`X-Profile: <mode>` or `?profile=<mode>` is profiled:
+
+    sample    a thread samples every thread's stack each PROFILE_SAMPLE_INTERVAL_MS
+              while the request runs. This covers the blocking analyzers (LanguageTool,
+              VADER, the lexical pass), which run on executor threads.
+    cprofile  deterministic cProfile of the event loop thread: JSON handling, result
+              assembly and the async Groq calls. Executor threads are not covered.
+
+The response carries `X-Profile-Id`. The profile is stored in PROFILE_DIR and
+served by GET /debug/profiles/{id} (the same admin token is required). cProfile
+runs can also be downloaded as `.prof` files with `?format=pstats`. Other
+requests running at the same time show up in the profile too.
+
+With SLOW_REQUEST_SECONDS set, a background thread keeps the last
+SLOW_REQUEST_WINDOW_SECONDS of stack samples, taken every
+SLOW_REQUEST_SAMPLE_INTERVAL_MS. Requests that take longer than the threshold
+get the samples from their lifetime saved the same way. With both settings
+unset, the middleware is not installed and nothing runs.
+
+Samples are recorded as folded stacks ("thread;outer;...;inner count", ready
+for flamegraph.pl or speedscope), along with the top functions by self and
+total time. The stage timings of the request are recorded as well, so time
+spent waiting on Groq or LanguageTool is visible next to the CPU hot spots.
+"""
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import pstats
+import asyncio
+import cProfile
+import threading
+from collections import Counter as Tally, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from config import Config
+from metrics import Counter, collect_timings, registry, timings_ms
+from logs import logger
+
+# Innermost frames of a thread with nothing to do. Idle executor threads are left
+# out of samples; the event loop thread shows as waiting for I/O.
+IDLE_FRAMES = {
+    "threading:Condition.wait",
+    "thread:_worker",
+    "selectors:EpollSelector.select",
+    "selectors:KqueueSelector.select",
+    "selectors:PollSelector.select",
+    "selectors:SelectSelector.select",
+}
+WAITING_FOR_IO = ("(waiting for I/O)",)
+# Distinct stacks remembered for sharing between samples before the table is reset.
+MAX_INTERNED_STACKS = 20000
+TOP_FUNCTIONS = 40
+MODES = ("sample", "cprofile")
+
+SLOW_REQUESTS = registry.add(Counter(
+    "nirmaan_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS, by route.", ["route"]
+))
+
+_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+Stack = Tuple[str, ...]
+
+
+class StackSampler:
+    """Samples the stacks of all threads at a fixed interval on a daemon thread.
+
+    `retention_seconds` bounds how far back samples are kept (None keeps all of them).
+    Create it on the event loop thread, so that thread can be told apart from idle workers.
+    """
+
+    def __init__(self, interval_seconds: float, retention_seconds: Optional[float] = None):
+        self.interval = interval_seconds
+        self.retention = retention_seconds
+        self.loop_thread = threading.get_ident()
+        self._samples: Deque[Tuple[float, Tuple[Tuple[str, Stack], ...]]] = deque()
+        self._stacks: Dict[Stack, Stack] = {}
+        self._labels: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = self._labels[code] = f"{module}:{code.co_qualname}"
+        return label
+
+    def _stack(self, ident: int, frame) -> Optional[Stack]:
+        if self._label(frame.f_code) in IDLE_FRAMES:
+            return WAITING_FOR_IO if ident == self.loop_thread else None
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        stack = tuple(labels)
+        # Identical stacks share one tuple, which keeps a long window small.
+        if len(self._stacks) > MAX_INTERNED_STACKS:
+            self._stacks = {}
+        return self._stacks.setdefault(stack, stack)
+
+    def _run(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        names_at = 0.0
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now - names_at > 1:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                names_at = now
+            sample = []
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = self._stack(ident, frame)
+                if stack is not None:
+                    sample.append((names.get(ident, str(ident)), stack))
+            # Do not keep the frames (and their locals) alive until the next sample.
+            del frames, frame
+            with self._lock:
+                self._samples.append((now, tuple(sample)))
+                if self.retention is not None:
+                    while self._samples and self._samples[0][0] < now - self.retention:
+                        self._samples.popleft()
+
+    def window(self, start: float, end: float) -> Tuple[Tally, int]:
+        """Folded stack counts and number of samples taken between two `time.monotonic()` readings."""
+        with self._lock:
+            samples = [sample for at, sample in self._samples if start <= at <= end]
+        counts: Tally = Tally()
+        for sample in samples:
+            for thread, stack in sample:
+                counts[(thread, *stack)] += 1
+        return counts, len(samples)
+
+
+def summarize_samples(counts: Tally, samples: int, interval: float) -> Dict[str, Any]:
+    self_counts: Tally = Tally()
+    total_counts: Tally = Tally()
+    for (thread, *frames), count in counts.items():
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    ms = interval * 1000
+    return {
+        "samples": samples,
+        "interval_ms": round(ms, 2),
+        "top": [
+            {"function": function, "self_ms": round(self_counts[function] * ms, 1),
+             "total_ms": round(total * ms, 1)}
+            for function, total in sorted(total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1]))
+        ][:TOP_FUNCTIONS],
+        "folded": [f"{';'.join(stack)} {count}" for stack, count in counts.most_common()],
+    }
+
+
+def summarize_cprofile(profiler: cProfile.Profile) -> Dict[str, Any]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: -item[1][3])[:TOP_FUNCTIONS]
+    return {
+        "top": [
+            {"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+             "self_ms": round(self_time * 1000, 2), "total_ms": round(total_time * 1000, 2)}
+            for (filename, line, name), (_, calls, self_time, total_time, _) in rows
+        ],
+    }
+
+
+class ProfileStore:
+    """Profiles as JSON files (plus `.prof` for cProfile runs), keeping the newest `keep`."""
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = max(keep, 1)
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def save(self, record: Dict[str, Any], profiler: Optional[cProfile.Profile] = None):
+        os.makedirs(self.directory, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(self._path(record["id"], ".prof"))
+        path = self._path(record["id"], ".json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(record, f)
+        os.replace(f"{path}.tmp", path)
+        self._prune()
+
+    def _prune(self):
+        records = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in records[:-self.keep]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(self._path(entry.name[:-5], suffix))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _ID_RE.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def pstats_path(self, profile_id: str) -> Optional[str]:
+        path = self._path(profile_id, ".prof")
+        return path if _ID_RE.match(profile_id) and os.path.exists(path) else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                record = self.get(entry.name[:-5])
+                if record is not None:
+                    summaries.append({k: v for k, v in record.items() if k not in ("top", "folded")})
+        return sorted(summaries, key=lambda record: record["created_at"], reverse=True)
+
+
+profile_store = ProfileStore(Config.PROFILE_DIR, Config.PROFILE_KEEP)
+slow_sampler: Optional[StackSampler] = None
+_cprofile_running = False
+
+
+def start():
+    """Start the slow-request sampler, if configured; called in each worker after startup."""
+    global slow_sampler
+    if Config.SLOW_REQUEST_SECONDS > 0 and slow_sampler is None:
+        slow_sampler = StackSampler(Config.SLOW_REQUEST_SAMPLE_INTERVAL_MS / 1000, Config.SLOW_REQUEST_WINDOW_SECONDS)
+        slow_sampler.start()
+
+
+def stop():
+    global slow_sampler
+    if slow_sampler is not None:
+        slow_sampler.stop()
+        slow_sampler = None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(Config.PROFILING_ADMIN_TOKEN and token
+                and hmac.compare_digest(token.encode(), Config.PROFILING_ADMIN_TOKEN.encode()))
+
+
+def _requested_mode(scope) -> Tuple[Optional[str], Optional[str]]:
+    """(profile mode, admin token) asked for by the request."""
+    mode = token = None
+    for name, value in scope.get("headers") or ():
+        if name == b"x-profile":
+            mode = value.decode("latin-1").strip().lower()
+        elif name == b"x-admin-token":
+            token = value.decode("latin-1")
+    if mode is None and b"profile=" in scope.get("query_string", b""):
+        for part in scope["query_string"].split(b"&"):
+            if part.startswith(b"profile="):
+                mode = part[len(b"profile="):].decode("latin-1").lower()
+    return mode, token
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running flagged requests under a profiler and capturing slow ones."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode, token = _requested_mode(scope)
+        if mode is not None:
+            return await self._profile(mode, token, scope, receive, send)
+        if slow_sampler is not None:
+            return await self._watch(slow_sampler, scope, receive, send)
+        return await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(status: int, detail: str, scope, receive, send):
+        await JSONResponse({"detail": detail}, status_code=status)(scope, receive, send)
+
+    def _record(self, kind: str, profile_id: str, scope, status: int, started: float, duration: float,
+                timings: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            "id": profile_id,
+            "kind": kind,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(scope.get("route"), "path", None),
+            "status": status,
+            "pid": os.getpid(),
+            "created_at": started,
+            "duration_ms": round(duration * 1000, 1),
+            "timings": timings_ms({name: seconds for name, seconds in timings.items() if name != "total"}),
+        }
+
+    async def _profile(self, mode: str, token: Optional[str], scope, receive, send):
+        global _cprofile_running
+        if not is_admin(token):
+            return await self._reject(403, "Profiling requires a valid X-Admin-Token", scope, receive, send)
+        if mode not in MODES:
+            return await self._reject(400, f"Unknown profile mode, use one of: {', '.join(MODES)}", scope, receive, send)
+        if mode == "cprofile" and _cprofile_running:
+            # One cProfile per thread; a second one would silently replace the first.
+            return await self._reject(409, "Another cprofile run is in progress", scope, receive, send)
+
+        profile_id = uuid.uuid4().hex[:16]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        started = time.time()
+        profiler = sampler = None
+        with collect_timings() as timings:
+            if mode == "cprofile":
+                _cprofile_running = True
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler(Config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+                sampler.start()
+            window_start = time.monotonic()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    _cprofile_running = False
+                else:
+                    sampler.stop()
+        record = self._record(mode, profile_id, scope, status, started, timings["total"], timings)
+        if profiler is not None:
+            record.update(summarize_cprofile(profiler))
+        else:
+            record.update(summarize_samples(*sampler.window(window_start, time.monotonic()), sampler.interval))
+        await self._save(record, profiler)
+
+    async def _watch(self, sampler: StackSampler, scope, receive, send):
+        status = 500
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.time()
+        window_start = time.monotonic()
+        with collect_timings() as timings:
+            await self.app(scope, receive, send_and_record_status)
+        if timings["total"] < Config.SLOW_REQUEST_SECONDS:
+            return
+
+        record = self._record("slow", uuid.uuid4().hex[:16], scope, status, started, timings["total"], timings)
+        record.update(summarize_samples(*sampler.window(window_start, time.monotonic()), sampler.interval))
+        SLOW_REQUESTS.inc(route=record["route"] or "unmatched")
+        logger.warning(f"Slow request {scope['method']} {scope['path']} took {record['duration_ms']:.0f} ms, "
+                       f"stack samples saved as profile {record['id']}")
+        await self._save(record)
+
+    async def _save(self, record: Dict[str, Any], profiler: Optional[cProfile.Profile] = None):
+        try:
+            await asyncio.to_thread(profile_store.save, record, profiler)
+        except Exception as e:
+            logger.error(f"Failed to store profile {record['id']}: {e}")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required")
+
+
+router = APIRouter(prefix="/debug/profiles", tags=["Debug"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+def list_profiles():
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, format: str = "json"):
+    if format == "pstats":
+        path = profile_store.pstats_path(profile_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="No cProfile data for this profile")
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
@@ -0,0 +1,148 @@
+"""Re-score stored features under an adjusted rubric.
+
+    python rescore.py --overrides stricter_grammar.json
+    python rescore.py --store /data/features --overrides new_rubric.json -o rescored.csv
+
+Reads the raw metrics and content fields recorded in the feature store (see
+feature_store.py) and applies the rubric to all of them with vectorized
+binning; LanguageTool, VADER and the LLM are not involved. The overrides file
+is a JSON object of `Config` attributes to replace, e.g.
+{"GRAMMAR_THRESHOLDS": {"excellent": 0.95, "good": 0.8, "average": 0.6, "poor": 0.4}}.
+
+Only rows recorded under one scoring rules version are compared (the newest
+in the store unless --rules-version is given): raw metrics and old scores
+from other versions were computed differently.
+"""
+import sys
+import csv
+import json
+import time
+import argparse
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from config import Config
+from feature_store import FEATURE_DTYPE, FeatureStore
+from rubric import Rubric
+
+
+def load_overrides(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = [name for name in overrides if not hasattr(Config, name)]
+    if unknown:
+        raise SystemExit(f"Unknown Config attributes in {path}: {', '.join(unknown)}")
+    return overrides
+
+
+def rescore(features: np.ndarray, rubric: Rubric) -> Dict[str, np.ndarray]:
+    """New per-criterion and overall scores for every stored row."""
+    scores = rubric.score_metrics(features)
+    content = rubric.content_scores(
+        features["salutation_score"], features["must_have_count"],
+        features["good_to_have_count"], features["flow_followed"],
+    )
+    columns = {name: scores[name] for name in scores.dtype.names}
+    columns["content_structure_score"] = content
+    columns["overall_score"] = (scores["rule_score"] + content).astype(np.int16)
+    return columns
+
+
+def select_rules_version(features: np.ndarray,
+                         rules_version: Optional[int] = None) -> Tuple[np.ndarray, Optional[int]]:
+    """Rows recorded under `rules_version` (default: the newest in `features`), and that version."""
+    if rules_version is None:
+        if not len(features):
+            return features, None
+        rules_version = int(features["rules_version"].max())
+    return features[features["rules_version"] == rules_version], rules_version
+
+
+def latest_per_transcript(features: np.ndarray) -> np.ndarray:
+    """Keep only the most recent record of each transcript and duration."""
+    # The same text scored with another duration has a different speech rate, so it is another record.
+    keys = np.empty(len(features), dtype=[("transcript_key", FEATURE_DTYPE["transcript_key"]), ("duration", np.float64)])
+    keys["transcript_key"] = features["transcript_key"]
+    keys["duration"] = np.nan_to_num(features["duration"], nan=-1.0)
+    # `features` is sorted oldest first, so the first hit in reverse is the latest.
+    _, first = np.unique(keys[::-1], return_index=True)
+    return features[np.sort(len(features) - 1 - first)]
+
+
+def summarize(features: np.ndarray, scores: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    old = features["overall_score"].astype(np.int32)
+    new = scores["overall_score"].astype(np.int32)
+    delta = new - old
+    summary = {
+        "rows": int(len(features)),
+        "changed": int(np.count_nonzero(delta)),
+        "mean_old": round(float(old.mean()), 2) if len(old) else None,
+        "mean_new": round(float(new.mean()), 2) if len(new) else None,
+        "max_increase": int(delta.max()) if len(delta) else 0,
+        "max_decrease": int(-delta.min()) if len(delta) else 0,
+    }
+    summary["criteria_mean"] = {
+        name: round(float(values.mean()), 2) if len(values) else None
+        for name, values in scores.items() if name != "overall_score"
+    }
+    return summary
+
+
+def write_csv(path: str, features: np.ndarray, scores: Dict[str, np.ndarray]):
+    names = list(scores)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["record_id", "transcript_key", "recorded_at", "old_overall_score"] + names)
+        columns = [scores[name] for name in names]
+        for i in range(len(features)):
+            writer.writerow([
+                features["record_id"][i], features["transcript_key"][i],
+                f"{features['recorded_at'][i]:.3f}", int(features["overall_score"][i]),
+            ] + [int(column[i]) for column in columns])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored scoring features under an adjusted rubric.")
+    parser.add_argument("--store", default=Config.FEATURE_STORE_PATH,
+                        help="Feature store directory (default: FEATURE_STORE_PATH)")
+    parser.add_argument("--overrides", help="JSON file of Config attributes to replace")
+    parser.add_argument("--since", type=float, help="Only rows recorded at or after this Unix timestamp")
+    parser.add_argument("--rules-version", type=int,
+                        help="Compare rows recorded under this rules version (default: the newest stored)")
+    parser.add_argument("--all-records", action="store_true",
+                        help="Keep every record instead of the latest per transcript and duration")
+    parser.add_argument("-o", "--output", help="CSV file for per-row scores")
+    args = parser.parse_args(argv)
+    if not args.store:
+        parser.error("--store is required when FEATURE_STORE_PATH is not set")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    started = time.monotonic()
+
+    config = Config
+    if args.overrides:
+        config = type("RescoreConfig", (Config,), load_overrides(args.overrides))
+    rubric = Rubric.from_config(config)
+
+    features = FeatureStore(args.store).load(since=args.since)
+    features, rules_version = select_rules_version(features, args.rules_version)
+    if not args.all_records:
+        features = latest_per_transcript(features)
+    loaded = time.monotonic()
+
+    scores = rescore(features, rubric)
+    summary = summarize(features, scores)
+    summary["rules_version"] = rules_version
+    summary["load_seconds"] = round(loaded - started, 3)
+    summary["score_seconds"] = round(time.monotonic() - loaded, 3)
+
+    if args.output:
+        write_csv(args.output, features, scores)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from logs import logger
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU cache with TTL expiry and an optional SQLite backing file.
+
+    Values must be JSON-serializable; every `get` returns a fresh copy so callers
+    can mutate results freely. With `path` set, entries survive restarts and
+    memory misses fall through to disk before counting as a miss. Code on the
+    event loop uses `aget`/`aset`, which run the SQLite tier in a thread.
+    """
+
+    _PRUNE_EVERY = 256
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, path: Optional[str] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path or None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # The SQLite tier has its own lock, so memory hits never wait on disk I/O.
+        self._disk_lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def _table(self) -> str:
+        return f"cache_{self.name}"
+
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """The SQLite connection, opened on first use in each process (the cache may be created before a fork)."""
+        if self.path is None:
+            return None
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute("PRAGMA synchronous=NORMAL")
+                self._connection.execute("PRAGMA busy_timeout=5000")
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self._table} "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._connection.commit()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"{self.name} cache: disk backend at {self.path} unavailable, using memory only: {e}")
+                self.path = None
+                self._connection = None
+        return self._connection
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            return self._loaded(key, self._disk_get(key, now), now)
+        return json.loads(payload)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """`get` for the event loop: only the in-memory lookup runs on the loop."""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            disk_payload = await asyncio.to_thread(self._disk_get, key, now) if self.path is not None else None
+            return self._loaded(key, disk_payload, now)
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any):
+        payload, expires_at = self._store(key, value)
+        self._disk_set(key, payload, expires_at)
+
+    async def aset(self, key: str, value: Any):
+        """`set` for the event loop: the disk write runs in a thread."""
+        payload, expires_at = self._store(key, value)
+        if self.path is not None:
+            await asyncio.to_thread(self._disk_set, key, payload, expires_at)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            del self._entries[key]
+            return None
+
+    def _loaded(self, key: str, payload: Optional[str], now: float) -> Optional[Any]:
+        """Count a memory miss, keeping what the disk tier returned (if anything) in memory."""
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, payload, now + self.ttl_seconds)
+        return json.loads(payload)
+
+    def _store(self, key: str, value: Any):
+        payload = json.dumps(value)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, payload, expires_at)
+        return payload, expires_at
+
+    def _remember(self, key: str, payload: str, expires_at: float):
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        with self._disk_lock:
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    f"SELECT value FROM {self._table} WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.name} cache: disk read failed: {e}")
+                return None
+        return row[0] if row else None
+
+    def _disk_set(self, key: str, payload: str, expires_at: float):
+        with self._disk_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at),
+                )
+                self._writes += 1
+                if self._writes % self._PRUNE_EVERY == 0:
+                    self._db.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.name} cache: disk write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        with self._disk_lock:
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self._table}")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.path is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key into one in-flight task.
+
+    Callers arriving while a task for the same key is running await that task
+    instead of starting their own; a cancelled caller does not cancel it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away.
+            future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,141 @@
+"""Rule-based rubric compiled to bin tables.
+
+Each criterion maps one raw metric to points through sorted bin edges, so a
+single transcript is scored with `bisect` and a whole archive with one
+`np.digitize` call per criterion. Raw metrics and scores are kept apart: an
+archive's metrics can be re-scored against an adjusted rubric without touching
+the transcripts again.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from config import Config
+
+# Raw metrics per transcript. NaN marks a metric that could not be measured
+# (no duration, grammar check unavailable, no sentiment analyzer).
+METRIC_DTYPE = np.dtype([
+    ("word_count", np.int32),
+    ("wpm", np.float64),
+    ("grammar_errors", np.float64),
+    ("grammar_accuracy", np.float64),
+    ("ttr", np.float64),
+    ("filler_rate", np.float64),
+    ("engagement", np.float64),
+])
+
+
+class Criterion:
+    """Points for one metric: bin `i` of `edges` scores `points[i]`.
+
+    With `right=False` a value equal to an edge falls into the bin above it
+    (`value >= edge`); with `right=True` it stays in the bin below (`value <= edge`).
+    `missing` is awarded when the metric is NaN.
+    """
+
+    def __init__(self, name: str, metric: str, edges: Sequence[float], points: Sequence[int],
+                 missing: int, labels: Optional[Sequence[str]] = None, right: bool = False):
+        if len(points) != len(edges) + 1:
+            raise ValueError(f"{name}: {len(edges)} edges need {len(edges) + 1} points, got {len(points)}")
+        self.name = name
+        self.metric = metric
+        self.edges = [float(edge) for edge in edges]
+        self.points = list(points)
+        self.missing = missing
+        self.labels = list(labels) if labels else None
+        self.right = right
+        self._edges = np.asarray(self.edges)
+        self._points = np.asarray(self.points, dtype=np.int16)
+
+    def bin(self, value: float) -> int:
+        return bisect_left(self.edges, value) if self.right else bisect_right(self.edges, value)
+
+    def score(self, value: Optional[float]) -> int:
+        if value is None or value != value:
+            return self.missing
+        return self.points[self.bin(value)]
+
+    def label(self, value: float) -> Optional[str]:
+        return self.labels[self.bin(value)] if self.labels else None
+
+    def score_array(self, values: np.ndarray) -> np.ndarray:
+        scores = self._points[np.digitize(values, self._edges, right=self.right)]
+        return np.where(np.isnan(values), self.missing, scores).astype(np.int16)
+
+
+class Rubric:
+    """The rule-based criteria, in breakdown order, plus content-structure weights."""
+
+    def __init__(self, criteria: Iterable[Criterion], keyword_points: Dict[str, int] = None,
+                 content_caps: Dict[str, int] = None):
+        self.criteria: Dict[str, Criterion] = {c.name: c for c in criteria}
+        self.keyword_points = keyword_points or {"must_have": 4, "good_to_have": 2}
+        self.content_caps = content_caps or {"salutation": 5, "keyword_presence": 30, "flow": 5}
+
+    def keyword_score(self, must_have: int, good_to_have: int) -> int:
+        points = must_have * self.keyword_points["must_have"] + good_to_have * self.keyword_points["good_to_have"]
+        return min(points, self.content_caps["keyword_presence"])
+
+    def content_scores(self, salutation: np.ndarray, must_have: np.ndarray, good_to_have: np.ndarray,
+                       flow_followed: np.ndarray) -> np.ndarray:
+        """Vectorized content & structure points from stored content fields."""
+        keywords = np.minimum(
+            must_have * self.keyword_points["must_have"] + good_to_have * self.keyword_points["good_to_have"],
+            self.content_caps["keyword_presence"],
+        )
+        flow = np.where(flow_followed, self.content_caps["flow"], 0)
+        return (np.minimum(salutation, self.content_caps["salutation"]) + keywords + flow).astype(np.int16)
+
+    def __getitem__(self, name: str) -> Criterion:
+        return self.criteria[name]
+
+    @property
+    def score_dtype(self) -> np.dtype:
+        return np.dtype([(f"{name}_score", np.int16) for name in self.criteria] + [("rule_score", np.int16)])
+
+    @classmethod
+    def from_config(cls, config=Config) -> "Rubric":
+        speech = config.SPEECH_RATE_THRESHOLDS
+        # Contiguous bands. The original if/elif chain left a gap, scoring too_fast - 1 < wpm < too_fast
+        # as "Too Slow" (2 points) and wpm == too_fast as "Too Slow" too; here they are "Fast" (6 points)
+        # and "Too Fast" (2 points). Every other value scores as before (tests/test_rubric.py).
+        return cls([
+            Criterion(
+                "speech_rate", "wpm",
+                [speech["slow_min"], speech["ideal_min"], speech["fast_min"], speech["too_fast"]],
+                [2, 6, 10, 6, 2], missing=10,
+                labels=["Too Slow", "Slow", "Ideal", "Fast", "Too Fast"],
+            ),
+            Criterion("grammar", "grammar_accuracy", _ascending(config.GRAMMAR_THRESHOLDS), [2, 4, 6, 8, 10],
+                      missing=config.GRAMMAR_FALLBACK_SCORE),
+            Criterion("vocabulary", "ttr", _ascending(config.VOCAB_THRESHOLDS), [2, 4, 6, 8, 10], missing=2),
+            Criterion("clarity", "filler_rate", _ascending(config.FILLER_THRESHOLDS), [15, 12, 9, 6, 3],
+                      missing=15, right=True),
+            Criterion("engagement", "engagement", _ascending(config.ENGAGEMENT_THRESHOLDS), [3, 6, 9, 12, 15],
+                      missing=15),
+        ], keyword_points=config.KEYWORD_POINTS, content_caps=config.RUBRIC["content_structure"])
+
+    def score_metrics(self, metrics: np.ndarray) -> np.ndarray:
+        """Vectorized scores for a `METRIC_DTYPE` array; rows with no words score 0."""
+        scores = np.zeros(len(metrics), dtype=self.score_dtype)
+        has_words = metrics["word_count"] > 0
+        for name, criterion in self.criteria.items():
+            field = f"{name}_score"
+            scores[field] = np.where(has_words, criterion.score_array(metrics[criterion.metric]), 0)
+            scores["rule_score"] += scores[field]
+        return scores
+
+
+def _ascending(thresholds: Dict[str, float]) -> List[float]:
+    return sorted(thresholds.values())
+
+
+def metrics_array(rows: Iterable[Dict[str, Optional[float]]]) -> np.ndarray:
+    """Pack raw metric dicts (see `ScoringEngine.raw_metrics`) into a `METRIC_DTYPE` array."""
+    rows = list(rows)
+    metrics = np.empty(len(rows), dtype=METRIC_DTYPE)
+    for field in METRIC_DTYPE.names:
+        metrics[field] = [np.nan if row.get(field) is None else row[field] for row in rows]
+    return metrics
+
+
+rubric = Rubric.from_config()
@@ -1,174 +1,181 @@
-import re
 import json
+import time
 import random
-from typing import Dict, Any, List
-from groq import Groq
+import asyncio
+import numpy as np
+import numpy.lib.recfunctions as rfn
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
 from config import Config
+from groq_clients import client_pool
+from result_cache import ResultCache, make_key, normalize_text
+from grammar import grammar_checker
+from feature_store import feature_store
+from analyzers import get_sentiment_analyzer
+from lexicon import LexicalAnalysis, lexicon
+from local_rules import analyze_content
+from llm_packing import PACKED_PROMPT, LLMPacker
+from admission import llm_capacity
+from rubric import METRIC_DTYPE, metrics_array, rubric
+from metrics import FALLBACKS, record_stage, stage
 from logs import logger
 
-
-try:
-    import language_tool_python
-    tool = language_tool_python.LanguageTool('en-US')
-except ImportError:
-    tool = None
-    logger.warning("language-tool-python not found. Grammar scoring will be mocked or limited.")
-except Exception as e:
-    tool = None
-    logger.warning(f"LanguageTool failed to init: {e}")
-
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-    analyzer = SentimentIntensityAnalyzer()
-except ImportError:
-    analyzer = None
-    logger.warning("vaderSentiment not found. Sentiment scoring will be limited.")
+# Bump when rule-based scoring changes so cached results from older rules are not reused.
+RULES_VERSION = 4
 
 class ScoringEngine:
     def __init__(self):
-        self.api_keys = Config.GROQ_API_KEYS
-        self.current_key_index = 0
+        self.clients = client_pool
+        # LanguageTool and VADER are blocking; they run here so the event loop stays free.
+        self.executor = ThreadPoolExecutor(max_workers=Config.RULE_BASED_WORKERS, thread_name_prefix="rule-based")
+        self.rubric_hash = make_key(
+            RULES_VERSION, Config.SYSTEM_PROMPT, Config.RUBRIC,
+            Config.CONTENT_ANALYSIS_MODE, Config.LOCAL_CONFIDENCE_THRESHOLD, Config.SALUTATION_PHRASES,
+            Config.CLOSING_PHRASES, Config.FLOW_BASIC_CATEGORIES, Config.SPEECH_RATE_THRESHOLDS, Config.GRAMMAR_THRESHOLDS,
+            Config.VOCAB_THRESHOLDS, Config.FILLER_THRESHOLDS, Config.ENGAGEMENT_THRESHOLDS,
+            Config.MUST_HAVE_KEYWORDS, Config.GOOD_TO_HAVE_KEYWORDS, Config.FILLER_WORDS, Config.KEYWORD_POINTS,
+            Config.LLM_PACKING, PACKED_PROMPT,
+        )
+        self.packer = None
+        if Config.LLM_PACKING:
+            self.packer = LLMPacker(
+                self.clients, Config.LLM_PACK_MAX_ITEMS, Config.LLM_PACK_MAX_TOKENS, Config.LLM_PACK_WAIT_MS / 1000
+            )
+        self.cache = None
+        if Config.RESULT_CACHE_MAX_ENTRIES > 0:
+            self.cache = ResultCache(
+                "scoring", Config.RESULT_CACHE_MAX_ENTRIES, Config.RESULT_CACHE_TTL_SECONDS, Config.RESULT_CACHE_PATH
+            )
+
+    def cache_key(self, transcript: str, duration: int = None) -> str:
+        return make_key(normalize_text(transcript), duration, Config.MODEL_NAME, self.rubric_hash)
+
+    async def llm_content(self, transcript: str, llm_limit: asyncio.Semaphore = None) -> Optional[Dict[str, Any]]:
+        """Content fields from the LLM, packed with other transcripts when enabled; None on failure."""
+        if llm_limit is not None:
+            async with llm_limit:
+                return await self.llm_content(transcript)
+
+        if self.packer is not None:
+            return await self.packer.analyze(transcript)
+        llm_result = await self._call_llm(transcript)
+        return self._parse_llm_content(llm_result) if llm_result is not None else None
+
+    async def _call_llm(self, transcript: str) -> Optional[Dict[str, Any]]:
+        """Return the parsed LLM analysis, or None when every attempt failed."""
+        prompt = f"{Config.SYSTEM_PROMPT}\n\nTranscript:\n{transcript}"
 
-    def _get_client(self):
-        if not self.api_keys:
-            raise ValueError("No Groq API keys found in environment variables.")
+        def parse_content(chat_completion):
+            content = chat_completion.choices[0].message.content
+            logger.debug(f"Received response from LLM: {content}")
+            return json.loads(content)
 
-        key = self.api_keys[self.current_key_index]
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        return Groq(api_key=key)
-    def _call_llm(self, transcript: str) -> Dict[str, Any]:
-        prompt = f"{Config.SYSTEM_PROMPT}\n\nTranscript:\n{transcript}"
-        
-        max_retries = len(self.api_keys)
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                client = self._get_client()
-                logger.info(f"Sending request to Groq LLM with model: {Config.MODEL_NAME} (attempt {attempt + 1}/{max_retries})")
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                        }
-                    ],
-                    model=Config.MODEL_NAME,
-                    response_format={"type": "json_object"}
+        try:
+            with stage("llm"), llm_capacity.call():
+                return await self.clients.run(
+                    f"Groq LLM ({Config.MODEL_NAME})",
+                    lambda client: client.chat.completions.with_raw_response.create(
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt,
+                            }
+                        ],
+                        model=Config.MODEL_NAME,
+                        response_format={"type": "json_object"}
+                    ),
+                    parse=parse_content,
                 )
-                
-                content = chat_completion.choices[0].message.content
-                logger.info(f"Received response from LLM: {content}")
-                return json.loads(content)
-            except Exception as e:
-                last_error = e
-                logger.warning(f"LLM Call failed (attempt {attempt + 1}/{max_retries}): {e}")
-                
-                if attempt < max_retries - 1:
-                    logger.info(f"Retrying with next API key...")
-        
-        logger.error(f"All LLM API keys failed. Last error: {last_error}")
-        
-        return {
-            "Salutation Level": "Normal",
-            "Keyword Presence": [],
-            "Flow": "Order Not followed",
-            "Engagement": "Neutral"
-        }
+        except Exception as e:
+            logger.error(f"All LLM attempts failed, using local content analysis: {e}")
+            return None
 
 
-    def calculate_rule_based(self, text: str, duration_sec: int = None) -> Dict[str, Any]:
-        words = re.findall(r'\b\w+\b', text.lower())
-        word_count = len(words)
-        if word_count == 0:
-            return {}
+    def raw_metrics(self, text: str, duration_sec: int = None, lexical: LexicalAnalysis = None,
+                    count_errors: Callable[[str], Optional[int]] = None) -> Dict[str, Any]:
+        """Unscored rule-based measurements; `rubric` turns them into points.
 
+        Metrics that could not be measured are None. `count_errors` replaces the
+        LanguageTool check, e.g. with error counts already known per sentence.
+        """
+        lexical = lexical or lexicon.analyze(text)
+        word_count = lexical.word_count
+        metrics = {
+            "word_count": word_count,
+            "wpm": None,
+            "grammar_accuracy": None,
+            "grammar_errors": None,
+            "ttr": lexical.type_token_ratio,
+            "filler_rate": (lexical.filler_count / word_count) * 100 if word_count > 0 else 0,
+            "filler_count": lexical.filler_count,
+            "engagement": None,
+            "lexical": lexical,
+            # Measured here and recorded by the caller; this may run in another thread or process.
+            "timings": {},
+        }
+        if word_count == 0:
+            return metrics
 
-        wpm = 0
-        speech_score = 0
-        speech_feedback = "N/A"
         if duration_sec and duration_sec > 0:
-            wpm = (word_count / duration_sec) * 60
-            if wpm > Config.SPEECH_RATE_THRESHOLDS["too_fast"]:
-                speech_score = 2
-                speech_feedback = "Too Fast"
-            elif Config.SPEECH_RATE_THRESHOLDS["fast_min"] <= wpm <= Config.SPEECH_RATE_THRESHOLDS["too_fast"] - 1:
-                speech_score = 6
-                speech_feedback = "Fast"
-            elif Config.SPEECH_RATE_THRESHOLDS["ideal_min"] <= wpm < Config.SPEECH_RATE_THRESHOLDS["fast_min"]:
-                speech_score = 10
-                speech_feedback = "Ideal"
-            elif Config.SPEECH_RATE_THRESHOLDS["slow_min"] <= wpm < Config.SPEECH_RATE_THRESHOLDS["ideal_min"]:
-                speech_score = 6
-                speech_feedback = "Slow"
-            else:
-                speech_score = 2
-                speech_feedback = "Too Slow"
-        else:
-
-            speech_score = 10
-            speech_feedback = "Duration not provided (Assumed Ideal)"
-
-
-        grammar_score = 10
-        errors = 0
-        if tool:
-            matches = tool.check(text)
-            errors = len(matches)
-            raw_score = 1 - min((errors / word_count * 100) / 10, 1)
-            
-            if raw_score >= Config.GRAMMAR_THRESHOLDS["excellent"]: grammar_score = 10
-            elif raw_score >= Config.GRAMMAR_THRESHOLDS["good"]: grammar_score = 8
-            elif raw_score >= Config.GRAMMAR_THRESHOLDS["average"]: grammar_score = 6
-            elif raw_score >= Config.GRAMMAR_THRESHOLDS["poor"]: grammar_score = 4
-            else: grammar_score = 2
-        
-
-        unique_words = len(set(words))
-        ttr = unique_words / word_count if word_count > 0 else 0
-        vocab_score = 0
-        if ttr >= Config.VOCAB_THRESHOLDS["excellent"]: vocab_score = 10
-        elif ttr >= Config.VOCAB_THRESHOLDS["good"]: vocab_score = 8
-        elif ttr >= Config.VOCAB_THRESHOLDS["average"]: vocab_score = 6
-        elif ttr >= Config.VOCAB_THRESHOLDS["poor"]: vocab_score = 4
-        else: vocab_score = 2
-
+            metrics["wpm"] = (word_count / duration_sec) * 60
 
-        filler_count = sum(1 for w in words if w in Config.FILLER_WORDS)
-        filler_rate = (filler_count / word_count) * 100 if word_count > 0 else 0
-        clarity_score = 0
-        if filler_rate <= Config.FILLER_THRESHOLDS["excellent"]: clarity_score = 15
-        elif filler_rate <= Config.FILLER_THRESHOLDS["good"]: clarity_score = 12
-        elif filler_rate <= Config.FILLER_THRESHOLDS["average"]: clarity_score = 9
-        elif filler_rate <= Config.FILLER_THRESHOLDS["poor"]: clarity_score = 6
-        else: clarity_score = 3
+        started = time.perf_counter()
+        errors = (count_errors or grammar_checker.count_errors)(text)
+        metrics["timings"]["languagetool"] = time.perf_counter() - started
+        if errors is not None:
+            metrics["grammar_errors"] = errors
+            metrics["grammar_accuracy"] = 1 - min((errors / word_count * 100) / 10, 1)
 
-
-        sentiment_score = 0
-        pos_score = 0
+        analyzer = get_sentiment_analyzer()
         if analyzer:
+            started = time.perf_counter()
             vs = analyzer.polarity_scores(text)
+            metrics["timings"]["vader"] = time.perf_counter() - started
+            metrics["engagement"] = (vs['compound'] + 1) / 2
+        return metrics
+
+    def calculate_rule_based(self, text: str, duration_sec: int = None, lexical: LexicalAnalysis = None) -> Dict[str, Any]:
+        return self.score_raw_metrics(self.raw_metrics(text, duration_sec, lexical))
 
-            compound_norm = (vs['compound'] + 1) / 2
-            pos_score = compound_norm
-            
-            if pos_score >= Config.ENGAGEMENT_THRESHOLDS["excellent"]: sentiment_score = 15
-            elif pos_score >= Config.ENGAGEMENT_THRESHOLDS["good"]: sentiment_score = 12
-            elif pos_score >= Config.ENGAGEMENT_THRESHOLDS["average"]: sentiment_score = 9
-            elif pos_score >= Config.ENGAGEMENT_THRESHOLDS["poor"]: sentiment_score = 6
-            else: sentiment_score = 3
+    def score_raw_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Rubric points and feedback for `raw_metrics` output."""
+        if metrics["word_count"] == 0:
+            return {}
+
+        wpm = metrics["wpm"]
+        if wpm is None:
+            speech_feedback = "Duration not provided (Assumed Ideal)"
         else:
-            sentiment_score = 15 
+            speech_feedback = rubric["speech_rate"].label(wpm)
 
+        errors = metrics["grammar_errors"]
         return {
-            "word_count": word_count,
-            "speech_rate": {"wpm": wpm, "score": speech_score, "feedback": speech_feedback},
-            "grammar": {"errors": errors, "score": grammar_score},
-            "vocabulary": {"ttr": ttr, "score": vocab_score},
-            "clarity": {"filler_rate": filler_rate, "score": clarity_score, "count": filler_count},
-            "engagement_rule": {"pos_score": pos_score, "score": sentiment_score}
+            "word_count": metrics["word_count"],
+            "speech_rate": {"wpm": wpm or 0, "score": rubric["speech_rate"].score(wpm), "feedback": speech_feedback},
+            "grammar": {"errors": errors or 0, "score": rubric["grammar"].score(metrics["grammar_accuracy"]), "checked": errors is not None},
+            "vocabulary": {"ttr": metrics["ttr"], "score": rubric["vocabulary"].score(metrics["ttr"])},
+            "clarity": {"filler_rate": metrics["filler_rate"], "score": rubric["clarity"].score(metrics["filler_rate"]),
+                        "count": metrics["filler_count"]},
+            "engagement_rule": {"pos_score": metrics["engagement"] or 0,
+                                "score": rubric["engagement"].score(metrics["engagement"])},
+            "lexical": metrics["lexical"].to_dict(),
+            "raw": {field: metrics[field] for field in METRIC_DTYPE.names},
+            "timings": metrics["timings"],
         }
 
+    def score_rule_batch(self, transcripts: List[str], durations: List[Optional[int]] = None,
+                         executor: Executor = None) -> np.ndarray:
+        """Rule-based scores for many transcripts as a structured array.
+
+        Returns the raw metric fields (see `rubric.METRIC_DTYPE`) followed by
+        a `<criterion>_score` field per criterion and `rule_score`. Only measuring runs per
+        transcript; all thresholds are applied in one vectorized pass.
+        """
+        durations = durations or [None] * len(transcripts)
+        mapper = executor.map if executor else map
+        metrics = metrics_array(mapper(raw_rule_metrics, transcripts, durations))
+        return rfn.merge_arrays([metrics, rubric.score_metrics(metrics)], flatten=True)
+
     def _flatten_list(self, data):
         """Recursively flatten nested lists and extract strings."""
         result = []
@@ -184,17 +191,73 @@ class ScoringEngine:
                 result.extend(self._flatten_list(item))
         return result
 
-    def score_transcript(self, transcript: str, duration: int = None):
-
-        rb_metrics = self.calculate_rule_based(transcript, duration)
-        
-
-        llm_result = self._call_llm(transcript)
-        
-
-        breakdown = []
+    async def score_transcript_async(
+        self,
+        transcript: str,
+        duration: int = None,
+        llm_limit: asyncio.Semaphore = None,
+        rule_executor: Executor = None,
+        record_id: str = None,
+    ):
+        """Score a transcript, overlapping the LLM call with the rule-based metrics.
+
+        `llm_limit` optionally bounds how many LLM calls a caller (e.g. a batch) has in flight;
+        `rule_executor` replaces the engine's thread pool, e.g. with a process pool for bulk runs.
+        `record_id` labels the row written to the feature store, if one is configured.
+        """
+        key = self.cache_key(transcript, duration) if self.cache else None
+        if key:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                logger.info("Scoring cache hit")
+                return cached
+
+        # The lexical pass is cheap; it decides whether the LLM is needed at all.
+        with stage("lexicon"):
+            lexical = lexicon.analyze(transcript)
+            local = analyze_content(lexical)
+        mode = Config.CONTENT_ANALYSIS_MODE
+        use_llm = mode == "llm" or (mode == "hybrid" and local.confidence < Config.LOCAL_CONFIDENCE_THRESHOLD)
+        # Interactive requests skip the LLM while it is saturated (see admission.py).
+        shed = use_llm and llm_capacity.should_shed()
+        use_llm = use_llm and not shed
+
+        loop = asyncio.get_running_loop()
+        rb_future = loop.run_in_executor(
+            rule_executor or self.executor, rule_based_metrics, transcript, duration, lexical
+        )
+        llm_content = None
+        if use_llm:
+            rb_metrics, llm_content = await asyncio.gather(rb_future, self.llm_content(transcript, llm_limit))
+        else:
+            rb_metrics = await rb_future
+        for name, seconds in rb_metrics.get("timings", {}).items():
+            record_stage(name, seconds)
 
+        with stage("result_assembly"):
+            if llm_content is not None:
+                content, source = llm_content, "llm"
+            else:
+                # Local rules also stand in when every LLM attempt failed.
+                content, source = local.content(), "local_fallback" if use_llm else "local_shed" if shed else "local"
+
+            result = self.build_result(rb_metrics, content, duration)
+            result["content_analysis"] = {"source": source, "local_confidence": local.confidence}
+        if feature_store is not None and rb_metrics:
+            await feature_store.aappend(self._feature_row(transcript, duration, rb_metrics, content, source, result, record_id))
+
+        # Degraded results (failed LLM call, busy grammar checker) are not cached.
+        grammar_degraded = grammar_checker.configured and not rb_metrics.get("grammar", {}).get("checked", True)
+        if source == "local_fallback":
+            FALLBACKS.inc(stage="llm")
+        if grammar_degraded:
+            FALLBACKS.inc(stage="grammar")
+        if key and source not in ("local_fallback", "local_shed") and not grammar_degraded:
+            await self.cache.aset(key, result)
+        return result
 
+    def _parse_llm_content(self, llm_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize the LLM's free-form JSON into the content fields used for scoring."""
         sal_data = llm_result.get("Salutation Level", llm_result.get("salutation_level", "Normal"))
         sal_level = "Normal"
         sal_score = 2
@@ -226,7 +289,7 @@ class ScoringEngine:
             logger.error(f"Error normalizing keywords: {e}, Raw: {found_keywords_raw}")
             found_lower = []
 
-        logger.info(f"Normalized keywords from LLM: {found_lower}")
+        logger.debug(f"Normalized keywords from LLM: {found_lower}")
         
         mh_count = 0
         for category, keywords in Config.MUST_HAVE_KEYWORDS.items():
@@ -235,8 +298,6 @@ class ScoringEngine:
             elif any(category in k for k in found_lower): 
                 mh_count += 1
                 
-        mh_score = mh_count * 4
-        
         gh_count = 0
         for category, keywords in Config.GOOD_TO_HAVE_KEYWORDS.items():
             if any(kw in k for k in found_lower for kw in keywords):
@@ -244,10 +305,6 @@ class ScoringEngine:
             elif any(category in k for k in found_lower):
                 gh_count += 1
                 
-        gh_score = gh_count * 2
-        
-        keyword_score = min(mh_score + gh_score, 30)
-        logger.info(f"Keyword Score: {keyword_score} (MH: {mh_count}, GH: {gh_count})")
 
 
         flow_data = llm_result.get("Flow", llm_result.get("flow", "Order Not followed"))
@@ -273,30 +330,78 @@ class ScoringEngine:
         if "order followed" in flow_status_lower or "5" in flow_status_lower or "yes" in flow_status_lower or "true" in flow_status_lower:
             flow_score = 5
 
-        content_score = sal_score + keyword_score + flow_score
-        breakdown.append({"criterion": "Content & Structure", "score": content_score, "max": 40, "feedback": f"Salutation: {sal_level}, Keywords found: {len(found_lower)} items, Flow: {flow_status}"})
+        engagement_data = llm_result.get("Engagement", llm_result.get("Engagement/Sentiment", llm_result.get("engagement_sentiment", "Neutral")))
+        llm_sentiment = "Neutral"
+        
+        if isinstance(engagement_data, dict):
+            llm_sentiment = str(engagement_data.get("tone", engagement_data.get("description", "Neutral")))
+        else:
+            llm_sentiment = str(engagement_data)
+
+        return {
+            "salutation_level": sal_level,
+            "salutation_score": sal_score,
+            "keywords_found": len(found_lower),
+            "must_have_count": mh_count,
+            "good_to_have_count": gh_count,
+            "flow_status": flow_status,
+            "flow_score": flow_score,
+            "sentiment": llm_sentiment,
+        }
+
+    def _feature_row(self, transcript: str, duration: Optional[int], rb_metrics: Dict[str, Any],
+                     content: Dict[str, Any], source: str, result: Dict[str, Any],
+                     record_id: str = None) -> Dict[str, Any]:
+        """Everything needed to re-score this transcript under another rubric (see rescore.py)."""
+        return {
+            "record_id": record_id,
+            "transcript_key": make_key(normalize_text(transcript)),
+            "recorded_at": time.time(),
+            "rules_version": RULES_VERSION,
+            "duration": duration,
+            **rb_metrics["raw"],
+            "content_source": source,
+            "salutation_level": content["salutation_level"],
+            "salutation_score": content["salutation_score"],
+            "must_have_count": content["must_have_count"],
+            "good_to_have_count": content["good_to_have_count"],
+            "flow_followed": content["flow_score"] > 0,
+            "sentiment": content["sentiment"],
+            "overall_score": result["overall_score"],
+        }
+
+    def _sentiment_label(self, pos_score: float) -> str:
+        if pos_score >= 0.6:
+            return "Positive"
+        # pos_score is 0 when VADER is unavailable; that says nothing about tone.
+        if 0 < pos_score <= 0.4:
+            return "Negative"
+        return "Neutral"
+
+    def build_result(self, rb_metrics: Dict[str, Any], content: Dict[str, Any], duration: int = None):
+        breakdown = []
+
+        keyword_score = rubric.keyword_score(content['must_have_count'], content['good_to_have_count'])
+        logger.debug(f"Keyword Score: {keyword_score} (MH: {content['must_have_count']}, GH: {content['good_to_have_count']})")
+
+        content_score = content['salutation_score'] + keyword_score + content['flow_score']
+        breakdown.append({"criterion": "Content & Structure", "score": content_score, "max": 40, "feedback": f"Salutation: {content['salutation_level']}, Keywords found: {content['keywords_found']} items, Flow: {content['flow_status']}"})
 
 
         breakdown.append({"criterion": "Speech Rate", "score": rb_metrics['speech_rate']['score'], "max": 10, "feedback": f"{rb_metrics['speech_rate']['wpm']:.0f} WPM ({rb_metrics['speech_rate']['feedback']})"})
 
 
         lg_score = rb_metrics['grammar']['score'] + rb_metrics['vocabulary']['score']
-        breakdown.append({"criterion": "Language & Grammar", "score": lg_score, "max": 20, "feedback": f"Grammar Score: {rb_metrics['grammar']['score']}/10, Vocabulary Score: {rb_metrics['vocabulary']['score']}/10 (TTR: {rb_metrics['vocabulary']['ttr']:.2f})"})
+        grammar_note = "" if rb_metrics['grammar'].get('checked', True) else " (grammar check unavailable)"
+        breakdown.append({"criterion": "Language & Grammar", "score": lg_score, "max": 20, "feedback": f"Grammar Score: {rb_metrics['grammar']['score']}/10{grammar_note}, Vocabulary Score: {rb_metrics['vocabulary']['score']}/10 (TTR: {rb_metrics['vocabulary']['ttr']:.2f})"})
 
 
         breakdown.append({"criterion": "Clarity", "score": rb_metrics['clarity']['score'], "max": 15, "feedback": f"Filler Word Rate: {rb_metrics['clarity']['filler_rate']:.1f}%"})
 
 
-        engagement_data = llm_result.get("Engagement", llm_result.get("Engagement/Sentiment", llm_result.get("engagement_sentiment", "Neutral")))
-        llm_sentiment = "Neutral"
-        
-        if isinstance(engagement_data, dict):
-            llm_sentiment = str(engagement_data.get("tone", engagement_data.get("description", "Neutral")))
-        else:
-            llm_sentiment = str(engagement_data)
-            
         eng_score = rb_metrics['engagement_rule']['score']
-        breakdown.append({"criterion": "Engagement", "score": eng_score, "max": 15, "feedback": f"Sentiment: {llm_sentiment} (Score based on positivity probability)"})
+        sentiment = content['sentiment'] or self._sentiment_label(rb_metrics['engagement_rule']['pos_score'])
+        breakdown.append({"criterion": "Engagement", "score": eng_score, "max": 15, "feedback": f"Sentiment: {sentiment} (Score based on positivity probability)"})
 
         total_score = content_score + rb_metrics['speech_rate']['score'] + lg_score + rb_metrics['clarity']['score'] + eng_score
 
@@ -308,3 +413,17 @@ class ScoringEngine:
                 "duration": duration
             }
         }
+
+
+engine = ScoringEngine()
+
+
+def rule_based_metrics(text: str, duration_sec: int = None, lexical: LexicalAnalysis = None) -> Dict[str, Any]:
+    """Module-level entry point so the rule-based stage can run in a process pool."""
+    return engine.calculate_rule_based(text, duration_sec, lexical)
+
+
+def raw_rule_metrics(text: str, duration_sec: int = None) -> Dict[str, Any]:
+    """Picklable raw-metric entry point for `ScoringEngine.score_rule_batch` executors."""
+    metrics = engine.raw_metrics(text, duration_sec)
+    return {field: metrics[field] for field in METRIC_DTYPE.names}
@@ -0,0 +1,123 @@
+"""State shared by the worker processes of a multi-worker server (see prefork.py).
+
+A SQLite file in WAL mode that every worker opens: API key usage (cooldowns and
+remaining quota, so workers do not each spend the same quota), metric snapshots
+per worker (summed by whichever worker answers /metrics) and, through
+RESULT_CACHE_PATH defaulting to the same file, the result caches.
+
+Connections are opened lazily and per process, so the store can be created
+before the server forks.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS key_usage (
+    key_id TEXT PRIMARY KEY,
+    remaining_requests INTEGER,
+    requests_reset_at REAL NOT NULL DEFAULT 0,
+    remaining_tokens INTEGER,
+    tokens_reset_at REAL NOT NULL DEFAULT 0,
+    cooldown_until REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS metric_values (
+    worker TEXT NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (worker, name, labels)
+);
+"""
+
+# Times are stored as wall-clock seconds; schedulers keep monotonic ones.
+KEY_FIELDS = ("remaining_requests", "requests_reset_at", "remaining_tokens", "tokens_reset_at", "cooldown_until")
+
+
+def key_id(key: str) -> str:
+    """Stable identifier for an API key that does not store the key itself."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedState:
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None or self._pid != os.getpid():
+            # A connection inherited over fork must not be used by the child.
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive write transaction across all processes sharing the file."""
+        with self._lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    # Key usage
+
+    def load_keys(self, db: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+        rows = db.execute(f"SELECT key_id, {', '.join(KEY_FIELDS)} FROM key_usage").fetchall()
+        return {row[0]: dict(zip(KEY_FIELDS, row[1:])) for row in rows}
+
+    def save_key(self, db: sqlite3.Connection, key: str, fields: Dict[str, Any]):
+        db.execute(
+            f"INSERT OR REPLACE INTO key_usage (key_id, {', '.join(KEY_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            (key_id(key), *(fields[name] for name in KEY_FIELDS)),
+        )
+
+    # Metrics
+
+    def save_metrics(self, worker: str, samples: List[Tuple[str, str, Any]]):
+        """Replace `worker`'s snapshot with [(name, labels json, value), ...]."""
+        now = time.time()
+        with self.transaction() as db:
+            db.execute("DELETE FROM metric_values WHERE worker = ?", (worker,))
+            db.executemany(
+                "INSERT INTO metric_values (worker, name, labels, value, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(worker, name, labels, json.dumps(value), now) for name, labels, value in samples],
+            )
+
+    def load_metrics(self) -> List[Tuple[str, str, str, Any, float]]:
+        with self._lock:
+            rows = self.db.execute("SELECT worker, name, labels, value, updated_at FROM metric_values").fetchall()
+        return [(worker, name, labels, json.loads(value), updated_at) for worker, name, labels, value, updated_at in rows]
+
+    def reset_metrics(self):
+        """Forget earlier servers' snapshots; called once before the workers start."""
+        with self.transaction() as db:
+            db.execute("DELETE FROM metric_values")
+
+
+shared_state = SharedState(Config.SHARED_STATE_PATH) if Config.SHARED_STATE_PATH else None
@@ -0,0 +1,32 @@
+"""Shared test setup: backend modules read Config at import, so the environment is set first.
+
+    cd backend && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_data_dir = tempfile.mkdtemp(prefix="nirmaan-tests-")
+# Empty values also keep python-dotenv from loading real keys from .env.
+os.environ.update({
+    "GROQ_API_KEY": "test-key",
+    "GROQ_API_KEY_ALT_1": "",
+    "GROQ_API_KEY_ALT_2": "",
+    "GROQ_API_KEY_ALT_3": "",
+    "GROQ_API_KEY_ALT_4": "",
+    "GROQ_BASE_URL": "http://127.0.0.1:9",
+    "CONTENT_ANALYSIS_MODE": "llm",
+    "LLM_PACKING": "false",
+    "ADMISSION_RULE_ONLY_FALLBACK": "true",
+    "ADMISSION_LLM_MAX_IN_FLIGHT": "16",
+    "SERVE_BEFORE_READY": "true",
+    "RESULT_CACHE_MAX_ENTRIES": "0",
+    "TRANSCRIPTION_CACHE_MAX_ENTRIES": "0",
+    "RESULT_CACHE_PATH": "",
+    "SHARED_STATE_PATH": "",
+    "FEATURE_STORE_PATH": "",
+    "JOB_QUEUE_DIR": _data_dir,
+})
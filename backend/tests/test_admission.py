@@ -0,0 +1,85 @@
+import json
+import asyncio
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import WebSocketRoute
+from starlette.testclient import TestClient, WebSocketDenialResponse
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from main import app
+from admission import AdmissionController, AdmissionMiddleware, Lane, llm_capacity
+from groq_clients import client_pool
+
+TRANSCRIPT = "Hello everyone. My name is Asha, I am 13 years old and I study in class 8. Thank you for listening."
+
+
+@pytest.fixture
+def slow_groq(monkeypatch):
+    """Replace Groq calls with a slow stand-in and record the most calls in flight at once."""
+    peak = {"in_flight": 0}
+
+    async def run(label, operation, parse=None):
+        peak["in_flight"] = max(peak["in_flight"], llm_capacity.in_flight)
+        await asyncio.sleep(0.05)
+        return {"Salutation Level": "Normal"}
+
+    monkeypatch.setattr(client_pool, "run", run)
+    return peak
+
+
+def test_large_batch_does_not_shed_interactive_requests(slow_groq):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            items = [{"transcript": f"{TRANSCRIPT} Item {i}.", "duration": 40} for i in range(200)]
+            batch = asyncio.create_task(client.post("/score/batch", json={"items": items}))
+            # Let the batch start: its items queue on BATCH_LLM_CONCURRENCY, not on LLM capacity.
+            while llm_capacity.in_flight == 0:
+                await asyncio.sleep(0.005)
+            response = await client.post("/score", json={"transcript": TRANSCRIPT, "duration": 40})
+            assert not batch.done()
+            return response, await batch
+
+    response, batch = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.json()["content_analysis"]["source"] == "llm"
+    lines = [json.loads(line) for line in batch.text.splitlines()]
+    assert len(lines) == 200
+    assert all(line["result"]["content_analysis"]["source"] == "llm" for line in lines)
+    assert slow_groq["in_flight"] <= llm_capacity.max_in_flight
+    assert llm_capacity.in_flight == 0
+
+
+def test_websocket_streams_hold_an_audio_slot_and_count_their_bytes():
+    lane = Lane("audio", "normal", concurrency=1, queue=0, queue_timeout=1)
+    controller = AdmissionController([lane], [("WEBSOCKET", "/stream", "audio")], 4, {}, upload_budget_bytes=100)
+    seen = []
+
+    async def stream(websocket: WebSocket):
+        await websocket.accept()
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            seen.append((lane.in_flight, controller.upload_bytes))
+            await websocket.send_text("ok")
+
+    inner = Starlette(routes=[WebSocketRoute("/stream", stream)])
+    client = TestClient(AdmissionMiddleware(inner, controller))
+
+    with client.websocket_connect("/stream") as websocket:
+        websocket.send_bytes(b"x" * 60)
+        assert websocket.receive_text() == "ok"
+        # The lane is full while the stream is open.
+        with pytest.raises(WebSocketDenialResponse) as denied:
+            with client.websocket_connect("/stream"):
+                pass
+        assert denied.value.status_code == 429
+        websocket.send_bytes(b"x" * 101)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+        assert closed.value.code == 1009
+
+    assert seen == [(1, 60)]
+    assert lane.in_flight == 0 and controller.upload_bytes == 0
@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+import audio_processing
+from audio_ingest import AudioBuffer
+from audio_processing import transcribe_timed
+
+
+def test_transcription_survives_the_leading_request_going_away(monkeypatch):
+    release = asyncio.Event()
+    uploads = []
+
+    async def create(file, **kwargs):
+        uploads.append(file[1].read())
+        return SimpleNamespace(text="hello there", segments=[])
+
+    client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=create))))
+
+    async def run(label, operation, parse=None):
+        await release.wait()
+        return await operation(client)
+
+    monkeypatch.setattr(audio_processing.client_pool, "run", run)
+    monkeypatch.setattr(audio_processing, "transcription_cache", None)
+
+    async def request(data: bytes):
+        buffer = AudioBuffer.from_bytes("talk.wav", data)
+        try:
+            return await transcribe_timed(buffer)
+        finally:
+            buffer.close()
+
+    async def scenario():
+        leader = asyncio.create_task(request(b"RIFF-audio"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(request(b"RIFF-audio"))
+        await asyncio.sleep(0)
+        # The leading client disconnects; its handler closes its buffer.
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await waiter
+
+    result = asyncio.run(scenario())
+    assert result["text"] == "hello there"
+    assert uploads == [b"RIFF-audio"]
@@ -0,0 +1,70 @@
+import numpy as np
+from audio_chunking import SAMPLE_RATE, Chunk, plan_chunks, segment_rates, stitch
+
+
+def seconds(value: float) -> int:
+    return int(value * SAMPLE_RATE)
+
+
+def test_chunks_cut_at_quiet_frames_and_overlap():
+    samples = np.full(seconds(70), 0.5, dtype=np.float32)
+    # A pause a little after the 30 s target.
+    samples[seconds(31):seconds(31.2)] = 0
+
+    chunks = plan_chunks(samples, chunk_seconds=30, overlap_seconds=2, search_seconds=3)
+
+    assert [chunk.index for chunk in chunks] == [0, 1]
+    assert seconds(31) <= chunks[0].core_end < seconds(31.2)
+    assert chunks[1].core_start == chunks[0].core_end and chunks[1].core_end == len(samples)
+    assert chunks[0].start == 0 and chunks[0].end == chunks[0].core_end + seconds(2)
+    assert chunks[1].start == chunks[1].core_start - seconds(2)
+
+
+def test_short_audio_is_one_chunk():
+    chunks = plan_chunks(np.zeros(seconds(40), dtype=np.float32), 30, 2, 3)
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [(0, seconds(40))]
+
+
+def test_stitch_keeps_segments_in_their_core_and_drops_repeated_words():
+    first = Chunk(0, 0, seconds(32), 0, seconds(30))
+    second = Chunk(1, seconds(28), seconds(50), seconds(30), seconds(50))
+    transcripts = [
+        {"text": "", "segments": [
+            {"start": 0.0, "end": 25.0, "text": " Hello everyone, my name is Asha."},
+            {"start": 25.0, "end": 31.5, "text": " I am thirteen years"},
+        ]},
+        # Chunk-relative times: this chunk starts 28 s in, so its first segment (28-29 s) is in the overlap.
+        {"text": "", "segments": [
+            {"start": 0.0, "end": 1.0, "text": "years"},
+            {"start": 1.0, "end": 6.0, "text": " thirteen years old and I study in class 8."},
+            {"start": 6.0, "end": 22.0, "text": "Thank you."},
+        ]},
+    ]
+
+    stitched = stitch([first, second], transcripts)
+
+    assert [segment["start"] for segment in stitched["segments"]] == [0.0, 25.0, 29.0, 34.0]
+    # "thirteen years" was already heard at the end of the first chunk.
+    assert stitched["segments"][2]["text"] == "old and I study in class 8."
+    assert stitched["text"] == ("Hello everyone, my name is Asha. I am thirteen years "
+                                "old and I study in class 8. Thank you.")
+
+
+def test_stitch_without_segments_uses_the_chunk_core():
+    chunks = [Chunk(0, 0, seconds(12), 0, seconds(10)), Chunk(1, seconds(8), seconds(20), seconds(10), seconds(20))]
+    stitched = stitch(chunks, [{"text": "one two three four"}, {"text": "three four five six"}])
+    assert stitched["text"] == "one two three four five six"
+    assert [(segment["start"], segment["end"]) for segment in stitched["segments"]] == [(0.0, 10.0), (10.0, 20.0)]
+
+
+def test_a_single_repeated_word_is_kept():
+    chunks = [Chunk(0, 0, seconds(12), 0, seconds(10)), Chunk(1, seconds(8), seconds(20), seconds(10), seconds(20))]
+    stitched = stitch(chunks, [{"text": "I like cricket"}, {"text": "cricket is fun"}])
+    assert stitched["text"] == "I like cricket cricket is fun"
+
+
+def test_segment_rates():
+    rated = segment_rates([{"start": 0.0, "end": 3.0, "text": "one two three four five six"},
+                           {"start": 3.0, "end": 3.0, "text": "seven"}])
+    assert rated[0]["words"] == 6 and rated[0]["wpm"] == 120.0
+    assert rated[1]["wpm"] is None
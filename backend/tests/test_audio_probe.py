@@ -0,0 +1,137 @@
+"""Duration probes on minimal hand-built containers: only the headers the probes read."""
+import io
+import wave
+import struct
+import pytest
+from audio_probe import probe_duration
+
+
+def probe(data: bytes):
+    return probe_duration(memoryview(data))
+
+
+# WAV
+
+def wav(seconds: float, rate: int = 16000) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(rate * seconds))
+    return out.getvalue()
+
+
+def test_wav():
+    assert probe(wav(3)) == pytest.approx(3)
+    # Streamed recorders leave the data size unset.
+    data = bytearray(wav(2))
+    data[40:44] = struct.pack("<I", 0xFFFFFFFF)
+    assert probe(bytes(data)) == pytest.approx(2)
+
+
+# Matroska / WebM
+
+def ebml(element_id: int, payload: bytes = b"", unknown_size: bool = False) -> bytes:
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else bytes([0x80 | len(payload)])
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + size + payload
+
+
+def test_matroska_info_duration():
+    info = ebml(0x1549A966, ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + ebml(0x4489, struct.pack(">f", 2500)))
+    data = ebml(0x1A45DFA3, b"\x42\x82\x84webm") + ebml(0x18538067, info, unknown_size=True)
+    assert probe(data) == pytest.approx(2.5)
+
+
+def test_matroska_without_duration_uses_the_last_block():
+    # MediaRecorder output: no Duration, clusters of unknown size.
+    def simple_block(relative: int) -> bytes:
+        return ebml(0xA3, b"\x81" + struct.pack(">h", relative) + b"\x80" + b"\x00" * 4)
+
+    clusters = b"".join(
+        ebml(0x1F43B675, unknown_size=True) + ebml(0xE7, timecode.to_bytes(2, "big"))
+        + simple_block(0) + simple_block(480)
+        for timecode in (0, 1000)
+    )
+    data = ebml(0x1A45DFA3, b"\x42\x82\x84webm") + ebml(0x18538067, unknown_size=True) + clusters
+    assert probe(data) == pytest.approx(1.48)
+    # Truncated inside the last block's header: the timestamps seen so far still count.
+    assert probe(data[:-9]) == pytest.approx(1.0)
+
+
+# Ogg
+
+def ogg_page(granule: int, packet: bytes, sequence: int) -> bytes:
+    return (b"OggS" + bytes([0, 0]) + struct.pack("<qIII", granule, 1, sequence, 0)
+            + bytes([1, len(packet)]) + packet)
+
+
+def test_ogg_opus():
+    head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIh", 312, 48000, 0) + b"\x00"
+    data = ogg_page(0, head, 0) + ogg_page(-1, b"\x00" * 10, 1) + ogg_page(2 * 48000 + 312, b"\x00" * 10, 2)
+    assert probe(data) == pytest.approx(2)
+
+
+def test_ogg_vorbis():
+    head = b"\x01vorbis" + struct.pack("<IBI", 0, 1, 44100) + b"\x00" * 15
+    data = ogg_page(0, head, 0) + ogg_page(3 * 44100, b"\x00" * 10, 1)
+    assert probe(data) == pytest.approx(3)
+
+
+# FLAC
+
+def test_flac():
+    fields = (44100 << 44) | (0 << 41) | (15 << 36) | (44100 * 4)
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6 + fields.to_bytes(8, "big") + b"\x00" * 16
+    data = b"fLaC" + bytes([0x80, 0, 0, 34]) + streaminfo
+    assert probe(data) == pytest.approx(4)
+
+
+# MP4 / M4A
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+
+FTYP = box(b"ftyp", b"M4A \x00\x00\x00\x00isomM4A ")
+
+
+def test_mp4_mvhd():
+    mvhd = box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">IIII", 0, 0, 1000, 5500) + b"\x00" * 80)
+    data = FTYP + box(b"mdat", b"\x00" * 32) + box(b"moov", mvhd)
+    assert probe(data) == pytest.approx(5.5)
+
+    mvhd64 = box(b"mvhd", b"\x01\x00\x00\x00" + struct.pack(">QQIQ", 0, 0, 48000, 48000 * 7) + b"\x00" * 80)
+    assert probe(FTYP + box(b"moov", mvhd64)) == pytest.approx(7)
+
+
+def test_fragmented_mp4_uses_mehd():
+    mvhd = box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">IIII", 0, 0, 1000, 0) + b"\x00" * 80)
+    mehd = box(b"mehd", b"\x00\x00\x00\x00" + struct.pack(">I", 6000))
+    data = FTYP + box(b"moov", mvhd + box(b"mvex", mehd)) + box(b"moof", b"\x00" * 16)
+    assert probe(data) == pytest.approx(6)
+
+
+# MP3
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, joint stereo.
+MP3_HEADER = b"\xff\xfb\x90\x64"
+
+
+def test_mp3_constant_bitrate():
+    audio = MP3_HEADER + b"\x00" * (16000 * 3 - 4)
+    id3 = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 20]) + b"\x00" * 20
+    assert probe(audio) == pytest.approx(3)
+    assert probe(id3 + audio + b"TAG" + b"\x00" * 125) == pytest.approx(3)
+
+
+def test_mp3_xing_frame_count():
+    xing = MP3_HEADER + b"\x00" * 32 + b"Xing" + struct.pack(">II", 1, 100)
+    data = xing + b"\x00" * 1000
+    assert probe(data) == pytest.approx(100 * 1152 / 44100)
+
+
+def test_unknown_and_truncated_input():
+    assert probe(b"not audio at all") is None
+    assert probe(b"") is None
+    assert probe(wav(1)[:30]) is None
@@ -0,0 +1,106 @@
+import asyncio
+import drafts
+from drafts import Draft, split_sentences
+from scoring import engine
+
+INTRO = "Hello everyone. My name is Asha and I am 13 years old. I study in class 8. Thank you."
+LLM_CONTENT = {
+    "salutation_level": "Good", "salutation_score": 4, "keywords_found": 3, "must_have_count": 3,
+    "good_to_have_count": 0, "flow_status": "Order followed", "flow_score": 5, "sentiment": "Positive",
+}
+
+
+def test_split_sentences():
+    assert split_sentences("Hi there!  I am Ravi... and you? no end") == ["Hi there!", "I am Ravi...", "and you?", "no end"]
+    assert split_sentences("  ") == []
+
+
+def test_revisions_only_analyze_changed_sentences(monkeypatch):
+    analyzed = []
+    analyze_sentence = drafts.analyze_sentence
+
+    def counting(text):
+        analyzed.append(text)
+        return analyze_sentence(text)
+
+    monkeypatch.setattr(drafts, "analyze_sentence", counting)
+
+    async def scenario():
+        draft = Draft("d")
+        await draft.revise("I like chess. I am 12 years old.", None)
+        first = list(analyzed)
+        analyzed.clear()
+        await draft.revise("I like chess. I study in class 7. I like chess.", None)
+        return draft, first
+
+    draft, first = asyncio.run(scenario())
+    assert first == ["I like chess.", "I am 12 years old."]
+    assert analyzed == ["I study in class 7."]
+    assert draft.changes == {"changed": 1, "reused": 1, "removed": 1}
+    assert list(draft.sentences) == ["I like chess.", "I study in class 7."]
+    assert draft.revision == 2
+
+
+def test_llm_answer_arrives_after_the_revision(monkeypatch):
+    calls = []
+    release = None
+
+    async def llm_content(transcript, llm_limit=None):
+        calls.append(transcript)
+        await release.wait()
+        return LLM_CONTENT
+
+    monkeypatch.setattr(engine, "llm_content", llm_content)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        draft = Draft("d")
+        await draft.revise(INTRO, 30)
+        pending = await draft.result()
+
+        release.set()
+        await asyncio.gather(*draft.llm_tasks.values())
+        arrived = await draft.result()
+
+        # Same structure, different wording: the LLM answer is reused without asking again.
+        await draft.revise(INTRO.replace("class 8", "class 9"), 30)
+        reused = await draft.result()
+        return pending, arrived, reused
+
+    pending, arrived, reused = asyncio.run(scenario())
+    assert pending["content_analysis"]["source"] == "local"
+    assert pending["content_analysis"]["llm_pending"] is True
+    assert arrived["content_analysis"]["source"] == "llm"
+    assert arrived["content_analysis"]["llm_pending"] is False
+    assert arrived["breakdown"][0]["feedback"].startswith("Salutation: Good")
+    assert reused["content_analysis"]["source"] == "llm"
+    assert len(calls) == 1
+
+
+def test_failed_llm_call_is_asked_again_later(monkeypatch):
+    answers = [None, LLM_CONTENT]
+
+    async def llm_content(transcript, llm_limit=None):
+        return answers.pop(0)
+
+    monkeypatch.setattr(engine, "llm_content", llm_content)
+
+    async def scenario():
+        draft = Draft("d")
+        await draft.revise(INTRO, 30)
+        await draft.result()
+        await asyncio.gather(*draft.llm_tasks.values())
+        failed = await draft.result()
+
+        monkeypatch.setattr(drafts, "LLM_RETRY_SECONDS", 0)
+        retrying = await draft.result()
+        await asyncio.gather(*draft.llm_tasks.values())
+        return failed, retrying, await draft.result()
+
+    failed, retrying, answered = asyncio.run(scenario())
+    assert failed["content_analysis"]["source"] == "local_fallback"
+    assert failed["content_analysis"]["llm_pending"] is False
+    assert retrying["content_analysis"]["llm_pending"] is True
+    assert answered["content_analysis"]["source"] == "llm"
+    assert answers == []
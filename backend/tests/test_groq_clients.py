@@ -0,0 +1,31 @@
+import asyncio
+import threading
+from groq_clients import GroqClientPool
+
+
+def test_clients_of_a_replaced_loop_are_closed_on_that_loop():
+    pool = GroqClientPool(["key-a"])
+    server_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def get():
+            return pool.get_client("key-a")
+
+        server_client = asyncio.run_coroutine_threadsafe(get(), server_loop).result(5)
+
+        async def blocking_call():
+            # A second loop (e.g. a script calling `asyncio.run` in another thread) takes over the pool.
+            client = pool.get_client("key-a")
+            await asyncio.sleep(0.1)
+            await pool.aclose()
+            return client
+
+        other_client = asyncio.run(blocking_call())
+        assert other_client is not server_client
+        assert server_client.is_closed()
+        assert other_client.is_closed()
+    finally:
+        server_loop.call_soon_threadsafe(server_loop.stop)
+        thread.join(5)
+        server_loop.close()
@@ -0,0 +1,59 @@
+import os
+import asyncio
+import tempfile
+from config import Config
+from job_queue import DONE, JobQueue, callback_url_error
+
+
+def _queue(lease_seconds: float) -> JobQueue:
+    path = os.path.join(tempfile.mkdtemp(prefix="nirmaan-jobs-"), "jobs.sqlite3")
+    return JobQueue(path, workers=2, lease_seconds=lease_seconds)
+
+
+def test_long_job_keeps_its_lease_and_runs_once():
+    queue = _queue(lease_seconds=0.3)
+    runs = []
+
+    async def handler(payload):
+        runs.append(payload)
+        await asyncio.sleep(1.2)
+        return {"ok": True}
+
+    async def scenario():
+        queue.register("slow", handler)
+        job = queue.submit("slow", "k", {"n": 1})
+        await queue.start()
+        try:
+            while queue.get(job["job_id"])["status"] != DONE:
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+        return queue.get(job["job_id"])
+
+    job = asyncio.run(scenario())
+    assert len(runs) == 1
+    assert job["attempts"] == 1
+    assert job["result"] == {"ok": True}
+
+
+def test_result_is_discarded_after_the_lease_was_taken_over():
+    queue = _queue(lease_seconds=60)
+    job = queue.submit("slow", "k", {})
+    row = queue._claim()
+    # Another worker took the job over, e.g. after this one stalled past its lease.
+    queue.db.execute("UPDATE jobs SET lease_token = 'other' WHERE id = ?", (job["job_id"],))
+
+    assert not queue._finish(job["job_id"], row["lease_token"], DONE, result="{}")
+    assert queue.get(job["job_id"])["status"] == "running"
+    assert not queue._extend_lease(job["job_id"], row["lease_token"])
+
+
+def test_callbacks_to_internal_addresses_are_refused(monkeypatch):
+    for url in ("http://127.0.0.1:8080/cb", "http://169.254.169.254/latest/meta-data",
+                "http://10.0.0.5/cb", "http://[::1]/cb", "http://localhost/cb", "ftp://example.com/cb"):
+        assert callback_url_error(url), url
+    assert callback_url_error("https://93.184.216.34/cb") is None
+
+    monkeypatch.setattr(Config, "JOB_CALLBACK_ALLOWED_HOSTS", ["hooks.internal"])
+    assert callback_url_error("http://hooks.internal:9000/cb") is None
+    assert callback_url_error("https://93.184.216.34/cb")
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from key_scheduler import KeyScheduler
+from shared_state import SharedState
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after": "30"}
+
+
+def _shared() -> SharedState:
+    return SharedState(os.path.join(tempfile.mkdtemp(prefix="nirmaan-shared-"), "shared.sqlite3"))
+
+
+def test_decisions_do_not_touch_the_shared_store(monkeypatch):
+    scheduler = KeyScheduler(["key-a", "key-b"], _shared())
+
+    def transaction():
+        raise AssertionError("shared store used on the request path")
+
+    monkeypatch.setattr(scheduler.shared, "transaction", transaction)
+    key, wait = scheduler.acquire()
+    scheduler.report_success(key, {"x-ratelimit-remaining-requests": "10"})
+    scheduler.release(key)
+    assert wait == 0
+    assert scheduler.health()
+
+
+def test_cooldowns_and_quota_reach_other_workers():
+    shared = _shared()
+    first = KeyScheduler(["key-a", "key-b"], shared)
+    second = KeyScheduler(["key-a", "key-b"], shared)
+
+    assert first.report_failure("key-a", RateLimited()) == 30
+    first.report_success("key-b", {"x-ratelimit-remaining-requests": "3", "x-ratelimit-reset-requests": "60s"})
+    second.report_success("key-b", {"x-ratelimit-remaining-requests": "7", "x-ratelimit-reset-requests": "60s"})
+    first.sync()
+    second.sync()
+
+    assert second.next_available_in() == 0
+    assert second.states["key-a"].cooldown_until > second.states["key-b"].cooldown_until
+    # The lowest remaining quota in the current window wins.
+    assert second.states["key-b"].remaining_requests == 3
+    key, _ = second.acquire()
+    assert key == "key-b"
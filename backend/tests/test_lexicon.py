@@ -0,0 +1,74 @@
+"""The Aho-Corasick lexicon against a plain scan of every phrase at every token position."""
+from collections import Counter
+from config import Config
+from lexicon import TOKEN_RE, Lexicon, PhraseAutomaton, lexicon
+
+TRANSCRIPTS = [
+    "Hello everyone, myself Asha. I am 13 years old and I study in class 8 at Green Valley School.",
+    "Um, so, like, you know, I mean I kinda like to play cricket with my father. Thank you!",
+    "Good morning! I am excited to introduce myself. My hobbies are reading, and I enjoy music. That's all.",
+    "you know you know what, i mean... sort of sort of okay hmm ah well right basically actually uh",
+    "",
+    "Greetings. Respected teachers and dear friends: my family has four members. Thanks, have a nice day.",
+]
+
+
+def scan(text):
+    """Reference: compare every configured phrase with the tokens at every position."""
+    matches = list(TOKEN_RE.finditer(text.lower()))
+    tokens = [match.group() for match in matches]
+    fillers = Counter()
+    keywords = {}
+    phrases = [(phrase, None) for phrase in Config.FILLER_WORDS]
+    for group, categories in {
+        "must_have": Config.MUST_HAVE_KEYWORDS,
+        "good_to_have": Config.GOOD_TO_HAVE_KEYWORDS,
+        "salutation": Config.SALUTATION_PHRASES,
+        "closing": {"closing": Config.CLOSING_PHRASES},
+    }.items():
+        phrases += [(phrase, (group, category)) for category, entries in categories.items() for phrase in entries]
+
+    for start in range(len(tokens)):
+        for phrase, key in phrases:
+            words = TOKEN_RE.findall(phrase.lower())
+            if tokens[start:start + len(words)] != words:
+                continue
+            if key is None:
+                fillers[phrase] += 1
+            else:
+                keywords.setdefault(key, []).append((start, matches[start].start(), phrase))
+    return len(tokens), fillers, keywords
+
+
+def test_analyze_matches_a_plain_scan():
+    for text in TRANSCRIPTS:
+        word_count, fillers, keywords = scan(text)
+        result = lexicon.analyze(text)
+        assert result.word_count == word_count, text
+        assert result.filler_hits == fillers, text
+        assert result.filler_count == sum(fillers.values())
+        assert {key: sorted(hits) for key, hits in result.keyword_hits.items()} == \
+            {key: sorted(hits) for key, hits in keywords.items()}, text
+
+
+def test_overlapping_and_nested_phrases_are_all_found():
+    automaton = PhraseAutomaton()
+    for phrase in ("you know", "know", "you know what", "what i mean", "i mean"):
+        automaton.add(phrase, phrase)
+    automaton.build()
+
+    found = []
+    state = 0
+    for token in "so you know what i mean you know".split():
+        state = automaton.step(state, token)
+        found += sorted(payload for _, payload in automaton.outputs(state))
+    assert found == ["know", "you know", "you know what", "i mean", "what i mean", "know", "you know"]
+
+
+def test_keyword_hits_keep_transcript_order_and_offsets():
+    text = "My name is Ravi. I like to play. My hobby is chess."
+    result = Lexicon([], {"must_have": Config.MUST_HAVE_KEYWORDS}).analyze(text)
+    hobbies = result.keyword_hits[("must_have", "hobbies")]
+    assert [phrase for _, _, phrase in hobbies] == ["like to", "play", "hobby"]
+    assert [text.lower()[offset:].startswith(phrase) for _, offset, phrase in hobbies] == [True] * 3
+    assert result.categories("must_have") == ["name", "hobbies"]
@@ -0,0 +1,94 @@
+import json
+import asyncio
+from types import SimpleNamespace
+import pytest
+from llm_packing import LLMPacker, estimate_tokens, parse_packed_item
+
+GOOD = {"salutation": "good", "must_have": ["name", "age"], "good_to_have": ["ambition"],
+        "flow": True, "sentiment": "positive"}
+
+
+class FakePool:
+    """Stands in for GroqClientPool: records each request's transcripts and answers with `reply`."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    async def run(self, label, operation, parse=None):
+        async def create(messages, **kwargs):
+            return json.loads(messages[-1]["content"])
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            with_raw_response=SimpleNamespace(create=create)
+        )))
+        transcripts = await operation(client)
+        self.requests.append(transcripts)
+        await asyncio.sleep(0)
+        return self.reply(transcripts)
+
+
+def analyze_all(packer, transcripts):
+    async def scenario():
+        return await asyncio.gather(*(packer.analyze(transcript) for transcript in transcripts))
+    return asyncio.run(scenario())
+
+
+def test_concurrent_transcripts_share_one_request():
+    pool = FakePool(lambda transcripts: {item_id: GOOD for item_id in transcripts})
+    packer = LLMPacker(pool, max_items=8, max_tokens=10_000, wait_seconds=0.01)
+
+    results = analyze_all(packer, [f"Transcript {i}" for i in range(5)])
+
+    assert len(pool.requests) == 1
+    assert sorted(pool.requests[0].values()) == [f"Transcript {i}" for i in range(5)]
+    assert all(result["salutation_level"] == "Good" and result["must_have_count"] == 2 for result in results)
+
+
+def test_packs_close_at_max_items_and_max_tokens():
+    pool = FakePool(lambda transcripts: {item_id: GOOD for item_id in transcripts})
+    analyze_all(LLMPacker(pool, max_items=2, max_tokens=10_000, wait_seconds=10), ["a", "b", "c", "d"])
+    assert [len(request) for request in pool.requests] == [2, 2]
+
+    pool = FakePool(lambda transcripts: {item_id: GOOD for item_id in transcripts})
+    text = "x" * 400
+    analyze_all(LLMPacker(pool, max_items=8, max_tokens=2 * estimate_tokens(text), wait_seconds=10), [text] * 4)
+    assert [len(request) for request in pool.requests] == [2, 2]
+
+
+def test_invalid_entries_are_retried_one_by_one():
+    def reply(transcripts):
+        if len(transcripts) > 1:
+            # The pack answers "bad" with an unknown category and leaves "missing" out.
+            return {item_id: {**GOOD, "must_have": ["pets"]} if text == "bad" else GOOD
+                    for item_id, text in transcripts.items() if text != "missing"}
+        return {"t0": GOOD}
+
+    pool = FakePool(reply)
+    results = analyze_all(LLMPacker(pool, max_items=8, max_tokens=10_000, wait_seconds=0.01),
+                          ["ok", "bad", "missing"])
+
+    assert all(result is not None for result in results)
+    assert pool.requests[0] == {"t0": "ok", "t1": "bad", "t2": "missing"}
+    assert sorted(request["t0"] for request in pool.requests[1:]) == ["bad", "missing"]
+    assert all(len(request) == 1 for request in pool.requests[1:])
+
+
+def test_failed_retry_and_failed_pack_fall_back_to_none():
+    pool = FakePool(lambda transcripts: {"t0": GOOD, "t1": {"salutation": "odd"}} if len(transcripts) > 1 else {})
+    results = analyze_all(LLMPacker(pool, max_items=8, max_tokens=10_000, wait_seconds=0.01), ["ok", "bad"])
+    assert results[0]["salutation_level"] == "Good"
+    assert results[1] is None
+
+    def fail(transcripts):
+        raise RuntimeError("all keys failed")
+
+    results = analyze_all(LLMPacker(FakePool(fail), max_items=8, max_tokens=10_000, wait_seconds=0.01), ["a", "b"])
+    assert results == [None, None]
+
+
+def test_parse_packed_item_rejects_extra_or_mistyped_fields():
+    assert parse_packed_item(GOOD)["flow_score"] == 5
+    for item in ({**GOOD, "extra": 1}, {**GOOD, "flow": "yes"}, {**GOOD, "sentiment": "angry"}, None):
+        with pytest.raises(ValueError):
+            parse_packed_item(item)
@@ -0,0 +1,63 @@
+from lexicon import lexicon
+from local_rules import CLOSING_TOKENS, OPENING_TOKENS, analyze_content
+
+FULL = (
+    "Good morning everyone, it is a pleasure to introduce myself. My name is Asha and I am 13 years old. "
+    "I study in class 8 at Green Valley School. I live with my family, my mother and father. "
+    "My hobby is painting and my dream is to become an artist. Thank you."
+)
+
+
+def analyze(text):
+    return analyze_content(lexicon.analyze(text))
+
+
+def test_complete_introduction():
+    result = analyze(FULL)
+    # The highest tier found near the start wins.
+    assert result.salutation_level == "Excellent"
+    assert set(result.must_have) == {"name", "age", "school", "family", "hobbies"}
+    assert set(result.good_to_have) == {"origin", "ambition"}
+    assert result.flow_followed and result.flow_missing == []
+
+    content = result.content()
+    assert content["salutation_score"] == 5
+    assert content["must_have_count"] == 5 and content["good_to_have_count"] == 2
+    assert content["flow_score"] == 5
+    assert result.confidence > 0.9
+
+
+def test_salutation_counts_only_near_the_start():
+    filler = " ".join(["word"] * OPENING_TOKENS)
+    result = analyze(f"{filler} hello everyone, my name is Asha. Thank you.")
+    assert result.salutation_level == "No Salutation"
+    assert "salutation" in result.flow_missing
+    assert not result.flow_followed
+
+
+def test_closing_counts_only_near_the_end():
+    filler = " ".join(["word"] * CLOSING_TOKENS)
+    result = analyze(f"Hello everyone, my name is Asha. Thank you. {filler}")
+    assert result.flow_missing == ["closing"]
+
+
+def test_details_before_basics_break_the_flow():
+    result = analyze("Hello. My hobby is chess. My name is Ravi and I am 12 years old. Thank you.")
+    assert result.flow_missing == []
+    assert not result.flow_followed
+    assert result.content()["flow_status"] == "Order Not followed"
+
+
+def test_empty_transcript():
+    result = analyze("")
+    assert result.salutation_level == "No Salutation"
+    assert result.content()["keywords_found"] == 0
+    assert result.confidence == 0.0
+
+
+def test_basic_details_before_the_salutation_break_the_flow():
+    # "I am" counts as the name, so it comes before "excited to introduce".
+    result = analyze("I am excited to introduce myself. I am 13 years old and study in class 8. Thank you.")
+    assert result.salutation_level == "Excellent"
+    assert result.flow_missing == []
+    assert not result.flow_followed
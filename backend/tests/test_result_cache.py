@@ -0,0 +1,46 @@
+import os
+import asyncio
+import tempfile
+import threading
+from result_cache import ResultCache
+
+
+def _cache(max_entries: int = 8) -> ResultCache:
+    path = os.path.join(tempfile.mkdtemp(prefix="nirmaan-cache-"), "cache.sqlite3")
+    return ResultCache("test", max_entries, 60, path)
+
+
+def test_disk_tier_runs_off_the_event_loop(monkeypatch):
+    cache = _cache(max_entries=1)
+    threads = []
+    disk_get, disk_set = cache._disk_get, cache._disk_set
+
+    def record(fn):
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(cache, "_disk_get", record(disk_get))
+    monkeypatch.setattr(cache, "_disk_set", record(disk_set))
+
+    async def scenario():
+        await cache.aset("a", {"score": 1})
+        await cache.aset("b", {"score": 2})
+        # Memory holds one entry, so each read here comes back from disk.
+        return threading.get_ident(), await cache.aget("a"), await cache.aget("b"), await cache.aget("c")
+
+    loop_thread, a, b, c = asyncio.run(scenario())
+    assert (a, b, c) == ({"score": 1}, {"score": 2}, None)
+    assert threads and loop_thread not in threads
+    assert cache.stats()["disk_hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_hits_do_not_touch_disk(monkeypatch):
+    cache = _cache()
+    cache.set("a", [1, 2])
+    monkeypatch.setattr(cache, "_disk_get", lambda *args: (_ for _ in ()).throw(AssertionError("disk read")))
+    value = asyncio.run(cache.aget("a"))
+    value.append(3)
+    assert cache.get("a") == [1, 2]
@@ -0,0 +1,80 @@
+"""The rubric table against the if/elif chains it replaced, at and around every threshold."""
+import numpy as np
+from config import Config
+from rubric import rubric
+
+
+def chain_speech_rate(wpm):
+    t = Config.SPEECH_RATE_THRESHOLDS
+    if wpm > t["too_fast"]:
+        return 2
+    elif t["fast_min"] <= wpm <= t["too_fast"] - 1:
+        return 6
+    elif t["ideal_min"] <= wpm < t["fast_min"]:
+        return 10
+    elif t["slow_min"] <= wpm < t["ideal_min"]:
+        return 6
+    return 2
+
+
+def chain_ascending(value, thresholds, points):
+    for name, score in zip(("excellent", "good", "average", "poor"), points):
+        if value >= thresholds[name]:
+            return score
+    return points[-1]
+
+
+def chain_clarity(filler_rate):
+    t = Config.FILLER_THRESHOLDS
+    for name, score in zip(("excellent", "good", "average", "poor"), (15, 12, 9, 6)):
+        if filler_rate <= t[name]:
+            return score
+    return 3
+
+
+def boundary_values(thresholds):
+    values = []
+    for edge in thresholds:
+        values += [edge - 1, edge - 0.5, np.nextafter(edge, -np.inf), edge, np.nextafter(edge, np.inf), edge + 0.5]
+    return np.array(sorted(set(values + [0.0])))
+
+
+def assert_same(name, chain, thresholds, skip=lambda value: False):
+    criterion = rubric[name]
+    values = boundary_values(thresholds)
+    digitized = criterion.score_array(values)
+    for value, table_score in zip(values, digitized):
+        if skip(value):
+            continue
+        expected = chain(value)
+        assert table_score == expected, f"{name} at {value}: table {table_score}, chain {expected}"
+        assert criterion.score(float(value)) == expected, f"{name} at {value} (bisect)"
+
+
+def test_speech_rate_matches_the_chain_outside_its_gap():
+    t = Config.SPEECH_RATE_THRESHOLDS
+    in_gap = lambda wpm: t["too_fast"] - 1 < wpm <= t["too_fast"]
+    assert_same("speech_rate", chain_speech_rate, list(t.values()) + [t["too_fast"] - 1], skip=in_gap)
+
+
+def test_speech_rate_gap_is_scored_as_contiguous_bands():
+    t = Config.SPEECH_RATE_THRESHOLDS
+    criterion = rubric["speech_rate"]
+    inside = t["too_fast"] - 0.5
+    assert chain_speech_rate(inside) == 2
+    assert criterion.score(inside) == 6 and criterion.label(inside) == "Fast"
+    assert criterion.score(t["too_fast"]) == 2 and criterion.label(t["too_fast"]) == "Too Fast"
+
+
+def test_grammar_vocabulary_and_engagement_match_the_chains():
+    cases = [
+        ("grammar", Config.GRAMMAR_THRESHOLDS, (10, 8, 6, 4, 2)),
+        ("vocabulary", Config.VOCAB_THRESHOLDS, (10, 8, 6, 4, 2)),
+        ("engagement", Config.ENGAGEMENT_THRESHOLDS, (15, 12, 9, 6, 3)),
+    ]
+    for name, thresholds, points in cases:
+        assert_same(name, lambda value: chain_ascending(value, thresholds, points), thresholds.values())
+
+
+def test_clarity_matches_the_chain():
+    assert_same("clarity", chain_clarity, Config.FILLER_THRESHOLDS.values())
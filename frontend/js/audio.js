@@ -30,6 +30,14 @@
         let recordingInterval;
         let seconds = 0;
 
+        // Live scoring: a second recorder restarted every few seconds so each
+        // segment is a complete file the backend can transcribe on its own.
+        let streamSocket = null;
+        let segmentRecorder = null;
+        let segmentTimer = null;
+        let streamSendQueue = Promise.resolve();
+        let streamFailed = false;
+
         if (!recordTab || !uploadTab) {
             console.error('Audio tabs not found');
             return;
@@ -84,7 +92,9 @@
                     audioPlayback.src = audioUrl;
                     audioPlayback.classList.remove('hidden');
                     submitRecordingBtn.classList.remove('hidden');
-                    statusText.textContent = 'Recording complete. Review or submit.';
+                    if (!streamSocket || streamFailed) {
+                        statusText.textContent = 'Recording complete. Review or submit.';
+                    }
 
                     // Reset UI
                     recordBtn.classList.remove('recording');
@@ -94,6 +104,10 @@
                 mediaRecorder.start();
                 console.log('MediaRecorder started');
 
+                if (window.CONFIG.STREAM_SCORING) {
+                    startStreaming(stream);
+                }
+
                 // Update UI for Recording State
                 recordBtn.classList.add('recording');
                 submitRecordingBtn.classList.add('hidden');
@@ -113,11 +127,116 @@
         function stopRecording() {
             if (mediaRecorder && (mediaRecorder.state === 'recording' || mediaRecorder.state === 'paused')) {
                 console.log('Stopping recording...');
+                stopStreaming();
                 mediaRecorder.stop();
                 mediaRecorder.stream.getTracks().forEach(track => track.stop());
             }
         }
 
+        function startStreaming(stream) {
+            streamFailed = false;
+            streamSendQueue = Promise.resolve();
+
+            try {
+                streamSocket = new WebSocket(`${BACKEND_URL.replace(/^http/, 'ws')}/audio/stream`);
+            } catch (error) {
+                console.warn('Live scoring unavailable:', error);
+                streamSocket = null;
+                return;
+            }
+            streamSocket.binaryType = 'arraybuffer';
+
+            streamSocket.addEventListener('open', () => startSegment(stream, true));
+
+            streamSocket.addEventListener('message', event => {
+                const message = JSON.parse(event.data);
+                if (message.type === 'partial') {
+                    const metrics = message.metrics;
+                    const wpm = metrics.wpm !== null ? `${Math.round(metrics.wpm)} WPM` : '-- WPM';
+                    if (mediaRecorder && mediaRecorder.state === 'recording') {
+                        statusText.textContent = `Live: ${metrics.word_count} words · ${wpm} · ${metrics.filler_rate.toFixed(1)}% fillers`;
+                    }
+                } else if (message.type === 'final') {
+                    console.log('Live score result:', message.result);
+                    displayResults(message.result, true);
+                } else if (message.type === 'error') {
+                    console.warn('Live scoring error:', message.detail);
+                    streamFailed = true;
+                }
+            });
+
+            // On failure the full recording can still be submitted as before.
+            streamSocket.addEventListener('error', () => {
+                console.warn('Live scoring connection failed');
+                streamFailed = true;
+            });
+
+            streamSocket.addEventListener('close', event => {
+                clearTimeout(segmentTimer);
+                // e.g. 1013 when the server is too busy for another live stream
+                if (event.code !== 1000) streamFailed = true;
+                streamSocket = null;
+            });
+        }
+
+        function startSegment(stream, first) {
+            const chunks = [];
+            const recorder = new MediaRecorder(stream);
+            segmentRecorder = recorder;
+
+            recorder.addEventListener('dataavailable', event => {
+                if (event.data.size > 0) chunks.push(event.data);
+            });
+
+            // Resolves once this segment has been queued for sending.
+            let segmentQueued;
+            recorder.segmentQueued = new Promise(resolve => { segmentQueued = resolve; });
+
+            recorder.addEventListener('stop', () => {
+                const segment = new Blob(chunks, { type: recorder.mimeType || 'audio/webm' });
+                streamSendQueue = streamSendQueue.then(async () => {
+                    if (streamSocket && streamSocket.readyState === WebSocket.OPEN && segment.size > 0) {
+                        streamSocket.send(await segment.arrayBuffer());
+                    }
+                });
+                segmentQueued();
+            });
+
+            recorder.start();
+            if (first) {
+                const mimeType = recorder.mimeType || 'audio/webm';
+                const format = ['webm', 'mp4', 'ogg'].find(type => mimeType.includes(type)) || 'webm';
+                streamSocket.send(JSON.stringify({ type: 'start', format }));
+            }
+            segmentTimer = setTimeout(() => {
+                if (mediaRecorder && mediaRecorder.state === 'recording') {
+                    recorder.stop();
+                    startSegment(stream, false);
+                }
+            }, window.CONFIG.STREAM_SEGMENT_MS || 5000);
+        }
+
+        function stopStreaming() {
+            clearTimeout(segmentTimer);
+            if (!streamSocket) return;
+
+            const recorder = segmentRecorder;
+            if (recorder && recorder.state !== 'inactive') {
+                recorder.stop();
+            }
+            const socket = streamSocket;
+            // The last segment is queued by its recorder's (asynchronous) stop handler; end goes after it.
+            const lastSegment = recorder ? recorder.segmentQueued : Promise.resolve();
+            lastSegment.then(() => {
+                streamSendQueue = streamSendQueue.then(() => {
+                    if (socket.readyState === WebSocket.OPEN && !streamFailed) {
+                        socket.send(JSON.stringify({ type: 'end', duration: seconds }));
+                        statusText.textContent = 'Finishing live score...';
+                    }
+                });
+            });
+        }
+
         function startTimer() {
             clearInterval(recordingInterval);
             recordingInterval = setInterval(() => {
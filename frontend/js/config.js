@@ -4,5 +4,12 @@
 // For production: 'https://nirmaan-bice.vercel.app'
 
 window.CONFIG = {
-    BACKEND_URL: 'https://nirmaan-bice.vercel.app'
+    BACKEND_URL: 'https://nirmaan-bice.vercel.app',
+    // Score recordings over a WebSocket while recording; falls back to upload if unavailable
+    STREAM_SCORING: true,
+    STREAM_SEGMENT_MS: 5000,
+    // Show a live score while the transcript is edited (draft sessions); submit still uses /score.
+    // Turned off automatically when the backend runs several workers and does not serve /drafts.
+    DRAFT_SCORING: true,
+    DRAFT_DEBOUNCE_MS: 400
 };
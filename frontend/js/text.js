@@ -81,6 +81,88 @@
             }
         });
 
+        // Live draft scoring: each pause in typing sends the text as a new draft revision
+        const transcriptInput = document.getElementById('transcript');
+        const durationInput = document.getElementById('text-duration');
+        const draftStatus = document.getElementById('draft-status');
+        let draftId = null;
+        let draftTimer = null;
+        let draftSeq = 0;
+        // Multi-worker servers do not serve /drafts; live scoring is then turned off.
+        let draftsAvailable = true;
+
+        async function scoreDraft() {
+            const duration = durationInput.value;
+            const headers = { 'Content-Type': 'application/json' };
+            const body = JSON.stringify({
+                transcript: transcriptInput.value,
+                duration: duration ? parseInt(duration) : null
+            });
+
+            let response = null;
+            if (draftId) {
+                response = await fetch(`${BACKEND_URL}/drafts/${draftId}`, { method: 'PUT', headers, body });
+                // Drafts expire when left idle; start a new one.
+                if (response.status === 404) draftId = null;
+            }
+            if (!draftId) {
+                response = await fetch(`${BACKEND_URL}/drafts`, { method: 'POST', headers, body });
+                if (response.status === 404) {
+                    draftsAvailable = false;
+                    return null;
+                }
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const result = await response.json();
+            draftId = result.draft.draft_id;
+            return result;
+        }
+
+        function showDraftStatus(result) {
+            if (result.overall_score === null) {
+                draftStatus.classList.add('hidden');
+                return;
+            }
+            const pending = result.content_analysis.llm_pending;
+            draftStatus.textContent = `Live score: ${result.overall_score}/100${pending ? ' · checking structure...' : ''}`;
+            draftStatus.classList.remove('hidden');
+
+            if (pending) {
+                // The LLM answer lands on the server shortly; pick it up unless the text changes first.
+                const seq = draftSeq;
+                setTimeout(async () => {
+                    if (seq !== draftSeq || !draftId) return;
+                    try {
+                        const response = await fetch(`${BACKEND_URL}/drafts/${draftId}`);
+                        if (response.ok && seq === draftSeq) showDraftStatus(await response.json());
+                    } catch (error) {
+                        console.warn('Live draft refresh failed:', error);
+                    }
+                }, 1500);
+            }
+        }
+
+        if (window.CONFIG.DRAFT_SCORING && draftStatus) {
+            const onEdit = () => {
+                clearTimeout(draftTimer);
+                if (!draftsAvailable) return;
+                draftTimer = setTimeout(async () => {
+                    const seq = ++draftSeq;
+                    try {
+                        const result = await scoreDraft();
+                        // Ignore answers overtaken by a later edit.
+                        if (result && seq === draftSeq) showDraftStatus(result);
+                    } catch (error) {
+                        console.warn('Live draft scoring failed:', error);
+                    }
+                }, window.CONFIG.DRAFT_DEBOUNCE_MS);
+            };
+            transcriptInput.addEventListener('input', onEdit);
+            durationInput.addEventListener('input', onEdit);
+        }
+
         // Results Display
         function displayResults(result, showTranscription) {
             const inputSection = document.querySelector('.input-section');
@@ -145,6 +227,7 @@
 
             // Reset forms
             textForm.reset();
+            if (draftStatus) draftStatus.classList.add('hidden');
 
             // Reset circle animation
             const circle = document.getElementById('score-circle');